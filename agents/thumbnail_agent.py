@@ -3,25 +3,25 @@ ThumbnailAgent — creates a simple thumbnail using Pillow (landscape 1280x720).
 For Shorts, thumbnails are optional but created anyway for YouTube Studio.
 """
 import os
-from PIL import Image, ImageDraw, ImageFont
+import uuid
+from PIL import Image, ImageDraw
 from utils.time_utils import timestamp_now
+from utils.text_layout import get_font_or_default
 from config import OUTPUT_DIR
 
 class ThumbnailAgent:
-    def __init__(self):
-        pass
+    def __init__(self, font_path: str = 'arial.ttf'):
+        """:param font_path: TrueType font for the title (PIL's default font if it can't be loaded)"""
+        self.font_path = font_path
 
-    def create_thumbnail(self, captions:list, topic:str) -> str:
+    def create_thumbnail(self, captions:list, topic:str, out_path:str|None=None) -> str:
         W, H = 1280, 720
         img = Image.new('RGB', (W,H), color=(30,30,30))
         draw = ImageDraw.Draw(img)
         title = captions[0] if captions else (topic[:60]+'...')
-        try:
-            font = ImageFont.truetype('arial.ttf', 60)
-        except Exception:
-            font = ImageFont.load_default()
+        font = get_font_or_default(self.font_path, 60)
         draw.text((40, H//2 - 30), title, fill=(255,255,255), font=font)
-        outp = os.path.join(OUTPUT_DIR, 'thumbnails', f'thumb_{timestamp_now()}.png')
+        outp = out_path or os.path.join(OUTPUT_DIR, 'thumbnails', f'thumb_{timestamp_now()}_{uuid.uuid4().hex[:8]}.png')
         os.makedirs(os.path.dirname(outp), exist_ok=True)
         img.save(outp)
         return outp
\ No newline at end of file
@@ -1,23 +1,69 @@
 """
 TopicResearchAgent
-- For free mode: reads from local seed file `data/quotes_seed.txt`.
-- Optionally: can scrape a simple web source for trending facts.
-Returns a short topic/fact string.
+- For free mode: reads from local seed file `data/quotes_seed.txt` through an indexed TopicStore
+  (lazy offset index, no-repeat sampling, used topics tracked in `outputs/used_topics.json`).
+- Facts too similar to anything already published are rejected via a MinHash/LSH index;
+  a topic counts as published once mark_published() is called after its upload.
+- Facts collected by `--ingest-trends` (data/trending_topics.json) are merged into the seed file
+  whenever that file has changed, through the same exact and near-duplicate checks.
+Returns a short topic/fact string, or nothing once every seed fact has been published.
 """
-import random
+import os
 from pathlib import Path
+from config import TOPIC_STATE_PATH, TRENDING_TOPICS_PATH
+from utils.logger import logger
+from utils.near_dup import NearDuplicateIndex
+from utils.topic_store import TopicStore
 
 SEED_FILE = Path('data/quotes_seed.txt')
 
 class TopicResearchAgent:
-    def __init__(self):
-        pass
+    def __init__(self, seed_file=SEED_FILE, dedup=True, trending_path: str | None = TRENDING_TOPICS_PATH,
+                 state_path: str = TOPIC_STATE_PATH):
+        """
+        :param seed_file: seed corpus, one fact per line
+        :param dedup: reject facts too similar to published topics (True: the default NearDuplicateIndex,
+                      or an index to use)
+        :param trending_path: ingested trending facts to merge in (None: don't)
+        :param state_path: used-topic state
+        """
+        if isinstance(dedup, bool):
+            dedup = NearDuplicateIndex() if dedup else None
+        self.store = TopicStore(seed_file, state_path=state_path, dedup=dedup)
+        self.trending_path = trending_path
+        self._trending_mtime = None
 
-    def suggest_topic(self) -> str:
-        if SEED_FILE.exists():
-            lines = [l.strip() for l in SEED_FILE.read_text(encoding='utf-8').splitlines() if l.strip() and not l.startswith('#')]
-            if lines:
-                return random.choice(lines)
-        # Fallback static
-        fallback = 'Interesting fact about space: black holes are not actually holes.'
-        return fallback
\ No newline at end of file
+    def merge_trending(self) -> int:
+        """Add ingested trending facts to the seed corpus if the trending file changed; returns how many were new."""
+        try:
+            mtime = os.stat(self.trending_path).st_mtime_ns if self.trending_path else None
+        except FileNotFoundError:
+            mtime = None
+        if mtime is None or mtime == self._trending_mtime:
+            return 0
+        from services.trend_ingester import TrendingTopics
+        facts = [e["fact"] for e in TrendingTopics(self.trending_path).load() if isinstance(e, dict) and e.get("fact")]
+        added = self.store.add_facts(facts)
+        self._trending_mtime = mtime
+        if added:
+            logger.info(f'Merged {added} ingested trending facts into {self.store.seed_path}.')
+        return added
+
+    def suggest_topic(self) -> str | None:
+        topics = self.suggest_topics(1)
+        return topics[0] if topics else None
+
+    def suggest_topics(self, n: int) -> list[str]:
+        """
+        Pick up to n distinct, not yet used topics in one go (used by batch runs).
+        Returns fewer than n (or none) if the seed file doesn't have enough unpublished lines.
+        """
+        self.merge_trending()
+        topics = self.store.sample(n)
+        if not topics:
+            logger.warning(f'No topics left in {self.store.seed_path}; add facts to it (or --ingest-trends).')
+        return topics
+
+    def mark_published(self, topic: str):
+        """Call once the topic's video is uploaded."""
+        self.store.mark_published(topic)
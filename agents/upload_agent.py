@@ -1,28 +1,67 @@
 """
 UploadAgent — optional YouTube upload using google-api-python-client.
 If OAuth credentials aren't present, upload will be skipped.
+Uploads are chunked and resumable, with retries and an on-disk queue (see utils/upload_queue.py).
+The Google client libraries are imported, and OAuth/discovery run, only when an upload actually happens.
 """
+import http.client
+import json
 import os
 import pickle
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+import random
+import socket
+import time
+from config import UPLOAD_CHUNK_SIZE, UPLOAD_MAX_RETRIES
 from utils.logger import logger  # optional, for logging
+from utils.upload_queue import UploadQueue
 
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 
+# Failures worth retrying with backoff (network drops, server-side hiccups)
+RETRIABLE_STATUS_CODES = (500, 502, 503, 504)
+
+
+def retriable_exceptions() -> tuple:
+    import httplib2
+    return (httplib2.HttpLib2Error, http.client.HTTPException, socket.timeout, ConnectionError, TimeoutError)
+
+
 class UploadAgent:
-    def __init__(self, client_secrets_path: str = None, credentials_path: str = "./youtube_credentials.pkl"):
+    def __init__(self, client_secrets_path: str = None, credentials_path: str = "./youtube_credentials.pkl",
+                 youtube=None, queue: UploadQueue | None = None, chunksize: int = UPLOAD_CHUNK_SIZE,
+                 max_retries: int = UPLOAD_MAX_RETRIES, max_backoff: float = 64.0):
         """
         :param client_secrets_path: Path to your client_secret.json
         :param credentials_path: Path to save OAuth credentials
+        :param youtube: ready-made API client (skips OAuth; e.g. one pointed at a local fake endpoint);
+                        otherwise the client is built on first use
+        :param queue: persistent upload queue (defaults to UPLOAD_QUEUE_PATH)
+        :param chunksize: bytes per resumable chunk (multiple of 256 KiB)
+        :param max_retries: consecutive transient failures tolerated per upload
+        :param max_backoff: cap in seconds for the exponential backoff
         """
         self.client_secrets = client_secrets_path
         self.credentials_path = credentials_path
-        self.youtube = self.authenticate()
+        self.queue = queue or UploadQueue()
+        self.chunksize = chunksize
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.last_upload_stats = None
+        self._youtube = youtube
+        self._authenticated = youtube is not None
+
+    @property
+    def youtube(self):
+        """YouTube API client, authenticated on first access (None if no credentials are available)."""
+        if not self._authenticated:
+            self._authenticated = True
+            self._youtube = self.authenticate()
+        return self._youtube
 
     def authenticate(self):
         """Authenticate and return YouTube API client."""
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
         creds = None
         # Load existing credentials
         if os.path.exists(self.credentials_path):
@@ -43,9 +82,12 @@ class UploadAgent:
 
         return build("youtube", "v3", credentials=creds)
 
-    def upload_video(self, video_path: str, thumbnail_path: str = None, title: str = "Untitled", description: str = "", tags: list = None, categoryId: str = "22", privacyStatus: str = "public"):
+    def upload_video(self, video_path: str, thumbnail_path: str = None, title: str = "Untitled", description: str = "", tags: list = None, categoryId: str = "22", privacyStatus: str = "public",
+                     publish_at: str = None, job_id: int = None):
         """
         Upload a video to YouTube.
+        Uses chunked resumable uploads; the session URI and acknowledged byte offset are kept in the
+        upload queue, so an interrupted upload continues where it stopped (also after a restart).
         :param video_path: Path to the video file
         :param thumbnail_path: Path to the thumbnail
         :param title: Video title
@@ -53,42 +95,182 @@ class UploadAgent:
         :param tags: List of tags
         :param categoryId: YouTube category (default 22 = People & Blogs)
         :param privacyStatus: public, unlisted, private
-        :return: video ID if uploaded, else None
+        :param publish_at: RFC 3339 time to publish at (the video is uploaded private until then)
+        :param job_id: journal job the video belongs to (kept in the queue, reported by resume_pending())
+        :return: video ID if uploaded, else None (the item stays queued if the failure was transient)
         """
         if self.youtube is None:
             logger.warning("YouTube client not initialized. Skipping upload.")
             return None
 
-        media = MediaFileUpload(video_path, chunksize=-1, resumable=True)
+        st = os.stat(video_path)
+        entry = self.queue.get(video_path)
+        if entry and (entry.get("size") != st.st_size or entry.get("mtime") != st.st_mtime):
+            entry = None  # file changed since the session was opened: start over
+        if entry is None:
+            entry = self.queue.put(
+                video_path, thumbnail_path=thumbnail_path, title=title, description=description,
+                tags=tags or [], categoryId=categoryId, privacyStatus="private" if publish_at else privacyStatus,
+                publish_at=publish_at, job_id=job_id, size=st.st_size, mtime=st.st_mtime, resumable_uri=None,
+                progress=0,
+            )
+
+        try:
+            video_id = self._upload_resumable(video_path, entry)
+        except Exception as e:
+            logger.error(f"Failed to upload video: {e}")
+            return None
+        if video_id is None:
+            return None
+
+        self.queue.remove(video_path)
+        logger.info(f"Video uploaded: https://www.youtube.com/watch?v={video_id}")
+
+        # Set thumbnail if provided
+        if thumbnail_path and os.path.exists(thumbnail_path):
+            from googleapiclient.http import MediaFileUpload
+            try:
+                self.youtube.thumbnails().set(videoId=video_id, media_body=MediaFileUpload(thumbnail_path)).execute()
+                logger.info(f"Thumbnail uploaded: {thumbnail_path}")
+            except Exception as e:
+                logger.error(f"Failed to upload thumbnail: {e}")
+
+        return video_id
+
+    def resume_pending(self, accept=None) -> list:
+        """
+        Retry every upload left in the queue (e.g. after a crash).
+        :param accept: optional callable(entry) -> bool deciding whether an entry is resumed now (e.g. quota left)
+        :return: [{"video_path", "thumbnail_path", "job_id", "publish_at", "video_id"}] of the uploads that completed
+        """
+        uploaded = []
+        for entry in self.queue.pending():
+            path = entry["video_path"]
+            if not os.path.exists(path):
+                logger.warning(f"Queued upload {path} no longer exists; dropping it.")
+                self.queue.remove(path)
+                continue
+            if "size" not in entry:
+                continue  # reserved by a scheduler but never started: its item is uploaded afresh later
+            if accept is not None and not accept(entry):
+                continue
+            logger.info(f"Resuming queued upload: {path}")
+            video_id = self.upload_video(
+                path, entry.get("thumbnail_path"), title=entry.get("title", "Untitled"),
+                description=entry.get("description", ""), tags=entry.get("tags"),
+                categoryId=entry.get("categoryId", "22"), privacyStatus=entry.get("privacyStatus", "public"),
+                publish_at=entry.get("publish_at"), job_id=entry.get("job_id"),
+            )
+            if video_id:
+                uploaded.append({"video_path": path, "thumbnail_path": entry.get("thumbnail_path"),
+                                 "job_id": entry.get("job_id"), "publish_at": entry.get("publish_at"),
+                                 "video_id": video_id})
+        return uploaded
+
+    def _build_request(self, video_path: str, entry: dict):
+        from googleapiclient.http import MediaFileUpload
+        media = MediaFileUpload(video_path, chunksize=self.chunksize, resumable=True)
+        status = {"privacyStatus": entry["privacyStatus"]}
+        if entry.get("publish_at"):
+            status["publishAt"] = entry["publish_at"]
         request = self.youtube.videos().insert(
             part="snippet,status",
             body={
                 "snippet": {
-                    "title": title,
-                    "description": description,
-                    "tags": tags or [],
-                    "categoryId": categoryId
+                    "title": entry["title"],
+                    "description": entry["description"],
+                    "tags": entry["tags"],
+                    "categoryId": entry["categoryId"]
                 },
-                "status": {
-                    "privacyStatus": privacyStatus
-                }
+                "status": status
             },
             media_body=media
         )
+        if entry.get("resumable_uri"):
+            # Reattach to the existing session; _sync_progress() asks the server where to continue
+            request.resumable_uri = entry["resumable_uri"]
+            request.resumable_progress = entry.get("progress", 0)
+        return request
 
-        response = None
-        try:
-            response = request.execute()
-            video_id = response.get("id")
-            logger.info(f"Video uploaded: https://www.youtube.com/watch?v={video_id}")
+    @staticmethod
+    def _sync_progress(request, size: int):
+        """
+        Ask the server how many bytes of the session it holds (an empty PUT with "Content-Range: bytes */size")
+        and continue from there. Returns the finished response if the server already has the whole file.
+        """
+        from googleapiclient.errors import HttpError
+        resp, content = request.http.request(request.resumable_uri, "PUT",
+                                             headers={"Content-Range": f"bytes */{size}", "Content-Length": "0"})
+        if resp.status in (200, 201):
+            return json.loads(content)
+        if resp.status != 308:
+            raise HttpError(resp, content, uri=request.resumable_uri)
+        received = resp.get("range")  # "bytes=0-N", absent when nothing arrived yet
+        request.resumable_progress = int(received.rsplit("-", 1)[1]) + 1 if received else 0
+        return None
 
-            # Set thumbnail if provided
-            if thumbnail_path and os.path.exists(thumbnail_path):
-                self.youtube.thumbnails().set(videoId=video_id, media_body=MediaFileUpload(thumbnail_path)).execute()
-                logger.info(f"Thumbnail uploaded: {thumbnail_path}")
+    def _upload_resumable(self, video_path: str, entry: dict):
+        from googleapiclient.errors import HttpError
+        retriable = retriable_exceptions()
+        request = self._build_request(video_path, entry)
+        size = entry["size"]
+        name = os.path.basename(video_path)
+        start_time = time.monotonic()
+        start_bytes = entry.get("progress", 0)
+        retries = 0
+        response = None
+        needs_sync = bool(request.resumable_uri)
+        while response is None:
+            try:
+                if needs_sync:
+                    response = self._sync_progress(request, size)
+                    needs_sync = False
+                    entry = self.queue.put(video_path, progress=request.resumable_progress)
+                    if response is not None:
+                        break
+                status, response = request.next_chunk()
+            except HttpError as e:
+                if e.resp.status in (404, 410) and entry.get("resumable_uri"):
+                    # Session expired on the server: open a fresh one
+                    logger.warning(f"Upload session for {name} expired; restarting from byte 0.")
+                    entry = self.queue.put(video_path, resumable_uri=None, progress=0)
+                    request = self._build_request(video_path, entry)
+                    needs_sync = False
+                    start_bytes = 0
+                    continue
+                if e.resp.status not in RETRIABLE_STATUS_CODES:
+                    self.queue.remove(video_path)
+                    raise
+                error = e
+            except retriable as e:
+                error = e
+            else:
+                error = None
+                retries = 0
+                if request.resumable_uri and request.resumable_uri != entry.get("resumable_uri"):
+                    entry = self.queue.put(video_path, resumable_uri=request.resumable_uri)
+                if status is not None:
+                    entry = self.queue.put(video_path, progress=status.resumable_progress)
+                    elapsed = max(time.monotonic() - start_time, 1e-6)
+                    rate = (status.resumable_progress - start_bytes) / elapsed / (1024 * 1024)
+                    logger.info(f"Uploading {name}: {status.progress() * 100:.0f}% ({rate:.2f} MB/s)")
 
-            return video_id
+            if error is not None:
+                retries += 1
+                if retries > self.max_retries:
+                    logger.error(f"Giving up on {name} for now after {self.max_retries} retries: {error}")
+                    self.queue.put(video_path, resumable_uri=request.resumable_uri, attempts=entry.get("attempts", 0) + 1)
+                    return None
+                delay = min(self.max_backoff, (2 ** (retries - 1)) + random.random())
+                logger.warning(f"Upload of {name} interrupted ({error}); retry {retries}/{self.max_retries} in {delay:.1f}s")
+                # Remember the session so a restart can resume it, then ask the server where to continue
+                entry = self.queue.put(video_path, resumable_uri=request.resumable_uri)
+                needs_sync = bool(request.resumable_uri)
+                time.sleep(delay)
 
-        except Exception as e:
-            logger.error(f"Failed to upload video: {e}")
-            return None
+        elapsed = max(time.monotonic() - start_time, 1e-6)
+        sent = size - start_bytes
+        self.last_upload_stats = {"bytes": size, "bytes_sent": sent, "seconds": round(elapsed, 2),
+                                  "mb_per_s": round(sent / elapsed / (1024 * 1024), 3)}
+        logger.info(f"Upload of {name} finished: {self.last_upload_stats}")
+        return response.get("id")
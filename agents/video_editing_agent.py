@@ -1,124 +1,252 @@
 """
 VideoEditorAgent — creates a vertical 1080x1920, 30s video.
 - Displays each caption as a full-screen slide for equal intervals.
-- Optionally overlays a background music track if present in assets.
+- Optionally overlays a background music track if present in assets
+  (prepared music beds are muxed with stream copy and rotate between renders).
 - Works on Windows without ImageMagick (uses PIL + ImageClip).
+- Default "ffmpeg" engine encodes each static slide once; "moviepy" (imported only when used)
+  composes every frame.
+- Optional caption effects (fade, zoom, typewriter) are composited with NumPy and
+  piped to the encoder as raw frames.
 """
 import os
-from moviepy.editor import ImageClip, concatenate_videoclips, AudioFileClip, afx
-from PIL import Image, ImageDraw, ImageFont
-from config import VIDEO_WIDTH, VIDEO_HEIGHT, VIDEO_DURATION_SECONDS, FPS, BG_MUSIC_DIR, OUTPUT_DIR
-from utils.file_manager import ensure_dirs
+import tempfile
+import time
+import uuid
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw
+from config import VIDEO_WIDTH, VIDEO_HEIGHT, VIDEO_DURATION_SECONDS, FPS, BG_MUSIC_DIR, OUTPUT_DIR, RENDER_ENGINE, RENDER_CACHE_MAX_MB, CAPTION_EFFECTS, ENCODER_PROFILE
+from services.ffmpeg_service import encode_still_segment, encode_raw_frames, concat_segments, encoder_profile
+from services.music_beds import MusicBeds
+from utils.frame_compositor import CaptionCompositor, parse_effects, typewriter_ranks
+from utils.logger import logger
+from utils.render_cache import RenderCache, make_key
+from utils.text_layout import get_font, layout_lines
 from utils.time_utils import timestamp_now
 
-ensure_dirs()  # make sure OUTPUT_DIR/videos exists
-
 class VideoEditorAgent:
-    def __init__(self, font_path: str = "C:\\Windows\\Fonts\\arial.ttf"):
+    FONT_SIZE = 90
+    BG_COLOR = (18, 18, 18)
+    TEXT_COLOR = "white"
+
+    def __init__(self, font_path: str = "C:\\Windows\\Fonts\\arial.ttf", engine: str = RENDER_ENGINE, cache: RenderCache | None = None,
+                 effects=CAPTION_EFFECTS, profile: str = ENCODER_PROFILE, parallel: int = 1):
         """
         :param font_path: Full path to a TrueType font file (Windows example: arial.ttf)
+        :param engine: "ffmpeg" (encode each static slide once, then concat) or "moviepy" (per-frame compose)
+        :param cache: slide/segment cache; defaults to the shared disk cache (disabled when RENDER_CACHE_MAX_MB=0)
+        :param effects: caption effects, e.g. "fade,zoom" or ("typewriter",); empty for static slides
+        :param profile: encoder profile name ("draft", "balanced", "publish")
+        :param parallel: renders running side by side on this host (the encoder's threads are split between them)
         """
+        if engine not in ("ffmpeg", "moviepy"):
+            raise ValueError(f"Unknown render engine: {engine}")
+        self.engine = engine
+        self.effects = parse_effects(effects)
+        self.profile = encoder_profile(profile, parallel)
         if not os.path.exists(font_path):
             raise FileNotFoundError(f"Font not found at {font_path}. Provide a valid TTF font path.")
         self.font_path = font_path
+        if cache is None and RENDER_CACHE_MAX_MB > 0:
+            cache = RenderCache()
+        self.cache = cache
+        self.music_beds = MusicBeds()
 
-    def create_image_clip(self, text: str, duration: float) -> ImageClip:
+    def render_slide(self, text: str) -> Image.Image:
         """
-        Create a single ImageClip with text centered on a background.
+        Render a caption centered on a background as a PIL image.
         """
         # Create black background image
-        img = Image.new("RGB", (VIDEO_WIDTH, VIDEO_HEIGHT), color=(18, 18, 18))
+        img = Image.new("RGB", (VIDEO_WIDTH, VIDEO_HEIGHT), color=self.BG_COLOR)
         draw = ImageDraw.Draw(img)
-
-        # Load font
-        font_size = 90
-        font = ImageFont.truetype(self.font_path, font_size)
-
-        # Wrap text if too long (simple word wrap)
+        font, positions = self._caption_positions(text)
+        for line, x, y in positions:
+            draw.text((x, y), line, font=font, fill=self.TEXT_COLOR)
+        return img
+
+    def _caption_positions(self, text: str) -> tuple:
+        """Font and [(line, x, y)] draw positions for a caption, centered on the frame."""
+        # Load font (cached per process)
+        font_size = self.FONT_SIZE
+        font = get_font(self.font_path, font_size)
+
+        # Wrap text if too long (simple word wrap, each word measured once)
         max_width = VIDEO_WIDTH - 120
-        lines = []
-        words = text.split()
-        current_line = ""
-        for word in words:
-            test_line = current_line + (" " if current_line else "") + word
-            bbox = draw.textbbox((0, 0), test_line, font=font)
-            w = bbox[2] - bbox[0]
-            if w <= max_width:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = word
-        if current_line:
-            lines.append(current_line)
+        lines = layout_lines(text, font, max_width)
 
         # Compute total text height for vertical centering
-        line_heights = []
-        for line in lines:
-            bbox = draw.textbbox((0, 0), line, font=font)
-            line_heights.append(bbox[3] - bbox[1])
-        total_text_height = sum(line_heights) + (len(lines) - 1) * font_size * 0.2
+        total_text_height = sum(h for _, _, h in lines) + (len(lines) - 1) * font_size * 0.2
 
+        positions = []
         y = (VIDEO_HEIGHT - total_text_height) / 2
-        for i, line in enumerate(lines):
-            bbox = draw.textbbox((0, 0), line, font=font)
-            w = bbox[2] - bbox[0]
-            h = bbox[3] - bbox[1]
-            x = (VIDEO_WIDTH - w) / 2
-            draw.text((x, y), line, font=font, fill="white")
+        for line, w, h in lines:
+            positions.append((line, (VIDEO_WIDTH - w) / 2, y))
             y += h * 1.2  # line spacing
+        return font, positions
 
-        # Save temporary image
-        temp_path = os.path.join(OUTPUT_DIR, "temp_slide.png")
-        img.save(temp_path)
-
-        # Load as ImageClip
-        clip = ImageClip(temp_path).set_duration(duration)
-        return clip
-
-    def create_video(self, captions: list, audio_path: str | None = None) -> str:
+    def compositor(self, text: str, duration: float) -> CaptionCompositor:
+        """
+        Animated-caption compositor for a slide: the glyph coverage (and typewriter reveal order)
+        is rendered once here; the compositor then produces every frame with array operations.
+        """
+        font, positions = self._caption_positions(text)
+        glyphs = Image.new("L", (VIDEO_WIDTH, VIDEO_HEIGHT), 0)
+        draw = ImageDraw.Draw(glyphs)
+        for line, x, y in positions:
+            draw.text((x, y), line, font=font, fill=255)
+        ranks, n_chars = None, 0
+        if "typewriter" in self.effects:
+            ranks, n_chars = typewriter_ranks(positions, font, (VIDEO_WIDTH, VIDEO_HEIGHT))
+        return CaptionCompositor(np.asarray(glyphs), self.BG_COLOR, ImageColor.getrgb(self.TEXT_COLOR), duration, FPS,
+                                 effects=self.effects, ranks=ranks, n_chars=n_chars)
+
+    def _slide_key(self, text: str) -> str:
+        return make_key(kind="slide", text=text, font=self.font_path, size=self.FONT_SIZE,
+                        resolution=(VIDEO_WIDTH, VIDEO_HEIGHT), bg=self.BG_COLOR, fg=self.TEXT_COLOR)
+
+    def _cached_slide_png(self, text: str, tmp_dir: str) -> str:
+        """
+        Return a PNG path for the slide: the cached copy on a hit, else render it
+        (into the cache if enabled, otherwise into tmp_dir).
+        """
+        key = self._slide_key(text)
+        if self.cache:
+            hit = self.cache.get("slide", key, "png")
+            if hit:
+                return hit
+        start = time.perf_counter()
+        png_path = os.path.join(tmp_dir, f"slide_{key[:16]}.png")
+        self.render_slide(text).save(png_path, compress_level=1)
+        if self.cache:
+            return self.cache.put("slide", key, "png", png_path, time.perf_counter() - start)
+        return png_path
+
+    def slide_frame(self, text: str) -> np.ndarray:
+        """
+        RGB frame for a caption. Goes straight from PIL to NumPy (no temp file on disk);
+        with the cache enabled, previously rendered slides are loaded instead.
+        """
+        if not self.cache:
+            return np.asarray(self.render_slide(text))
+        key = self._slide_key(text)
+        hit = self.cache.get("slide", key, "png")
+        if hit:
+            with Image.open(hit) as img:
+                return np.asarray(img.convert("RGB"))
+        start = time.perf_counter()
+        img = self.render_slide(text)
+        fd, tmp_path = tempfile.mkstemp(suffix=".png", dir=self.cache.root)
+        os.close(fd)
+        img.save(tmp_path, compress_level=1)
+        self.cache.put("slide", key, "png", tmp_path, time.perf_counter() - start)
+        return np.asarray(img)
+
+    def create_image_clip(self, text: str, duration: float):
+        """
+        Create a single ImageClip with text centered on a background
+        (a VideoClip driven by the compositor when caption effects are enabled).
+        """
+        from moviepy.editor import ImageClip, VideoClip
+        if self.effects:
+            return VideoClip(self.compositor(text, duration).frame_at, duration=duration)
+        return ImageClip(self.slide_frame(text)).set_duration(duration)
+
+    def _segment(self, text: str, frames: int, tmp_dir: str) -> str:
+        """Encoded segment for a caption (still, or animated when effects are on), reused from the cache when possible."""
+        codec = {k: v for k, v in self.profile.items() if k != "threads"}  # threads don't change the output
+        key = make_key(kind="segment", slide=self._slide_key(text), frames=frames, fps=FPS,
+                       effects=self.effects, codec="libx264", pix_fmt="yuv420p", **codec)
+        if self.cache:
+            hit = self.cache.get("segment", key, "mp4")
+            if hit:
+                return hit
+        start = time.perf_counter()
+        seg_path = os.path.join(tmp_dir, f"seg_{key[:16]}.mp4")
+        if self.effects:
+            comp = self.compositor(text, frames / FPS)
+            encode_raw_frames(comp.frames(frames), seg_path, VIDEO_WIDTH, VIDEO_HEIGHT, FPS, self.profile)
+        else:
+            slide_path = self._cached_slide_png(text, tmp_dir)
+            start = time.perf_counter()
+            encode_still_segment(slide_path, seg_path, frames, FPS, self.profile)
+        if self.cache:
+            return self.cache.put("segment", key, "mp4", seg_path, time.perf_counter() - start)
+        return seg_path
+
+    def create_video(self, captions: list, audio_path: str | None = None, durations: list | None = None,
+                     out_path: str | None = None) -> str:
         """
         Create a vertical video from a list of captions.
         :param captions: list of strings to display
-        :param audio_path: optional path to background audio
+        :param audio_path: optional path to background audio (or narration)
+        :param durations: optional seconds per caption (e.g. narration timings); default splits
+                          VIDEO_DURATION_SECONDS evenly
+        :param out_path: where to write the video (default: a new file in OUTPUT_DIR/videos)
         :return: output video path
         """
-        n = max(1, len(captions))
-        per = VIDEO_DURATION_SECONDS / n
-
-        clips = [self.create_image_clip(caption, per) for caption in captions]
+        if durations and len(durations) == len(captions):
+            durations = [max(float(d), 1.0 / FPS) for d in durations]
+        else:
+            n = max(1, len(captions))
+            durations = [VIDEO_DURATION_SECONDS / n] * len(captions)
+        out_path = out_path or os.path.join(OUTPUT_DIR, "videos", f"short_{timestamp_now()}_{uuid.uuid4().hex[:8]}.mp4")
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+        if self.engine == "ffmpeg":
+            return self._create_video_ffmpeg(captions, durations, audio_path, out_path)
+        return self._create_video_moviepy(captions, durations, audio_path, out_path)
+
+    def _pick_audio(self, audio_path: str | None, duration: float = VIDEO_DURATION_SECONDS) -> tuple[str | None, float, bool]:
+        """
+        Return (path, volume, ready) for the audio track to use: the provided audio at full volume,
+        else the next prepared music bed of this duration (ready=True: already looped, normalized
+        and attenuated, so it can be muxed as-is), else the first raw background track at 25%.
+        """
+        if audio_path and os.path.exists(audio_path):
+            return audio_path, 1.0, False
+        bed = self.music_beds.next_bed(duration)
+        if bed:
+            return bed, 1.0, True
+        if os.path.exists(BG_MUSIC_DIR):
+            music_files = [f for f in os.listdir(BG_MUSIC_DIR) if f.endswith((".mp3", ".wav"))]
+            if music_files:
+                return os.path.join(BG_MUSIC_DIR, music_files[0]), 0.25, False
+        return None, 1.0, False
+
+    def _create_video_moviepy(self, captions: list, durations: list, audio_path: str | None, out_path: str) -> str:
+        from moviepy.editor import concatenate_videoclips
+        clips = [self.create_image_clip(caption, d) for caption, d in zip(captions, durations)]
 
         # Concatenate all clips
         final_video = concatenate_videoclips(clips, method="compose")
 
-        # Attach provided audio if available
-        if audio_path and os.path.exists(audio_path):
-            try:
-                bg_audio = AudioFileClip(audio_path).fx(afx.audio_loop, duration=VIDEO_DURATION_SECONDS)
-                final_video = final_video.set_audio(bg_audio)
-            except Exception as e:
-                print("Warning: failed to attach provided audio:", e)
-
-        # Otherwise use first available default background music
-        elif os.path.exists(BG_MUSIC_DIR):
-            try:
-                music_files = [f for f in os.listdir(BG_MUSIC_DIR) if f.endswith((".mp3", ".wav"))]
-                if music_files:
-                    music_path = os.path.join(BG_MUSIC_DIR, music_files[0])
-                    bg_music = AudioFileClip(music_path).fx(afx.audio_loop, duration=VIDEO_DURATION_SECONDS).volumex(0.25)
-                    final_video = final_video.set_audio(bg_music)
-            except Exception as e:
-                print("Warning: failed to attach default background music:", e)
-
-        # Export final video
-        out_path = os.path.join(OUTPUT_DIR, "videos", f"short_{timestamp_now()}.mp4")
-        final_video.write_videofile(
-            out_path,
-            fps=FPS,
-            codec="libx264",
-            audio_codec="aac",
-            threads=4,
-            preset="medium"
-        )
+        # Export: frames are piped straight into ffmpeg, which muxes the provided audio
+        # or default background music in the same pass (no moviepy temp audio file)
+        track, volume, ready = self._pick_audio(audio_path, sum(durations))
+        self._log_cache_stats()
+        logger.info(f"Encoding {out_path} ({self.profile['name']} profile)")
+        encode_raw_frames(final_video.iter_frames(fps=FPS, dtype="uint8"), out_path, VIDEO_WIDTH, VIDEO_HEIGHT, FPS,
+                          self.profile, audio_path=track, duration=final_video.duration,
+                          audio_volume=volume, audio_copy=ready)
 
         return out_path
+
+    def _create_video_ffmpeg(self, captions: list, durations: list, audio_path: str | None, out_path: str) -> str:
+        """
+        Static-slide fast path: each caption is encoded once as a still-image segment
+        (or an animated one, from frames piped straight into the encoder), then the segments are joined with the concat demuxer (stream copy) and the audio muxed in.
+        """
+        frames = [max(1, round(d * FPS)) for d in durations]
+        with tempfile.TemporaryDirectory(dir=OUTPUT_DIR) as tmp:
+            segments = [self._segment(caption, f, tmp) for caption, f in zip(captions, frames)]
+
+            total = sum(frames) / FPS
+            track, volume, ready = self._pick_audio(audio_path, total)
+            concat_segments(segments, out_path, audio_path=track, duration=total, audio_volume=volume, audio_copy=ready)
+        self._log_cache_stats()
+
+        return out_path
+
+    def _log_cache_stats(self):
+        if self.cache:
+            logger.info(f"Render cache: {self.cache.stats()}")
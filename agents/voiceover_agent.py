@@ -1,11 +1,34 @@
 """
-VoiceoverAgent — Not used in Quotes-on-screen format. Included for compatibility.
-It returns None to indicate no audio narration; video editor will optionally add background music.
+VoiceoverAgent — Not used in Quotes-on-screen format by default (NARRATION_ENABLED=1 turns it on).
+When disabled it returns None to indicate no audio narration; video editor will optionally add background music.
+When enabled each caption is narrated (sentences synthesized in parallel and cached), and
+generate_voice_timed() also returns how long each caption is spoken so slides can match it.
 """
+from config import NARRATION_ENABLED
+from utils.logger import logger
+
 class VoiceoverAgent:
-    def __init__(self):
-        pass
+    def __init__(self, enabled: bool = NARRATION_ENABLED, engine=None):
+        """
+        :param enabled: narrate captions (otherwise quotes-only, no audio)
+        :param engine: TTS engine from services.tts_service (default: picked from env)
+        """
+        self.enabled = enabled
+        self.engine = engine
 
     def generate_voice(self, script_lines:list):
+        return self.generate_voice_timed(script_lines)[0]
+
+    def generate_voice_timed(self, script_lines: list):
+        """
+        :return: (audio path, seconds per caption), or (None, None) when narration is disabled
+        """
         # No narration for quotes-only short.
-        return None
\ No newline at end of file
+        if not self.enabled:
+            return None, None
+        from services.tts_service import synthesize_sentences
+        lines = [str(l) for l in script_lines if str(l).strip()]
+        path, timings = synthesize_sentences(lines, engine=self.engine)
+        durations = [t['end'] - t['start'] for t in timings]
+        logger.info(f"Narration: {len(lines)} captions, {sum(durations):.1f}s")
+        return str(path), durations
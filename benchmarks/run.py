@@ -0,0 +1,323 @@
+"""
+Offline benchmarks for the render hot paths.
+- Uses the bundled DejaVu font and seeded synthetic captions, no network, no API keys;
+  everything is written to a throwaway OUTPUT_DIR with the render cache disabled.
+- Measures slide raster time, ImageClip creation, thumbnails, full 30s encodes (frames/sec,
+  output size), caption-effect compositing, and batch throughput at 1/2/4/N worker processes.
+- Peak memory per benchmark comes from utils.metrics (this process, and the largest child such as ffmpeg).
+- Results are written as JSON; --baseline/--compare flag metrics that regressed beyond --threshold.
+
+    python -m benchmarks.run                          # full suite -> benchmarks/results/<timestamp>.json
+    python -m benchmarks.run --quick --only raster,encode
+    python -m benchmarks.run --save-baseline          # also store as benchmarks/baseline.json (per machine)
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # run, then compare (exit 1 on regression)
+    python -m benchmarks.run --compare old.json new.json           # compare two result files
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+FONT_PATH = os.path.join(BENCH_DIR, "fonts", "DejaVuSans.ttf")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+BENCHMARKS = ("raster", "clip", "thumbnail", "encode", "effects", "batch")
+
+# Metrics where larger numbers are better; everything else numeric is treated as lower-is-better
+HIGHER_IS_BETTER = ("_per_sec", "_per_min", "fps")
+# Descriptive fields that are not compared
+NOT_COMPARED = ("items", "workers", "frames", "repeat", "slides", "captions", "peak_rss_scope")
+
+_WORDS = (
+    "ocean honey ancient octopus hearts blue blood tower stars galaxy trees planet light years "
+    "volcano desert island river mountain sharks bones brain memory sleep coffee moon sun ice "
+    "diamonds rain thunder bees ants whales elephants penguins glass paper silk gold copper"
+).split()
+
+
+def synthetic_captions(n: int = 5, seed: int = 7) -> list:
+    """Deterministic fact-like captions of 4-9 words."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 9))).capitalize() for _ in range(n)]
+
+
+def _setup_env(output_dir: str):
+    """Point the app at a scratch OUTPUT_DIR with caching/narration off (before any project import)."""
+    os.environ["OUTPUT_DIR"] = output_dir
+    os.environ["RENDER_CACHE_MAX_MB"] = "0"
+    os.environ["NARRATION_ENABLED"] = "0"
+    os.environ["CAPTION_EFFECTS"] = ""
+    os.environ["METRICS_PROM_FILE"] = ""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+def _timed(fn, repeat: int) -> list:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+# -- benchmarks (each returns a dict of metrics) --
+
+def bench_raster(args) -> dict:
+    from agents.video_editing_agent import VideoEditorAgent
+    from utils import text_layout
+    agent = VideoEditorAgent(font_path=FONT_PATH, cache=None)
+    captions = synthetic_captions(args.captions)
+
+    def run():
+        # Cold layout each round: production captions are new text every time
+        text_layout.layout_lines.cache_clear()
+        text_layout.text_width.cache_clear()
+        text_layout.text_bbox.cache_clear()
+        for c in captions:
+            agent.render_slide(c)
+
+    times = _timed(run, args.repeat)
+    per_slide = min(times) / len(captions)
+    return {"slides": len(captions), "ms_per_slide": round(per_slide * 1000, 2),
+            "ms_per_slide_median": round(statistics.median(times) / len(captions) * 1000, 2),
+            "slides_per_sec": round(1 / per_slide, 2)}
+
+
+def bench_clip(args) -> dict:
+    from agents.video_editing_agent import VideoEditorAgent
+    agent = VideoEditorAgent(font_path=FONT_PATH, cache=None)
+    captions = synthetic_captions(args.captions)
+    times = _timed(lambda: [agent.create_image_clip(c, 6) for c in captions], args.repeat)
+    return {"captions": len(captions), "ms_per_clip": round(min(times) / len(captions) * 1000, 2),
+            "ms_per_clip_median": round(statistics.median(times) / len(captions) * 1000, 2)}
+
+
+def bench_thumbnail(args) -> dict:
+    from agents.thumbnail_agent import ThumbnailAgent
+    agent = ThumbnailAgent(font_path=FONT_PATH)
+    captions = synthetic_captions(args.captions)
+    n = 10
+    times = _timed(lambda: [agent.create_thumbnail(captions, captions[0]) for _ in range(n)], args.repeat)
+    return {"items": n, "ms_per_thumbnail": round(min(times) / n * 1000, 2),
+            "ms_per_thumbnail_median": round(statistics.median(times) / n * 1000, 2)}
+
+
+def _encode(args, engine: str, effects: str = "") -> dict:
+    from agents.video_editing_agent import VideoEditorAgent
+    from config import FPS
+    agent = VideoEditorAgent(font_path=FONT_PATH, cache=None, engine=engine, effects=effects, profile=args.profile)
+    captions = synthetic_captions(args.captions)
+    durations = [args.duration / len(captions)] * len(captions)
+    outputs = []
+    times = _timed(lambda: outputs.append(agent.create_video(captions, durations=durations)), args.repeat)
+    frames = round(args.duration * FPS)
+    return {"frames": frames, "seconds": round(min(times), 3), "seconds_median": round(statistics.median(times), 3),
+            "fps": round(frames / min(times), 1), "output_bytes": os.path.getsize(outputs[-1])}
+
+
+def bench_encode(args) -> dict:
+    results = {"ffmpeg": _encode(args, "ffmpeg")}
+    if args.moviepy:
+        results["moviepy"] = _encode(args, "moviepy")
+    return results
+
+
+def bench_effects(args) -> dict:
+    from agents.video_editing_agent import VideoEditorAgent
+    from config import FPS
+    effects = "fade,zoom,typewriter"
+    agent = VideoEditorAgent(font_path=FONT_PATH, cache=None, effects=effects)
+    caption = synthetic_captions(1)[0]
+    seconds = args.duration / args.captions
+    frames = round(seconds * FPS)
+
+    def compose():
+        comp = agent.compositor(caption, seconds)
+        for _ in comp.frames(frames):
+            pass
+
+    times = _timed(compose, args.repeat)
+    return {"compose": {"frames": frames, "fps": round(frames / min(times), 1),
+                        "ms_per_frame": round(min(times) / frames * 1000, 3)},
+            "encode": _encode(args, "ffmpeg", effects)}
+
+
+_batch_agents = None
+
+
+def _batch_init(output_dir: str, profile: str, workers: int):
+    global _batch_agents
+    _setup_env(output_dir)
+    from agents.video_editing_agent import VideoEditorAgent
+    from agents.thumbnail_agent import ThumbnailAgent
+    _batch_agents = (VideoEditorAgent(font_path=FONT_PATH, cache=None, profile=profile, parallel=workers), ThumbnailAgent(font_path=FONT_PATH))
+
+
+def _batch_item(job: tuple) -> str:
+    seed, n_captions, duration = job
+    video_agent, thumb_agent = _batch_agents
+    captions = synthetic_captions(n_captions, seed)
+    thumb_agent.create_thumbnail(captions, captions[0])
+    return video_agent.create_video(captions, durations=[duration / n_captions] * n_captions)
+
+
+def bench_batch(args) -> dict:
+    from concurrent.futures import ProcessPoolExecutor
+    cores = os.cpu_count() or 1
+    results = {}
+    for workers in sorted({1, 2, 4, cores}):
+        items = max(args.batch_items, workers)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_batch_init,
+                                 initargs=(os.environ["OUTPUT_DIR"], args.profile, workers)) as pool:
+            list(pool.map(_batch_item, [(seed, args.captions, args.duration) for seed in range(items)]))
+        elapsed = time.perf_counter() - start
+        results[f"workers_{workers}"] = {"workers": workers, "items": items, "seconds": round(elapsed, 3),
+                                         "shorts_per_min": round(items / elapsed * 60, 2)}
+    return results
+
+
+def run_suite(args) -> dict:
+    from utils.metrics import Metrics
+    metrics = Metrics(jsonl_path=None, prom_path=None)
+    selected = args.only.split(",") if args.only else BENCHMARKS
+    results = {}
+    for name in selected:
+        print(f"[bench] {name} ...", flush=True)
+        with metrics.stage(name) as rec:
+            values = globals()[f"bench_{name}"](args)
+        values["memory"] = {"peak_rss_bytes": rec["peak_rss_bytes"], "peak_rss_scope": rec["peak_rss_scope"],
+                            "child_peak_rss_bytes": rec["child_peak_rss_bytes"]}
+        results[name] = values
+    return results
+
+
+def environment() -> dict:
+    from services.ffmpeg_service import ffmpeg_binary
+    import numpy
+    import PIL
+    try:
+        ffmpeg_version = subprocess.run([ffmpeg_binary(), "-version"], capture_output=True, text=True).stdout.split("\n")[0]
+    except OSError:
+        ffmpeg_version = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "numpy": numpy.__version__, "pillow": PIL.__version__, "ffmpeg": ffmpeg_version, "commit": commit or None}
+
+
+# -- comparison --
+
+def _flatten(d: dict, prefix: str = "") -> dict:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            out.update(_flatten(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool) and k not in NOT_COMPARED:
+            out[key] = v
+    return out
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Metrics that got worse by more than threshold (a fraction), as (metric, old, new, change) tuples."""
+    old, new = _flatten(baseline["results"]), _flatten(current["results"])
+    regressions = []
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        if not a:
+            continue
+        change = (b - a) / a
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        flag = "REGRESSION" if worse > threshold else ""
+        print(f"  {key:<48} {a:>12.6g} -> {b:<12.6g} {change:+7.1%} {flag}")
+        if flag:
+            regressions.append((key, a, b, change))
+    return regressions
+
+
+def _load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _report(regressions: list, threshold: float) -> int:
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {threshold:.0%}")
+        return 1
+    print(f"No regressions beyond {threshold:.0%}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render/pipeline benchmarks")
+    parser.add_argument("--only", help=f"comma-separated subset of: {','.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="short videos and one repeat (smoke run)")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions per timing (best is reported)")
+    parser.add_argument("--duration", type=float, default=30.0, help="video length in seconds")
+    parser.add_argument("--captions", type=int, default=5, help="captions per video")
+    parser.add_argument("--batch-items", type=int, default=4, help="minimum shorts per batch measurement")
+    parser.add_argument("--profile", default="publish", help="encoder profile for the encode/batch benchmarks")
+    parser.add_argument("--moviepy", action="store_true", help="also time the moviepy engine (slow)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write the results to {BASELINE_PATH}")
+    parser.add_argument("--baseline", help="after running, compare against this result file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    # Fail before a long run rather than after it
+    missing = [p for p in (args.compare or []) + ([args.baseline] if args.baseline else []) if not os.path.isfile(p)]
+    if missing:
+        parser.error(f"no such result file: {', '.join(missing)} (record a baseline on this machine with --save-baseline)")
+
+    if args.compare:
+        print(f"Comparing {args.compare[1]} against {args.compare[0]}")
+        return _report(compare(_load(args.compare[0]), _load(args.compare[1]), args.threshold), args.threshold)
+
+    if args.quick:
+        args.repeat, args.duration, args.batch_items = 1, min(args.duration, 6.0), 2
+    unknown = set(args.only.split(",")) - set(BENCHMARKS) if args.only else set()
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    scratch = tempfile.mkdtemp(prefix="ytbench_")
+    _setup_env(scratch)
+    try:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "settings": {k: getattr(args, k) for k in ("repeat", "duration", "captions", "batch_items", "profile", "quick")},
+            "environment": environment(),
+            "results": run_suite(args),
+        }
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    out = args.output or os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    paths = [out] + ([BASELINE_PATH] if args.save_baseline else [])
+    for path in paths:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {path}")
+
+    if args.baseline:
+        print(f"Comparing against {args.baseline}")
+        return _report(compare(_load(args.baseline), report, args.threshold), args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,8 +5,91 @@ VIDEO_DURATION_SECONDS = 30  # target duration for shorts
 VIDEO_WIDTH = 1080
 VIDEO_HEIGHT = 1920
 FPS = 24
+NARRATION_ENABLED = os.getenv('NARRATION_ENABLED','0') == '1'  # speak captions instead of quotes-only
+RENDER_ENGINE = os.getenv('RENDER_ENGINE', 'ffmpeg')  # 'ffmpeg' (static-slide fast path) or 'moviepy'
+CAPTION_EFFECTS = os.getenv('CAPTION_EFFECTS', '')  # comma-separated: fade, zoom, typewriter (empty = static slides)
+ENCODER_PROFILE = os.getenv('ENCODER_PROFILE', 'publish')  # x264 speed/quality: 'draft', 'balanced' or 'publish'
+ENCODER_THREADS = int(os.getenv('ENCODER_THREADS', '0'))  # encoder threads per ffmpeg process; 0 = host core count
 
 # Paths
 ASSETS_DIR = os.path.join(os.getcwd(),'assets')
 STOCK_VIDEOS_DIR = os.path.join(ASSETS_DIR,'stock_videos')
-BG_MUSIC_DIR = os.path.join(ASSETS_DIR,'background_music')
\ No newline at end of file
+BG_MUSIC_DIR = os.path.join(ASSETS_DIR,'background_music')
+# Pre-looped, normalized AAC beds built from BG_MUSIC_DIR (python main.py --prepare-music)
+MUSIC_BEDS_DIR = os.path.join(OUTPUT_DIR,'cache','music_beds')
+
+# Render cache (rendered slides + encoded segments), LRU-evicted above the size cap; 0 disables it
+RENDER_CACHE_DIR = os.path.join(OUTPUT_DIR,'cache','render')
+RENDER_CACHE_MAX_MB = int(os.getenv('RENDER_CACHE_MAX_MB','2048'))
+
+# Uploads: resumable chunk size (multiple of 256 KiB), retries per upload, and the pending-upload queue
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_MB','8')) * 1024 * 1024
+UPLOAD_MAX_RETRIES = int(os.getenv('UPLOAD_MAX_RETRIES','8'))
+UPLOAD_QUEUE_PATH = os.path.join(OUTPUT_DIR,'upload_queue.sqlite')  # an upload_queue.json from older versions is imported
+
+# Topic sampling cursor (which seed facts are used in the current cycle)
+TOPIC_STATE_PATH = os.path.join(OUTPUT_DIR,'used_topics.json')
+
+# Near-duplicate index (MinHash LSH) of published topics; one found at data/near_dup.sqlite is moved here
+NEAR_DUP_DB = os.path.join(OUTPUT_DIR,'near_dup.sqlite')
+NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD','0.5'))
+
+# LLM client: response cache, outgoing request limit (for all processes sharing the cache file together),
+# and concurrency for batched calls
+LLM_CACHE_DB = os.path.join(OUTPUT_DIR,'cache','llm_cache.sqlite')
+LLM_CALLS_PER_MINUTE = int(os.getenv('LLM_CALLS_PER_MINUTE','30'))
+LLM_MAX_WORKERS = int(os.getenv('LLM_MAX_WORKERS','4'))
+
+# Stage metrics: JSON-lines records, plus an optional Prometheus textfile (e.g. for node-exporter's textfile collector)
+METRICS_JSONL = os.path.join(OUTPUT_DIR,'metrics','stages.jsonl')
+METRICS_PROM_FILE = os.getenv('METRICS_PROM_FILE','')
+
+# Daemon mode: job spool directory (incoming/processing/done/failed) and idle poll interval
+SPOOL_DIR = os.getenv('SPOOL_DIR', os.path.join(OUTPUT_DIR,'spool'))
+DAEMON_POLL_SECONDS = float(os.getenv('DAEMON_POLL_SECONDS','2'))
+
+# Job journal: per-item step state, artifacts and timings, so restarts resume instead of redoing work
+JOB_JOURNAL_DB = os.path.join(OUTPUT_DIR,'jobs.sqlite')
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS','3'))
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS','3600'))  # a claimed job is handed out again once this passes without progress
+
+# Artifact store: finished videos/thumbnails named by job id + content hash, sharded by date and hash prefix
+ARTIFACTS_DIR = os.path.join(OUTPUT_DIR,'artifacts')
+ARTIFACT_BUDGET_MB = int(os.getenv('ARTIFACT_BUDGET_MB','20480'))  # uploaded assets are pruned above this
+
+# Trending-topic ingester: fact sources (comma-separated URLs, or a JSON list in the sources file),
+# the facts file it appends to, its HTTP validator cache and fetch concurrency
+TREND_SOURCES = os.getenv('TREND_SOURCES','')
+TREND_SOURCES_FILE = os.getenv('TREND_SOURCES_FILE', os.path.join('data','trend_sources.json'))
+TRENDING_TOPICS_PATH = os.path.join('data','trending_topics.json')
+TREND_CACHE_PATH = os.path.join(OUTPUT_DIR,'cache','trend_http.json')
+TREND_MAX_WORKERS = int(os.getenv('TREND_MAX_WORKERS','4'))
+TREND_MAX_BYTES = int(os.getenv('TREND_MAX_BYTES', str(5 * 1024 * 1024)))  # per page; the rest is not read
+TREND_MAX_SECONDS = float(os.getenv('TREND_MAX_SECONDS','60'))  # per page, however slowly it trickles in
+
+# SEO keyword index: built offline from data/keywords.json and the topic corpus, cached compiled
+KEYWORDS_PATH = os.path.join('data','keywords.json')
+KEYWORD_INDEX_PATH = os.path.join(OUTPUT_DIR,'cache','keyword_index.json')
+SEO_MAX_TAGS = int(os.getenv('SEO_MAX_TAGS','12'))
+
+# Multi-channel uploads: channel list (credentials, daily quota, concurrency, publish slots) and the
+# persistent quota/slot ledger; publish slots closer than PUBLISH_LEAD_MINUTES are skipped
+YOUTUBE_CHANNELS_FILE = os.getenv('YOUTUBE_CHANNELS_FILE','channels.json')
+UPLOAD_QUOTA_STATE = os.path.join(OUTPUT_DIR,'upload_quota.sqlite')  # an upload_quota.json from older versions is imported
+PUBLISH_LEAD_MINUTES = float(os.getenv('PUBLISH_LEAD_MINUTES','30'))
+
+# Render farm: when RENDER_QUEUE_URL is set (e.g. sqlite:////srv/farm/queue.sqlite), videos are rendered by
+# `python main.py --render-worker` processes. sqlite:// is single-host only: keep the file on a local disk and
+# run the workers on that host (SQLite locking is not reliable on network filesystems). For workers on
+# several machines use a directory they all mount, e.g. dir:///mnt/farm/queue (NFS is fine)
+RENDER_QUEUE_URL = os.getenv('RENDER_QUEUE_URL','')
+RENDER_FARM_DIR = os.getenv('RENDER_FARM_DIR', os.path.join(OUTPUT_DIR,'farm'))
+RENDER_LEASE_SECONDS = float(os.getenv('RENDER_LEASE_SECONDS','120'))
+RENDER_MAX_ATTEMPTS = int(os.getenv('RENDER_MAX_ATTEMPTS','3'))
+RENDER_FARM_RETENTION_SECONDS = float(os.getenv('RENDER_FARM_RETENTION_SECONDS','86400'))  # orphaned farm files
+
+# Compilations (python main.py --compilation N): 16:9 videos joined from already rendered shorts
+COMPILATION_WIDTH = 1920
+COMPILATION_HEIGHT = 1080
+COMPILATION_DAYS = int(os.getenv('COMPILATION_DAYS','7'))  # shorts rendered within this many days are eligible
+COMPILATION_CARD_SECONDS = float(os.getenv('COMPILATION_CARD_SECONDS','1.5'))  # "#N" card before each fact
@@ -2,6 +2,7 @@ import argparse
 import os
 from workflows.daily_autopilot import DailyAutopilot
 from utils.logger import logger
+from config import YOUTUBE_CHANNELS_FILE
 
 CLIENT_SECRET = "client_secret.json"  # path to your YouTube API credentials
 
@@ -9,15 +10,76 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--dry-run', action='store_true', help='Do not upload; just create assets')
     parser.add_argument('--upload', action='store_true', help='Attempt to upload to YouTube (requires client_secret.json)')
+    parser.add_argument('--count', type=int, default=1, help='Number of shorts to create in this run')
+    parser.add_argument('--workers', type=int, default=None, help='Render processes for --count > 1 (default: CPU cores)')
+    parser.add_argument('--prepare-music', action='store_true', help='Build pre-looped background music beds and exit')
+    parser.add_argument('--pipelined', action='store_true', help='With --count: overlap thumbnailing, rendering and uploading in one process')
+    parser.add_argument('--daemon', action='store_true', help='Stay running with warm agents and process jobs from the spool directory')
+    parser.add_argument('--submit', action='store_true', help='Queue a job (with --count/--workers/--pipelined/--dry-run) for a running daemon and exit')
+    parser.add_argument('--journal-report', action='store_true', help='Print the job backlog and per-step latency from the job journal and exit')
+    parser.add_argument('--gc', action='store_true', help='Prune uploaded artifacts above ARTIFACT_BUDGET_MB and exit')
+    parser.add_argument('--ingest-trends', action='store_true', help='Fetch the trend sources into data/trending_topics.json and exit')
+    parser.add_argument('--render-worker', action='store_true', help='Render videos from the RENDER_QUEUE_URL farm queue until stopped')
+    parser.add_argument('--farm-status', action='store_true', help='Print render farm queue depth, throughput and worker utilization and exit')
+    parser.add_argument('--compilation', type=int, metavar='N', help='Join the N most recent shorts into a 16:9 compilation and exit')
     args = parser.parse_args()
 
+    if args.compilation:
+        from workflows.create_compilation import create_compilation
+        print("Compilation:", create_compilation(count=args.compilation))
+        raise SystemExit(0)
+
+    if args.render_worker or args.farm_status:
+        from config import RENDER_QUEUE_URL
+        if not RENDER_QUEUE_URL:
+            parser.error("set RENDER_QUEUE_URL (e.g. sqlite:////srv/farm/queue.sqlite or dir:///mnt/farm/queue) to use the render farm")
+        if args.farm_status:
+            import json
+            from utils.render_queue import open_render_queue
+            print(json.dumps(open_render_queue(RENDER_QUEUE_URL).stats(), indent=2))
+        else:
+            from workflows.render_farm import RenderWorker
+            RenderWorker().serve_forever()
+        raise SystemExit(0)
+
+    if args.ingest_trends:
+        from services.trend_ingester import TrendIngester
+        for report in TrendIngester().ingest():
+            print(report)
+        raise SystemExit(0)
+
+    if args.gc:
+        from utils.artifact_store import ArtifactStore
+        print("Artifact GC:", ArtifactStore().gc())
+        raise SystemExit(0)
+
+    if args.journal_report:
+        import json
+        from utils.job_journal import JobJournal
+        journal = JobJournal()
+        print(json.dumps({"backlog": journal.backlog(), "step_latency": journal.step_latency()}, indent=2))
+        raise SystemExit(0)
+
+    if args.prepare_music:
+        from services.music_beds import MusicBeds
+        beds = MusicBeds().build()
+        logger.info("Prepared %d music beds", len(beds))
+        raise SystemExit(0)
+
+    if args.submit:
+        from workflows.daemon import submit_job
+        mode = 'pipelined' if args.pipelined else ('batch' if args.count > 1 else 'once')
+        job = submit_job(mode=mode, count=args.count, workers=args.workers, dry_run=True if args.dry_run else None)
+        print("Queued job:", job)
+        raise SystemExit(0)
+
     # Auto-detect YouTube credentials
-    auto_upload = os.path.exists(CLIENT_SECRET)
+    auto_upload = os.path.exists(CLIENT_SECRET) or os.path.exists(YOUTUBE_CHANNELS_FILE)
     
     if args.upload:
         upload_enabled = True
         if not auto_upload:
-            logger.warning("Upload requested but client_secret.json not found. Falling back to dry-run.")
+            logger.warning("Upload requested but neither client_secret.json nor a channels file was found. Falling back to dry-run.")
             upload_enabled = False
     elif args.dry_run:
         upload_enabled = False
@@ -31,7 +93,16 @@ if __name__ == "__main__":
         logger.info("Dry-run mode: only creating assets (no upload).")
 
     pipeline = DailyAutopilot(upload=upload_enabled)
-    res = pipeline.run_once(dry_run=not upload_enabled)
+    if args.daemon:
+        from workflows.daemon import AutopilotDaemon
+        AutopilotDaemon(pipeline).serve_forever()
+        raise SystemExit(0)
+    if args.count > 1 and args.pipelined:
+        res = pipeline.run_pipelined(args.count, render_workers=args.workers or 1, dry_run=not upload_enabled)
+    elif args.count > 1:
+        res = pipeline.run_batch(args.count, workers=args.workers, dry_run=not upload_enabled)
+    else:
+        res = pipeline.run_once(dry_run=not upload_enabled)
     
     logger.info("Pipeline finished: %s", res)
     print("Result:", res)
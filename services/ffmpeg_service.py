@@ -0,0 +1,253 @@
+"""
+Thin helpers around the ffmpeg binary.
+Uses FFMPEG_BINARY if set, else the binary bundled with imageio-ffmpeg (installed with moviepy),
+else whatever `ffmpeg` is on PATH.
+Video encodes use a named x264 profile (ENCODER_PROFILE in config.py) trading speed for quality.
+"""
+import hashlib
+import os
+import re
+import subprocess
+from config import ENCODER_PROFILE, ENCODER_THREADS
+
+# Named quality/speed profiles for x264 (threads are filled in from the host by encoder_profile()).
+# No tune here: these also encode motion (effects, moviepy, compilations); still segments add tune=stillimage.
+ENCODER_PROFILES = {
+    "draft": {"preset": "ultrafast", "crf": 28},
+    "balanced": {"preset": "veryfast", "crf": 23},
+    "publish": {"preset": "medium", "crf": 20},
+}
+
+
+def encoder_profile(name: str = ENCODER_PROFILE, parallel: int = 1) -> dict:
+    """
+    Settings of a named profile, with `threads` set to ENCODER_THREADS or the host's core count
+    shared by the `parallel` encodes running side by side (e.g. batch worker processes).
+    """
+    if name not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile: {name} (expected one of {', '.join(ENCODER_PROFILES)})")
+    threads = ENCODER_THREADS or max(1, (os.cpu_count() or 1) // max(1, parallel))
+    return dict(ENCODER_PROFILES[name], name=name, threads=threads)
+
+
+def x264_args(profile: dict) -> list:
+    """Output arguments for an H.264/yuv420p encode with the given profile."""
+    args = ['-c:v', 'libx264', '-preset', profile['preset'], '-crf', profile['crf'], '-threads', profile['threads']]
+    if profile.get('tune'):
+        args += ['-tune', profile['tune']]
+    return args + ['-pix_fmt', 'yuv420p']
+
+
+def _audio_args(audio_path: str, duration: float | None, audio_volume: float, audio_copy: bool) -> tuple:
+    """
+    (input args, output args) adding audio_path as the second input: muxed as-is with audio_copy
+    (tracks already prepared at least as long as the video; cut to it), else looped to `duration` and encoded to AAC.
+    """
+    if audio_copy:
+        out = ['-map', '0:v:0', '-map', '1:a:0', '-c:a', 'copy', '-shortest']
+        return ['-i', audio_path], out + (['-t', f'{duration:.3f}'] if duration else [])
+    out = ['-map', '0:v:0', '-map', '1:a:0']
+    if audio_volume != 1.0:
+        out += ['-af', f'volume={audio_volume}']
+    out += ['-c:a', 'aac']
+    if duration:
+        out += ['-t', f'{duration:.3f}']
+    return ['-stream_loop', '-1', '-i', audio_path], out
+
+
+def ffmpeg_binary() -> str:
+    if os.getenv('FFMPEG_BINARY'):
+        return os.getenv('FFMPEG_BINARY')
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return 'ffmpeg'
+
+
+def run_ffmpeg(args: list) -> None:
+    """Run ffmpeg with the given arguments, raising RuntimeError with its stderr on failure."""
+    cmd = [ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y'] + [str(a) for a in args]
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        err = proc.stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f'ffmpeg failed ({proc.returncode}): {err}')
+
+
+def probe_duration(path: str) -> float:
+    """Media duration in seconds, read from ffmpeg's input summary."""
+    proc = subprocess.run([ffmpeg_binary(), '-hide_banner', '-i', str(path)], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    m = re.search(rb'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', proc.stderr)
+    if not m:
+        raise RuntimeError(f'Could not read duration of {path}')
+    h, mi, sec = m.groups()
+    return int(h) * 3600 + int(mi) * 60 + float(sec)
+
+
+def measure_loudness(path: str) -> float | None:
+    """Integrated loudness (EBU R128, LUFS) of the file's audio, or None if it can't be measured."""
+    proc = subprocess.run([ffmpeg_binary(), '-hide_banner', '-nostats', '-i', str(path), '-af', 'ebur128',
+                           '-f', 'null', '-'], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    m = re.findall(rb'I:\s+(-?\d+(?:\.\d+)?) LUFS', proc.stderr)
+    return float(m[-1]) if proc.returncode == 0 and m else None
+
+
+def _split_fields(text: str) -> list:
+    """Split a stream description on the commas that are not inside parentheses."""
+    fields, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        depth += (ch == '(') - (ch == ')')
+        if ch == ',' and depth == 0:
+            fields.append(text[start:i].strip())
+            start = i + 1
+    fields.append(text[start:].strip())
+    return fields
+
+
+def probe_streams(path: str) -> dict:
+    """
+    Duration and the first video/audio stream of a media file, read from ffmpeg's input summary:
+    {"duration", "video": {"codec", "profile", "pix_fmt", "width", "height", "fps", "timescale"} or None,
+     "audio": {"codec", "sample_rate", "channels"} or None}.
+    """
+    proc = subprocess.run([ffmpeg_binary(), '-hide_banner', '-i', str(path)], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    info = proc.stderr.decode('utf-8', errors='replace')
+    m = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', info)
+    if not m:
+        raise RuntimeError(f'Could not read streams of {path}')
+    out = {"duration": int(m[1]) * 3600 + int(m[2]) * 60 + float(m[3]), "video": None, "audio": None}
+    for kind, desc in re.findall(r'Stream #\S+: (Video|Audio): (.*)', info):
+        fields = _split_fields(desc)
+        codec = re.match(r'(\w+)(?: \(([^)/]*)\))?', fields[0])
+        # "<number>[k] <unit>" fields, e.g. "24 fps", "12288 tbn", "90k tbn", "44100 Hz"
+        units = {unit: float(num) * (1000 if k else 1)
+                 for num, k, unit in (re.match(r'([\d.]+)(k?) (\w+)', f).groups() for f in fields
+                                      if re.match(r'[\d.]+k? \w+', f))}
+        if kind == 'Video' and out["video"] is None:
+            size = next((re.match(r'(\d+)x(\d+)', f) for f in fields[1:] if re.match(r'\d+x\d+', f)), None)
+            out["video"] = {"codec": codec[1], "profile": codec[2],
+                            "pix_fmt": fields[1].split('(')[0] if len(fields) > 1 else None,
+                            "width": int(size[1]) if size else None, "height": int(size[2]) if size else None,
+                            "fps": units.get("fps"), "timescale": int(units["tbn"]) if "tbn" in units else None}
+        elif kind == 'Audio' and out["audio"] is None:
+            layout = fields[2].split('(')[0] if len(fields) > 2 else ''
+            channels = re.match(r'(\d+) channels', layout)
+            out["audio"] = {"codec": codec[1], "sample_rate": int(units["Hz"]) if "Hz" in units else None,
+                            "channels": {"mono": 1, "stereo": 2}.get(layout) or (int(channels[1]) if channels else None)}
+    return out
+
+
+def h264_parameter_sets(path: str) -> str | None:
+    """
+    Digest of the SPS/PPS NAL units of the first video stream (None if it isn't H.264). Two H.264 streams
+    can only be joined by stream copy when these match: the joined file carries the first one's headers.
+    """
+    proc = subprocess.run([ffmpeg_binary(), '-v', 'error', '-i', str(path), '-map', '0:v:0', '-c:v', 'copy',
+                           '-bsf:v', 'h264_mp4toannexb', '-frames:v', '1', '-f', 'h264', '-'],
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    # Annex B: NAL units after 00 00 01 start codes (a 4-byte start code leaves a 00 on the previous unit)
+    units = [n.rstrip(b'\x00') for n in proc.stdout.split(b'\x00\x00\x01') if n]
+    sets = [n for n in units if n and n[0] & 0x1f in (7, 8)]  # 7 = SPS, 8 = PPS
+    return hashlib.sha256(b'\x00\x00\x01'.join(sets)).hexdigest() if proc.returncode == 0 and sets else None
+
+
+def encode_still_segment(image_path: str, out_path: str, frames: int, fps: int, profile: dict | None = None,
+                         silent_audio: tuple | None = None) -> str:
+    """
+    Encode a single still image into an H.264 segment of exactly `frames` frames.
+    The image is decoded and converted to yuv420p once, then repeated by the loop filter;
+    x264 with tune=stillimage turns it into one keyframe plus near-empty P-frames.
+    :param silent_audio: (sample rate, channels) to add a silent AAC track of the same length
+    """
+    audio = []
+    if silent_audio:
+        rate, channels = silent_audio
+        audio = ['-f', 'lavfi', '-t', f'{frames / fps:.3f}', '-i', f'anullsrc=r={rate}:cl={"mono" if channels == 1 else "stereo"}',
+                 '-map', '0:v:0', '-map', '1:a:0', '-c:a', 'aac', '-ar', rate, '-ac', channels]
+    run_ffmpeg([
+        '-i', image_path,
+        *audio,
+        '-vf', f'format=yuv420p,loop=-1:1:0,setpts=N/{fps}/TB',
+        '-r', fps, '-frames:v', frames,
+        *x264_args({**(profile or encoder_profile()), 'tune': 'stillimage'}),
+        out_path,
+    ])
+    return out_path
+
+
+def encode_raw_frames(frames, out_path: str, width: int, height: int, fps: int, profile: dict | None = None,
+                      audio_path: str | None = None, duration: float | None = None, audio_volume: float = 1.0,
+                      audio_copy: bool = False) -> str:
+    """
+    Encode an iterable of (height, width, 3) uint8 RGB frames piped to ffmpeg's stdin as raw video,
+    muxing audio_path (see concat_segments) in the same pass.
+    Frames are written straight from their buffers (no per-frame copies or temp images).
+    """
+    audio_in, audio_out = _audio_args(audio_path, duration, audio_volume, audio_copy) if audio_path else ([], [])
+    cmd = [ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y',
+           '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+           *audio_in, *audio_out, *x264_args(profile or encoder_profile())]
+    if audio_path:
+        cmd += ['-movflags', '+faststart']
+    proc = subprocess.Popen([str(a) for a in cmd] + [str(out_path)], stdin=subprocess.PIPE,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        for frame in frames:
+            proc.stdin.write(memoryview(frame).cast('B'))
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its stderr explains why
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    err = proc.stderr.read()
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {err.decode('utf-8', errors='replace').strip()}")
+    return out_path
+
+
+def write_concat_list(paths: list, list_path: str) -> str:
+    """Write a concat-demuxer list file for the given media paths."""
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for p in paths:
+            escaped = os.path.abspath(p).replace('\\', '/').replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_path
+
+
+def concat_segments(segment_paths: list, out_path: str, audio_path: str | None = None,
+                    duration: float | None = None, audio_volume: float = 1.0, audio_copy: bool = False,
+                    segment_audio: bool = False) -> str:
+    """
+    Join pre-encoded segments with the concat demuxer (video stream copy).
+    If audio_path is given it is looped to `duration` and encoded to AAC in the same pass,
+    or, with audio_copy, muxed as-is (for AAC tracks already prepared at the right length).
+    With segment_audio the segments' own audio tracks are joined instead (re-encoded to AAC,
+    which is cheap and keeps the joins gapless).
+    """
+    list_path = write_concat_list(segment_paths, out_path + '.txt')
+    args = ['-f', 'concat', '-safe', '0', '-i', list_path]
+    try:
+        if audio_path:
+            audio_in, audio_out = _audio_args(audio_path, duration, audio_volume, audio_copy)
+            args += audio_in + audio_out
+        elif segment_audio:
+            args += ['-map', '0:v:0', '-map', '0:a:0', '-c:a', 'aac']
+        args += ['-c:v', 'copy', '-movflags', '+faststart', out_path]
+        run_ffmpeg(args)
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
+    return out_path
+
+
+def concat_audio(paths: list, out_path: str, bitrate: str = '128k') -> str:
+    """Join audio clips of the same format into one MP3 (re-encoded, so clip boundaries are gapless)."""
+    list_path = write_concat_list(paths, out_path + '.txt')
+    try:
+        run_ffmpeg(['-f', 'concat', '-safe', '0', '-i', list_path, '-c:a', 'libmp3lame', '-b:a', bitrate, out_path])
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
+    return out_path
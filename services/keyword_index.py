@@ -0,0 +1,200 @@
+"""
+KeywordIndex — offline keyword model for SEO tags and descriptions (no network calls).
+- Built from data/keywords.json (niche phrases, niche tags, generic tags, stopwords) plus the topic corpus
+  (seed file and trending facts), which provides IDF weights for phrases and single words.
+- Phrases are looked up with a hash of n-grams (longest match first), on lightly stemmed words so
+  "berries" matches "berry".
+- A batch of topics is scored against every niche with one matrix product: the topics x phrases
+  term-count matrix times a phrases x niches matrix holding each phrase's IDF in its niche's column
+  (TF-IDF summed per niche). Each topic gets its best phrases/words by IDF plus its niche's tag set.
+- Tokenizing and the n-gram phrase lookup stay in Python: longest-match over variable-length string
+  keys has no array form, and it is a few dict lookups per word. Only the scoring is vectorized.
+- The compiled index is cached as JSON and rebuilt automatically when its sources change.
+"""
+import json
+import math
+import os
+import re
+import numpy as np
+from config import KEYWORDS_PATH, KEYWORD_INDEX_PATH, TRENDING_TOPICS_PATH, SEO_MAX_TAGS
+
+SEED_PATH = os.path.join('data', 'quotes_seed.txt')
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def stem(word: str) -> str:
+    """Crude plural folding, enough for keyword matching."""
+    if word.endswith("'s"):
+        word = word[:-2]
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("sses", "shes", "ches", "xes", "oes", "uses")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list:
+    """[(surface word, stem)] of a text."""
+    return [(w, stem(w)) for w in _WORD.findall(text.lower())]
+
+
+def _corpus(seed_path: str = SEED_PATH, trending_path: str = TRENDING_TOPICS_PATH) -> list:
+    docs = []
+    if os.path.exists(seed_path):
+        with open(seed_path, 'r', encoding='utf-8') as f:
+            docs += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if os.path.exists(trending_path) and os.path.getsize(trending_path):
+        from services.trend_ingester import TrendingTopics
+        docs += [e["fact"] for e in TrendingTopics(trending_path).load() if isinstance(e, dict) and e.get("fact")]
+    return docs
+
+
+def _sources_signature(paths) -> list:
+    return [[p, os.path.getsize(p), int(os.path.getmtime(p))] if os.path.exists(p) else [p, None, None] for p in paths]
+
+
+class KeywordIndex:
+    def __init__(self, data: dict):
+        """:param data: compiled index (see build()); use build() / load() / load_or_build() to get one"""
+        self.data = data
+        self.niche_names = list(data["niches"])
+        self.niche_tags = [data["niches"][n] for n in self.niche_names]
+        self.generic_tags = data["generic_tags"]
+        self.stopwords = set(data["stopwords"])
+        self.phrases = data["phrases"]  # [[stemmed key, display form, niche number]]
+        self.phrase_ids = {key: i for i, (key, _, _) in enumerate(self.phrases)}
+        self.max_n = max((len(key.split()) for key, _, _ in self.phrases), default=1)
+        self.idf = data["idf"]
+        self.default_idf = data["default_idf"]
+        self.phrase_niche = np.array([niche for _, _, niche in self.phrases], dtype=np.int64)
+        self.phrase_idf = np.array([self.idf.get(key, self.default_idf) for key, _, _ in self.phrases])
+        # phrases x niches: a phrase's IDF in its niche's column, so TF @ niche_weights = TF-IDF per niche
+        self.niche_weights = np.zeros((len(self.phrases), max(1, len(self.niche_names))))
+        self.niche_weights[np.arange(len(self.phrases)), self.phrase_niche] = self.phrase_idf
+
+    # ---- building -----------------------------------------------------------
+
+    @classmethod
+    def build(cls, keywords_path: str = KEYWORDS_PATH, corpus: list | None = None) -> "KeywordIndex":
+        with open(keywords_path, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+        niches = {name: n["tags"] for name, n in spec["niches"].items()}
+        phrases, seen = [], set()
+        for number, (name, niche) in enumerate(spec["niches"].items()):
+            for phrase in niche["keywords"]:
+                key = " ".join(s for _, s in tokenize(phrase))
+                if key and key not in seen:
+                    seen.add(key)
+                    phrases.append([key, phrase.lower(), number])
+        index = cls({"niches": niches, "generic_tags": spec.get("generic_tags", []),
+                     "stopwords": spec.get("stopwords", []), "phrases": phrases, "idf": {}, "default_idf": 1.0})
+        docs = _corpus() if corpus is None else corpus
+        # Document frequency of every matched phrase and content word
+        df = {}
+        for doc in docs:
+            matched, words = index._match(tokenize(doc))
+            for term in {index.phrases[i][0] for i in matched} | {s for _, s in words}:
+                df[term] = df.get(term, 0) + 1
+        n = len(docs)
+        index.data["idf"] = {term: round(math.log((1 + n) / (1 + count)) + 1, 4) for term, count in df.items()}
+        index.data["default_idf"] = round(math.log(1 + n) + 1, 4)  # unseen terms count as rarest
+        return cls(index.data)
+
+    def save(self, path: str = KEYWORD_INDEX_PATH, sources=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({**self.data, "sources": sources}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = KEYWORD_INDEX_PATH) -> "KeywordIndex":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def load_or_build(cls, keywords_path: str = KEYWORDS_PATH, path: str = KEYWORD_INDEX_PATH) -> "KeywordIndex":
+        """The cached index, rebuilt (and re-saved) when keywords.json or the topic corpus changed."""
+        sources = _sources_signature([keywords_path, SEED_PATH, TRENDING_TOPICS_PATH])
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("sources") == sources:
+                return cls(data)
+        except (OSError, ValueError):
+            pass
+        index = cls.build(keywords_path)
+        index.save(path, sources)
+        return index
+
+    # ---- lookup -------------------------------------------------------------
+
+    def _match(self, tokens: list) -> tuple:
+        """(matched phrase ids, remaining content words as (surface, stem)), longest phrase first."""
+        matched, words = [], []
+        stems = [s for _, s in tokens]
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self.max_n, len(tokens) - i), 0, -1):
+                pid = self.phrase_ids.get(" ".join(stems[i:i + n]))
+                if pid is not None:
+                    matched.append(pid)
+                    i += n
+                    break
+            else:
+                surface, s = tokens[i]
+                if len(s) > 3 and s not in self.stopwords and surface not in self.stopwords and not s.isdigit():
+                    words.append(tokens[i])
+                i += 1
+        return matched, words
+
+    def analyze_many(self, topics: list, n_keywords: int = 5) -> list:
+        """Per topic: {"niche": best niche or None, "keywords": top phrases/words by IDF}."""
+        rows, ids, per_topic = [], [], []
+        for row, topic in enumerate(topics):
+            matched, words = self._match(tokenize(topic))
+            per_topic.append((matched, words))
+            rows += [row] * len(matched)
+            ids += matched
+        rows, ids = np.array(rows, dtype=np.int64), np.array(ids, dtype=np.int64)
+        n_phrases = len(self.phrases)
+        tf = np.bincount(rows * n_phrases + ids, minlength=len(topics) * n_phrases).reshape(len(topics), n_phrases)
+        scores = tf @ self.niche_weights
+        best = scores.argmax(axis=1)
+        has_niche = scores.max(axis=1) > 0
+
+        out = []
+        for row, (matched, words) in enumerate(per_topic):
+            # Niche phrases rank ahead of plain words of equal IDF; ties keep topic order
+            cands = [(self.phrase_idf[i] * 1.5, self.phrases[i][1]) for i in matched]
+            cands += [(self.idf.get(s, self.default_idf), w.split("'")[0]) for w, s in words]
+            order = np.argsort([-w for w, _ in cands], kind="stable")
+            keywords = []
+            for k in order:
+                text = cands[k][1]
+                if text not in keywords:
+                    keywords.append(text)
+                if len(keywords) >= n_keywords:
+                    break
+            out.append({"niche": self.niche_names[best[row]] if has_niche[row] else None, "keywords": keywords})
+        return out
+
+    def seo_many(self, topics: list, n_tags: int = SEO_MAX_TAGS) -> list:
+        """[{"tags", "description"}] for each topic: topic keywords, then niche tags, then generic tags."""
+        results = []
+        for topic, info in zip(topics, self.analyze_many(topics)):
+            niche_tags = self.data["niches"][info["niche"]] if info["niche"] else []
+            tags = []
+            for tag in info["keywords"] + niche_tags + self.generic_tags:
+                if tag not in tags:
+                    tags.append(tag)
+            tags = tags[:n_tags]
+            hashtags = ["shorts"] + [re.sub(r"[^a-z0-9]", "", t) for t in niche_tags[:2] + info["keywords"][:2]]
+            description = f"{topic}\n\nFollow for a new surprising fact every day!\n\n" + \
+                " ".join("#" + h for h in dict.fromkeys(hashtags))
+            results.append({"tags": tags, "description": description})
+        return results
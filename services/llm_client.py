@@ -0,0 +1,152 @@
+"""
+LLMClient — pooled, cached and rate-limited access to the Groq-style /invoke endpoint.
+- One requests.Session with a connection pool sized to the worker count (keep-alive across calls).
+- Responses are cached by hash(model, prompt): in memory and in a small SQLite file, so repeated
+  prompts (e.g. the same topic from the script and SEO steps) never hit the network twice.
+- Outgoing calls draw from a token bucket kept in the cache file (SharedRateLimiter), so the limit holds
+  for every thread and process using that cache (batch workers, the daemon, cron runs) together,
+  not per process. Without a cache file, ratelimit's in-process limiter is used.
+- complete_many() runs prompts concurrently, still within the limit.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from ratelimit import limits, sleep_and_retry
+from config import LLM_CACHE_DB, LLM_CALLS_PER_MINUTE, LLM_MAX_WORKERS
+
+
+class SharedRateLimiter:
+    """Token bucket (calls per period, bursts up to calls) in a SQLite file shared across processes."""
+
+    def __init__(self, path: str, key: str, calls: int, period: float = 60):
+        """
+        :param path: SQLite file (the response cache); the bucket is a row of its rate_limit table
+        :param key: bucket name (the endpoint: its limit applies to every model behind it)
+        """
+        self.key = key
+        self.capacity = calls
+        self.rate = calls / period
+        self._lock = threading.Lock()
+        # Autocommit mode; each take is one BEGIN IMMEDIATE transaction
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS rate_limit (key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                         "updated REAL NOT NULL)")
+
+    def _take(self) -> float:
+        """Take a token if one is available; otherwise the seconds until one will be."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._db.execute("SELECT tokens, updated FROM rate_limit WHERE key = ?", (self.key,)).fetchone()
+                tokens = min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate) if row else self.capacity
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+                self._db.execute("INSERT OR REPLACE INTO rate_limit (key, tokens, updated) VALUES (?, ?, ?)",
+                                 (self.key, tokens - 1 if wait == 0 else tokens, now))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return wait
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        while (wait := self._take()) > 0:
+            time.sleep(wait)
+
+
+class LLMClient:
+    def __init__(self, api_key: str, endpoint: str, model: str = 'llama3-mini', cache_path: str | None = LLM_CACHE_DB,
+                 calls_per_minute: int = LLM_CALLS_PER_MINUTE, max_workers: int = LLM_MAX_WORKERS, timeout: float = 15):
+        """
+        :param api_key: bearer token
+        :param endpoint: base URL (e.g. a local stub server in tests)
+        :param cache_path: SQLite response cache; None keeps the cache in memory only
+        :param calls_per_minute: outgoing request limit shared by all threads (and processes using cache_path)
+        :param max_workers: concurrency of complete_many() and size of the connection pool
+        """
+        self.api_key = api_key
+        self.endpoint = endpoint.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'})
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body TEXT NOT NULL)")
+            self._db.commit()
+            self._acquire = SharedRateLimiter(cache_path, self.endpoint, calls_per_minute).acquire
+        else:
+            self._acquire = sleep_and_retry(limits(calls=calls_per_minute, period=60)(lambda: None))
+        self.stats = {'requests': 0, 'cache_hits': 0}
+
+    def _key(self, prompt: str) -> str:
+        return hashlib.sha256(f'{self.model}\0{prompt}'.encode('utf-8')).hexdigest()
+
+    def _cached(self, key: str):
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self._memo[key] = json.loads(row[0])
+                    return self._memo[key]
+        return None
+
+    def _store(self, key: str, body):
+        with self._lock:
+            self._memo[key] = body
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses (key, body) VALUES (?, ?)", (key, json.dumps(body)))
+                self._db.commit()
+
+    def _post(self, prompt: str, max_output_tokens: int):
+        self._acquire()
+        data = {'model': self.model, 'input': prompt, 'max_output_tokens': max_output_tokens}
+        resp = self.session.post(f'{self.endpoint}/invoke', json=data, timeout=self.timeout)
+        resp.raise_for_status()
+        with self._lock:
+            self.stats['requests'] += 1
+        return resp.json()
+
+    def complete(self, prompt: str, max_output_tokens: int = 300):
+        """Return the decoded JSON response for prompt (from cache when possible). Raises on HTTP errors."""
+        key = self._key(prompt)
+        body = self._cached(key)
+        if body is not None:
+            with self._lock:
+                self.stats['cache_hits'] += 1
+            return body
+        body = self._post(prompt, max_output_tokens)
+        self._store(key, body)
+        return body
+
+    def complete_many(self, prompts: list, max_output_tokens: int = 300) -> list:
+        """
+        Complete prompts concurrently (bounded by max_workers and the rate limit).
+        Results are in input order; a failed prompt yields its exception instead of a response.
+        """
+        def one(prompt):
+            try:
+                return self.complete(prompt, max_output_tokens)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(one, prompts))
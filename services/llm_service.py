@@ -1,10 +1,20 @@
 import os
-import requests
+import json
 from typing import List
+from services.llm_client import LLMClient
 
 GROQ_API_KEY = os.getenv('GROQ_API_KEY','')
 GROQ_ENDPOINT = os.getenv('GROQ_ENDPOINT','https://api.groq.com/v1')
 
+_client = None
+
+def get_client() -> LLMClient:
+    """Shared pooled/cached client, created on first use."""
+    global _client
+    if _client is None:
+        _client = LLMClient(GROQ_API_KEY, GROQ_ENDPOINT)
+    return _client
+
 def _template_generate_captions(topic: str, n_lines: int = 5) -> List[str]:
     base = topic
     if ':' in base:
@@ -18,35 +28,45 @@ def _template_generate_captions(topic: str, n_lines: int = 5) -> List[str]:
     ]
     return parts[:n_lines]
 
+def _captions_prompt(topic: str, n_lines: int) -> str:
+    return f"Generate {n_lines} concise captions (4-8 words each) for a YouTube short about: {topic}. Return as a JSON array of strings."
+
+def _parse_captions(j, topic: str, n_lines: int) -> List[str]:
+    # parse conservatively
+    text = ''
+    if isinstance(j, dict):
+        text = j.get('output') or j.get('text') or j.get('result') or ''
+        if isinstance(text, list):
+            return [str(x).strip() for x in text][:n_lines]
+        text = str(text)
+    else:
+        text = str(j)
+    lines = [l.strip('-•* \t') for l in text.splitlines() if l.strip()]
+    if lines:
+        return lines[:n_lines]
+    try:
+        arr = json.loads(text)
+        if isinstance(arr, list):
+            return [str(x) for x in arr][:n_lines]
+    except Exception:
+        pass
+    return _template_generate_captions(topic, n_lines)
+
 def generate_captions(topic: str, n_lines: int = 5) -> List[str]:
     if not GROQ_API_KEY:
         return _template_generate_captions(topic, n_lines)
     try:
-        prompt = f"Generate {n_lines} concise captions (4-8 words each) for a YouTube short about: {topic}. Return as a JSON array of strings."
-        headers = {'Authorization': f'Bearer {GROQ_API_KEY}','Content-Type':'application/json'}
-        data = {'model':'llama3-mini','input':prompt,'max_output_tokens':300}
-        resp = requests.post(f'{GROQ_ENDPOINT}/invoke', headers=headers, json=data, timeout=15)
-        resp.raise_for_status()
-        j = resp.json()
-        # parse conservatively
-        text = ''
-        if isinstance(j, dict):
-            text = j.get('output') or j.get('text') or j.get('result') or ''
-            if isinstance(text, list):
-                return [str(x).strip() for x in text][:n_lines]
-            text = str(text)
-        else:
-            text = str(j)
-        lines = [l.strip('-•* \t') for l in text.splitlines() if l.strip()]
-        if lines:
-            return lines[:n_lines]
-        import json
-        try:
-            arr = json.loads(text)
-            if isinstance(arr, list):
-                return [str(x) for x in arr][:n_lines]
-        except Exception:
-            pass
-        return _template_generate_captions(topic, n_lines)
+        j = get_client().complete(_captions_prompt(topic, n_lines))
+        return _parse_captions(j, topic, n_lines)
     except Exception:
         return _template_generate_captions(topic, n_lines)
+
+def generate_captions_many(topics: List[str], n_lines: int = 5) -> List[List[str]]:
+    """Captions for several topics, requested concurrently within the client's rate limit."""
+    if not GROQ_API_KEY:
+        return [_template_generate_captions(t, n_lines) for t in topics]
+    responses = get_client().complete_many([_captions_prompt(t, n_lines) for t in topics])
+    return [
+        _template_generate_captions(t, n_lines) if isinstance(j, Exception) else _parse_captions(j, t, n_lines)
+        for t, j in zip(topics, responses)
+    ]
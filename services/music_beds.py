@@ -0,0 +1,127 @@
+"""
+MusicBeds — background music preprocessed once into ready-to-mux AAC "beds".
+- build() turns every track in BG_MUSIC_DIR into a loudness-normalized, looped and attenuated
+  AAC file of exactly the target duration (skipping tracks already built and unchanged).
+- Beds are recorded in an index (duration, measured loudness, source) next to them. The index only
+  changes when beds are built; renders never write to it, and read it again only when it changed.
+- next_bed(duration) rotates through the shortest beds at least that long (kept per process, from a
+  random start); renders mux the bed with stream copy, cut to the video, so no audio decoding or mixing
+  happens at render time.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import uuid
+from config import BG_MUSIC_DIR, MUSIC_BEDS_DIR, VIDEO_DURATION_SECONDS
+from services.ffmpeg_service import run_ffmpeg, measure_loudness
+from utils.logger import logger
+
+MUSIC_EXTENSIONS = (".mp3", ".wav", ".m4a", ".ogg", ".flac")
+
+
+class MusicBeds:
+    def __init__(self, music_dir: str = BG_MUSIC_DIR, beds_dir: str = MUSIC_BEDS_DIR,
+                 target_lufs: float = -16.0, volume: float = 0.25):
+        """
+        :param target_lufs: integrated loudness each track is normalized to before attenuation
+        :param volume: gain applied after normalization (0.25 matches the old per-render volumex)
+        """
+        self.music_dir = music_dir
+        self.beds_dir = beds_dir
+        self.index_path = os.path.join(beds_dir, "index.json")
+        self.target_lufs = target_lufs
+        self.volume = volume
+        self._lock = threading.Lock()
+        self._cursor = {}  # bed duration -> next position in the rotation (this process only)
+        self._index = None
+        self._index_mtime = None
+
+    def _load(self) -> dict:
+        """The index, kept in memory until index.json changes."""
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._index is not None and mtime == self._index_mtime:
+            return self._index
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("beds", [])
+        index.pop("cursor", None)  # rotation state of older versions
+        self._index, self._index_mtime = index, mtime
+        return index
+
+    def _save(self, index: dict):
+        os.makedirs(self.beds_dir, exist_ok=True)
+        tmp = f"{self.index_path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def build(self, duration: float = VIDEO_DURATION_SECONDS) -> list:
+        """Create beds of `duration` seconds for every music track; returns the index entries for that duration."""
+        if not os.path.isdir(self.music_dir):
+            logger.warning(f"No music directory at {self.music_dir}; nothing to prepare.")
+            return []
+        os.makedirs(self.beds_dir, exist_ok=True)
+        with self._lock:
+            index = self._load()
+            existing = {(b["source"], b["duration"]): b for b in index["beds"]}
+            for name in sorted(os.listdir(self.music_dir)):
+                if not name.lower().endswith(MUSIC_EXTENSIONS):
+                    continue
+                src = os.path.join(self.music_dir, name)
+                st = os.stat(src)
+                entry = existing.get((name, duration))
+                if entry and entry["source_mtime"] == st.st_mtime and os.path.exists(entry["path"]):
+                    continue
+                tag = hashlib.sha1(f"{name}\0{st.st_size}\0{st.st_mtime}".encode("utf-8")).hexdigest()[:8]
+                out = os.path.join(self.beds_dir, f"{os.path.splitext(name)[0]}_{tag}_{duration:g}s.m4a")
+                tmp = f"{out}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp.m4a"
+                logger.info(f"Preparing music bed: {name} -> {os.path.basename(out)}")
+                run_ffmpeg([
+                    "-stream_loop", "-1", "-i", src, "-t", f"{duration:.3f}",
+                    "-af", f"loudnorm=I={self.target_lufs}:TP=-1.5:LRA=11,volume={self.volume}",
+                    "-ar", "44100", "-ac", "2", "-c:a", "aac", "-b:a", "128k", tmp,
+                ])
+                os.replace(tmp, out)
+                loudness = measure_loudness(out)
+                if loudness is None:
+                    logger.warning(f"Could not measure the loudness of {os.path.basename(out)}")
+                if entry and entry["path"] != out and os.path.exists(entry["path"]):
+                    os.remove(entry["path"])
+                existing[(name, duration)] = {
+                    "source": name, "source_mtime": st.st_mtime, "path": out,
+                    "duration": duration, "loudness_lufs": round(loudness, 1) if loudness is not None else None,
+                }
+            index["beds"] = sorted(existing.values(), key=lambda b: (b["duration"], b["source"]))
+            self._save(index)
+            return [b for b in index["beds"] if b["duration"] == duration]
+
+    @staticmethod
+    def _matching(index: dict, duration: float) -> list:
+        """Beds of the shortest duration that still covers `duration` (they are cut to it when muxed)."""
+        beds = [b for b in index["beds"] if b["duration"] >= duration - 1e-3 and os.path.exists(b["path"])]
+        if not beds:
+            return []
+        shortest = min(b["duration"] for b in beds)
+        return [b for b in beds if b["duration"] == shortest]
+
+    def beds_for(self, duration: float) -> list:
+        return self._matching(self._load(), duration)
+
+    def next_bed(self, duration: float = VIDEO_DURATION_SECONDS) -> str | None:
+        """Path of the next bed long enough for `duration` in rotation, or None if none were prepared."""
+        beds = self.beds_for(duration)
+        if not beds:
+            return None
+        key = f"{beds[0]['duration']:g}"
+        with self._lock:
+            i = self._cursor.get(key, random.randrange(len(beds))) % len(beds)
+            self._cursor[key] = i + 1
+        return beds[i]["path"]
@@ -1,17 +1,18 @@
-from services.llm_service import generate_captions
+from services.keyword_index import KeywordIndex
+
+_index = None
+
+def get_index() -> KeywordIndex:
+    """Shared keyword index, loaded (or rebuilt if its sources changed) on first use."""
+    global _index
+    if _index is None:
+        _index = KeywordIndex.load_or_build()
+    return _index
 
 def suggest_tags(topic: str, n: int = 6) -> list:
-    caps = generate_captions(topic, n_lines=4)
-    tags = set()
-    for c in caps:
-        for w in c.replace(',', '').split():
-            w = w.strip().lower()
-            if len(w) > 3:
-                tags.add(w)
-            if len(tags) >= n:
-                break
-        if len(tags) >= n:
-            break
-    if not tags:
-        tags = {'facts','shorts','didyouknow','trivia','funfacts'}
-    return list(tags)[:n]
+    # Offline: keyword index lookup, deterministic and without an LLM round trip
+    return get_index().seo_many([topic], n_tags=n)[0]["tags"]
+
+def seo_for_topics(topics: list) -> list:
+    """[{"tags", "description"}] per topic, computed for the whole batch at once."""
+    return get_index().seo_many(topics)
@@ -0,0 +1,306 @@
+"""
+TrendIngester — pulls short facts from a list of web pages into data/trending_topics.json.
+- Sources are fetched concurrently over one pooled keep-alive requests.Session.
+- Conditional GETs: the ETag / Last-Modified of every page is remembered, so an unchanged page costs one 304.
+- Pages are parsed while they download (html.parser fed chunk by chunk), never held in memory whole.
+  Pages without a charset in Content-Type are decoded as their <meta charset> says, else as UTF-8.
+- A page is read for at most max_bytes and max_seconds; a cut-off page keeps the facts parsed so far
+  (reported as "truncated") but its validators are not stored, so the next run fetches it again.
+- New facts are appended to the JSON array in place (the file is never rewritten), skipping ones already there.
+- ingest() returns, per source: status, fetch latency, bytes downloaded / saved by a 304, facts found and added.
+Sources come from TREND_SOURCES (comma-separated URLs) or TREND_SOURCES_FILE:
+[{"name": "...", "url": "https://...", "tags": ["li", "p"]}]  (tags: elements whose text is a candidate fact)
+"""
+import codecs
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from config import (TRENDING_TOPICS_PATH, TREND_SOURCES, TREND_SOURCES_FILE, TREND_CACHE_PATH, TREND_MAX_WORKERS,
+                    TREND_MAX_BYTES, TREND_MAX_SECONDS)
+from utils.logger import logger
+from utils.metrics import metrics
+
+DEFAULT_TAGS = ("li", "p")
+
+
+def load_sources(urls: str = TREND_SOURCES, path: str = TREND_SOURCES_FILE) -> list[dict]:
+    """Configured sources: TREND_SOURCES URLs if set, else the entries of TREND_SOURCES_FILE (if it exists)."""
+    if urls.strip():
+        return [{"name": urlparse(u).netloc or u, "url": u.strip()} for u in urls.split(",") if u.strip()]
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def page_encoding(content_type: str, head: bytes) -> str:
+    """
+    Charset of a page: from the Content-Type header, else from a <meta> tag in its first bytes, else UTF-8
+    (not requests' ISO-8859-1 default for text/* without a charset, which garbles UTF-8 pages).
+    """
+    m = re.search(r"charset=[\"']?([\w.:-]+)", content_type or "", re.I)
+    if not m:
+        m = re.search(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", head, re.I)
+    name = m.group(1) if m else "utf-8"
+    name = name.decode("ascii", errors="replace") if isinstance(name, bytes) else name
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return "utf-8"
+
+
+def fact_key(text: str) -> str:
+    """Normalized form used to recognise the same fact with different punctuation or case."""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class FactParser(HTMLParser):
+    """Incremental parser collecting the text of the given elements as candidate facts."""
+
+    def __init__(self, tags=DEFAULT_TAGS, min_chars: int = 30, max_chars: int = 220):
+        super().__init__()
+        self.tags = set(tags)
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.facts = []
+        self._depth = 0  # nesting inside a collected element
+        self._skip = 0  # nesting inside script/style
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in self.tags:
+            if self._depth == 0:
+                self._text = []
+            self._depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.tags and self._depth:
+            self._depth -= 1
+            if self._depth == 0:
+                self._emit(" ".join(self._text))
+
+    def handle_data(self, data):
+        if self._depth and not self._skip:
+            self._text.append(data)
+
+    def _emit(self, text: str):
+        text = re.sub(r"\s+", " ", text).strip()
+        text = re.sub(r"^(\d+[.)]|[-*•])\s*", "", text)  # list numbering / bullets
+        if self.min_chars <= len(text) <= self.max_chars and re.search(r"[A-Za-z]", text):
+            self.facts.append(text)
+
+
+class TrendingTopics:
+    """
+    data/trending_topics.json: a JSON array of {"fact", "source", "added"} objects.
+    append() adds entries in place: it overwrites the closing bracket with the new entries and a new bracket.
+    """
+
+    def __init__(self, path: str = TRENDING_TOPICS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keys = None
+
+    def load(self) -> list[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return []
+        if not raw.strip():
+            return []
+        try:
+            return json.loads(raw)
+        except ValueError:
+            # Interrupted append: keep every complete entry
+            cut = raw.rfind("}")
+            return json.loads(raw[:cut + 1] + "]") if cut != -1 else []
+
+    def _ensure_keys(self):
+        if self._keys is None:
+            self._keys = {fact_key(e["fact"]) for e in self.load() if isinstance(e, dict) and e.get("fact")}
+
+    def __contains__(self, fact: str) -> bool:
+        with self._lock:
+            self._ensure_keys()
+            return fact_key(fact) in self._keys
+
+    def _rewrite(self, entries: list):
+        """Write the whole array atomically (only for a new, empty or damaged file)."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("[\n" + ",\n".join("  " + json.dumps(e, ensure_ascii=False) for e in entries) + "\n]\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def append(self, facts: list, source: str) -> int:
+        """Append the facts not already in the file; returns how many were added."""
+        with self._lock:
+            self._ensure_keys()
+            entries = []
+            for fact in facts:
+                key = fact_key(fact)
+                if key and key not in self._keys:
+                    self._keys.add(key)
+                    entries.append({"fact": fact, "source": source, "added": round(time.time())})
+            if not entries:
+                return 0
+            body = ",\n".join("  " + json.dumps(e, ensure_ascii=False) for e in entries).encode("utf-8")
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            with open(self.path, "r+b" if size else "wb") as f:
+                tail = b""
+                if size:
+                    f.seek(max(0, size - 4096))
+                    tail = f.read()
+                stripped = tail.rstrip()
+                if not stripped.endswith(b"]"):
+                    # New, empty or damaged file: write it out whole
+                    f.close()
+                    self._rewrite([e for e in self.load() if isinstance(e, dict)] + entries)
+                    return len(entries)
+                before = stripped[:-1].rstrip()  # everything up to the last entry (or the opening bracket)
+                empty = before.endswith(b"[")
+                f.seek(size - len(tail) + len(before))
+                f.truncate()
+                f.write((b"\n" if empty else b",\n") + body + b"\n]\n")
+                f.flush()
+                os.fsync(f.fileno())
+            return len(entries)
+
+
+class TrendIngester:
+    def __init__(self, sources: list | None = None, store: TrendingTopics | None = None,
+                 cache_path: str = TREND_CACHE_PATH, max_workers: int = TREND_MAX_WORKERS,
+                 session: requests.Session | None = None, timeout: float = 15, max_bytes: int = TREND_MAX_BYTES,
+                 max_seconds: float = TREND_MAX_SECONDS):
+        """
+        :param sources: [{"name", "url", "tags"?}] (default: load_sources())
+        :param store: trending topics file to merge into
+        :param cache_path: JSON file with the validators (ETag / Last-Modified) of every fetched URL
+        :param max_workers: concurrent fetches, and size of the connection pool
+        :param session: requests session to use (default: a pooled one)
+        :param timeout: connect / read timeout of each request
+        :param max_bytes: bytes read from a page at most
+        :param max_seconds: seconds spent fetching a page at most
+        """
+        self.sources = load_sources() if sources is None else sources
+        self.store = store or TrendingTopics()
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": "yt-ai-auto-creator/1.0 (+trend ingester)"})
+        self.session = session
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._cache, f, indent=2)
+        os.replace(tmp, self.cache_path)
+
+    def fetch(self, source: dict) -> dict:
+        """Conditional GET + streaming parse of one source. Returns its report (with the parsed facts)."""
+        url = source["url"]
+        with self._lock:
+            cached = dict(self._cache.get(url, {}))
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        report = {"source": source.get("name") or url, "url": url, "status": None, "bytes": 0,
+                  "bytes_saved": 0, "facts_found": 0, "facts": []}
+        start = time.perf_counter()
+        with metrics.stage("ingest", source=report["source"]) as rec, \
+                self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as resp:
+            report["status"] = resp.status_code
+            if resp.status_code == 304:
+                report["bytes_saved"] = cached.get("bytes", 0)
+            else:
+                resp.raise_for_status()
+                parser = FactParser(source.get("tags") or DEFAULT_TAGS)
+                decoder = None
+                for chunk in resp.iter_content(chunk_size=16 * 1024):
+                    if decoder is None:
+                        encoding = page_encoding(resp.headers.get("Content-Type", ""), chunk)
+                        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                    chunk = chunk[:self.max_bytes - report["bytes"]]
+                    report["bytes"] += len(chunk)
+                    parser.feed(decoder.decode(chunk))
+                    if report["bytes"] >= self.max_bytes or time.perf_counter() - start > self.max_seconds:
+                        report["truncated"] = True
+                        logger.warning(f"Trend source {report['source']}: stopped after {report['bytes']} bytes "
+                                       f"in {time.perf_counter() - start:.1f}s (limits: {self.max_bytes} bytes, "
+                                       f"{self.max_seconds:g}s)")
+                        break
+                if decoder is not None:
+                    parser.feed(decoder.decode(b"", final=True))
+                parser.close()
+                report["facts"] = parser.facts
+                report["facts_found"] = len(parser.facts)
+                with self._lock:
+                    if report.get("truncated"):
+                        self._cache.pop(url, None)  # fetch it whole next time
+                    else:
+                        self._cache[url] = {"etag": resp.headers.get("ETag"),
+                                           "last_modified": resp.headers.get("Last-Modified"),
+                                           "bytes": report["bytes"], "fetched": round(time.time())}
+            rec["bytes"] = report["bytes"]
+        report["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return report
+
+    def ingest(self) -> list[dict]:
+        """Fetch every source concurrently and merge each one's new facts as soon as it arrives."""
+        if not self.sources:
+            logger.info("No trend sources configured (TREND_SOURCES / TREND_SOURCES_FILE).")
+            return []
+        reports = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.sources))) as pool:
+            futures = {pool.submit(self.fetch, s): s for s in self.sources}
+            for fut in as_completed(futures):
+                source = futures[fut]
+                try:
+                    report = fut.result()
+                except Exception as e:
+                    logger.warning(f"Trend source {source.get('name') or source['url']} failed: {e}")
+                    reports.append({"source": source.get("name") or source["url"], "url": source["url"],
+                                    "status": "error", "error": str(e)})
+                    continue
+                report["facts_added"] = self.store.append(report.pop("facts"), report["source"])
+                logger.info(f"Trend source {report['source']}: {report['status']} in {report['latency_ms']} ms, "
+                            f"{report['bytes']} bytes ({report['bytes_saved']} saved), "
+                            f"{report['facts_added']}/{report['facts_found']} facts added")
+                reports.append(report)
+        self._save_cache()
+        return reports
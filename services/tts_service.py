@@ -1,39 +1,155 @@
+import hashlib
 import os
+import re
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from gtts import gTTS
 import requests
+from requests.adapters import HTTPAdapter
+from services.ffmpeg_service import probe_duration, concat_audio
 
 TTSMAKER_KEY = os.getenv('TTSMAKER_API_KEY','')
+TTS_ENGINE = os.getenv('TTS_ENGINE','')  # '', 'ttsmaker', 'gtts' or 'silent' (offline stub)
+TTS_MAX_WORKERS = int(os.getenv('TTS_MAX_WORKERS','4'))
 OUTPUT_AUDIO_DIR = Path(os.getenv('OUTPUT_DIR','./outputs')) / 'audio'
-OUTPUT_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+TTS_CACHE_DIR = Path(os.getenv('OUTPUT_DIR','./outputs')) / 'cache' / 'tts'
+
+# Shared keep-alive pool for TTSMaker calls and audio downloads
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=TTS_MAX_WORKERS, pool_maxsize=TTS_MAX_WORKERS))
+
+
+class TTSMakerEngine:
+    name = 'ttsmaker'
+    ext = 'mp3'
+
+    def __init__(self, voice: str = 'v4', api_key: str = TTSMAKER_KEY, session: requests.Session = _session):
+        if not api_key:
+            raise RuntimeError('TTSMAKER_API_KEY not configured')
+        self.voice = voice
+        self.api_key = api_key
+        self.session = session
+
+    def synthesize_to(self, text: str, path: Path):
+        url = 'https://api.ttsmaker.com/synthesize'
+        headers = {'Authorization': f'Bearer {self.api_key}'}
+        payload = {'voice': self.voice, 'text': text}
+        resp = self.session.post(url, json=payload, headers=headers, timeout=20)
+        resp.raise_for_status()
+        data = resp.json()
+        audio_url = data.get('audio_url') or data.get('url')
+        if not audio_url:
+            raise RuntimeError('No audio URL from TTSMaker')
+        # Stream the download to disk instead of holding the whole file in memory
+        with self.session.get(audio_url, timeout=30, stream=True) as r:
+            r.raise_for_status()
+            with open(path, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+
+
+class GTTSEngine:
+    name = 'gtts'
+    ext = 'mp3'
+
+    def __init__(self, lang: str = 'en'):
+        self.voice = lang
+
+    def synthesize_to(self, text: str, path: Path):
+        from gtts import gTTS
+        gTTS(text=text, lang=self.voice).save(str(path))
+
+
+class SilentEngine:
+    """Offline stub: writes silence lasting roughly as long as reading the text aloud would."""
+    name = 'silent'
+    ext = 'wav'
+
+    def __init__(self, words_per_minute: int = 160, sample_rate: int = 22050):
+        self.voice = f'{words_per_minute}wpm'
+        self.words_per_minute = words_per_minute
+        self.sample_rate = sample_rate
+
+    def synthesize_to(self, text: str, path: Path):
+        seconds = max(0.5, len(text.split()) * 60 / self.words_per_minute)
+        with wave.open(str(path), 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            w.writeframes(b'\x00\x00' * int(seconds * self.sample_rate))
+
+
+def default_engine(prefer: str = 'v4'):
+    """TTS_ENGINE if set, else TTSMaker when a key is configured, else gTTS."""
+    if TTS_ENGINE == 'silent':
+        return SilentEngine()
+    if TTS_ENGINE == 'gtts':
+        return GTTSEngine()
+    if TTSMAKER_KEY or TTS_ENGINE == 'ttsmaker':
+        return TTSMakerEngine(voice=prefer)
+    return GTTSEngine()
+
+
+def split_sentences(text: str) -> list[str]:
+    parts = re.split(r'(?<=[.!?])\s+', text.strip())
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _clip(engine, text: str) -> Path:
+    """Synthesize one sentence, cached on disk by hash(engine, voice, text)."""
+    key = hashlib.sha256(f'{engine.name}\0{engine.voice}\0{text}'.encode('utf-8')).hexdigest()
+    path = TTS_CACHE_DIR / key[:2] / f'{key}.{engine.ext}'
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp.{engine.ext}')
+    engine.synthesize_to(text, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def synthesize_sentences(sentences: list[str], engine=None, max_workers: int = TTS_MAX_WORKERS) -> tuple[Path, list[dict]]:
+    """
+    Synthesize each sentence concurrently (cached per sentence) and stitch them into one MP3.
+    :return: (audio path, timings) where timings[i] = {"text", "start", "end"} in seconds
+    """
+    engine = engine or default_engine()
+    sentences = [s for s in sentences if s.strip()]
+    if not sentences:
+        raise ValueError('Nothing to synthesize')
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        clips = list(pool.map(lambda s: _clip(engine, s), sentences))
+
+    timings = []
+    t = 0.0
+    for text, clip in zip(sentences, clips):
+        d = probe_duration(clip)
+        timings.append({'text': text, 'start': round(t, 3), 'end': round(t + d, 3)})
+        t += d
+
+    # Output name is derived from the clips, so identical narrations reuse the same file
+    digest = hashlib.sha256('\0'.join(c.stem for c in clips).encode('utf-8')).hexdigest()[:16]
+    out = OUTPUT_AUDIO_DIR / f'tts_{engine.name}_{digest}.mp3'
+    OUTPUT_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+    if not out.exists():
+        tmp = out.with_name(f'{out.stem}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp.mp3')
+        concat_audio([str(c) for c in clips], str(tmp))
+        os.replace(tmp, out)
+    return out, timings
+
 
 def ttsmaker_synthesize(text: str, voice: str = 'v4') -> Path:
     """Call TTSMaker API if key present. Returns Path to mp3."""
-    if not TTSMAKER_KEY:
-        raise RuntimeError('TTSMAKER_API_KEY not configured')
-    url = 'https://api.ttsmaker.com/synthesize'
-    headers = {'Authorization': f'Bearer {TTSMAKER_KEY}'}
-    payload = {'voice': voice, 'text': text}
-    resp = requests.post(url, json=payload, headers=headers, timeout=20)
-    resp.raise_for_status()
-    data = resp.json()
-    audio_url = data.get('audio_url') or data.get('url')
-    if not audio_url:
-        raise RuntimeError('No audio URL from TTSMaker')
-    r = requests.get(audio_url, timeout=30)
-    fname = OUTPUT_AUDIO_DIR / f'tts_{int(__import__("time").time())}.mp3'
-    with open(fname, 'wb') as f:
-        f.write(r.content)
-    return fname
+    return synthesize_sentences(split_sentences(text), engine=TTSMakerEngine(voice=voice))[0]
 
 def gtts_synthesize(text: str, lang: str = 'en') -> Path:
-    fname = OUTPUT_AUDIO_DIR / f'gtts_{int(__import__("time").time())}.mp3'
-    tts = gTTS(text=text, lang=lang)
-    tts.save(str(fname))
-    return fname
+    return synthesize_sentences(split_sentences(text), engine=GTTSEngine(lang=lang))[0]
 
 def synthesize(text: str, prefer: str = 'v4') -> Path:
-    """Try TTSMaker first if configured, else fallback to gTTS."""
+    """Try TTSMaker first if configured, else fallback to gTTS (TTS_ENGINE overrides both)."""
+    if TTS_ENGINE:
+        return synthesize_sentences(split_sentences(text), engine=default_engine(prefer))[0]
     try:
         if TTSMAKER_KEY:
             return ttsmaker_synthesize(text, voice=prefer)
@@ -0,0 +1,22 @@
+"""
+Test-wide setup: every state file, log and metrics record goes to a throwaway OUTPUT_DIR, never to ./outputs.
+config.py reads OUTPUT_DIR when it is first imported, so it is set here, before any test module imports it
+(worker processes spawned by the tests inherit it through the environment).
+"""
+import os
+import shutil
+import tempfile
+import pytest
+
+_OUTPUT_DIR = tempfile.mkdtemp(prefix="yt_auto_tests_")
+os.environ["OUTPUT_DIR"] = _OUTPUT_DIR
+
+
+@pytest.fixture(scope="session", autouse=True)
+def output_dir():
+    """The temporary OUTPUT_DIR, removed after the run."""
+    yield _OUTPUT_DIR
+    import logging
+    for handler in logging.getLogger("utils.logger").handlers:
+        handler.close()
+    shutil.rmtree(_OUTPUT_DIR, ignore_errors=True)
@@ -0,0 +1,67 @@
+"""ArtifactStore: content-hashed, sharded names hardlinked to one blob, and GC of uploaded artifacts only."""
+import os
+import tempfile
+import time
+import unittest
+
+
+class ArtifactStoreTest(unittest.TestCase):
+    def setUp(self):
+        from utils.artifact_store import ArtifactStore
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ArtifactStore(os.path.join(self.tmp.name, "artifacts"), budget_bytes=1000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def produce(self, data, kind="video", ext="mp4"):
+        path = self.store.staging_path(kind, ext)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_identical_content_is_stored_once_under_collision_free_names(self):
+        a = self.store.put(self.produce(b"x" * 400), "video", job_id=1)
+        b = self.store.put(self.produce(b"x" * 400), "video", job_id=2)
+        again = self.store.put(self.produce(b"x" * 400), "video", job_id=1)
+        self.assertEqual(again, a)
+        self.assertNotEqual(a, b)
+        self.assertTrue(os.path.basename(a).startswith("video_1_"))
+        self.assertEqual(os.path.relpath(a, self.store.root).split(os.sep)[:2],
+                         ["video", time.strftime("%Y-%m-%d")])
+        self.assertTrue(os.path.samefile(a, b))  # both names link the one blob
+        self.assertEqual(self.store.usage(), 400)
+        self.assertEqual(os.listdir(self.store.staging_dir), [])  # staged files were moved in
+
+    def test_gc_prunes_uploaded_artifacts_oldest_first_and_keeps_unpublished_ones(self):
+        old = self.store.put(self.produce(b"a" * 400), "video", job_id=1)
+        new = self.store.put(self.produce(b"b" * 400), "video", job_id=2)
+        pending = self.store.put(self.produce(b"c" * 400), "video", job_id=3)
+        self.store.mark_uploaded(old)
+        time.sleep(0.01)
+        self.store.mark_uploaded(new)
+
+        self.assertEqual(self.store.gc(), {"removed": 1, "freed_bytes": 400, "usage_bytes": 800})
+        self.assertEqual([os.path.exists(p) for p in (old, new, pending)], [False, True, True])
+        self.assertEqual(self.store.gc(budget_bytes=0)["removed"], 1)
+        self.assertEqual(self.store.gc(budget_bytes=0)["usage_bytes"], 400)  # never the unpublished one
+        self.assertTrue(os.path.exists(pending))
+
+    def test_a_shared_blob_survives_until_its_last_name_is_pruned(self):
+        first = self.store.put(self.produce(b"x" * 400), "video", job_id=1)
+        second = self.store.put(self.produce(b"x" * 400), "video", job_id=2)
+        self.store.mark_uploaded(first)
+        self.assertEqual(self.store.gc(budget_bytes=0), {"removed": 1, "freed_bytes": 0, "usage_bytes": 400})
+        with open(second, "rb") as f:
+            self.assertEqual(f.read(), b"x" * 400)
+
+    def test_leftovers_of_crashed_writers_are_swept(self):
+        stale = self.produce(b"half a video")
+        os.utime(stale, (time.time() - 7200,) * 2)
+        fresh = self.produce(b"still being written")
+        self.store.gc()
+        self.assertEqual((os.path.exists(stale), os.path.exists(fresh)), (False, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Benchmark suite: reproducible inputs, result files and regression checks against a baseline."""
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+def result(**metrics):
+    return {"results": metrics}
+
+
+class BenchmarkTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def main(self, *argv):
+        from benchmarks.run import main
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = main(list(argv))
+        return code, out.getvalue()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        return path
+
+    def test_captions_are_the_same_on_every_run(self):
+        from benchmarks.run import synthetic_captions
+        captions = synthetic_captions(5)
+        self.assertEqual(captions, synthetic_captions(5))
+        self.assertNotEqual(captions, synthetic_captions(5, seed=8))
+        self.assertTrue(all(4 <= len(c.split()) <= 9 and c[0].isupper() for c in captions))
+
+    def test_only_slowdowns_beyond_the_threshold_are_regressions(self):
+        from benchmarks.run import compare
+        baseline = result(raster={"ms_per_slide": 10.0, "slides_per_sec": 100.0, "slides": 5},
+                          encode={"ffmpeg": {"fps": 300.0, "seconds": 2.0}})
+        current = result(raster={"ms_per_slide": 10.5, "slides_per_sec": 80.0, "slides": 50},
+                         encode={"ffmpeg": {"fps": 400.0, "seconds": 1.5}})
+        with contextlib.redirect_stdout(io.StringIO()):
+            regressions = compare(baseline, current, threshold=0.10)
+        self.assertEqual([r[0] for r in regressions], ["raster.slides_per_sec"])  # higher is better here
+        self.assertAlmostEqual(regressions[0][3], -0.2)
+
+    def test_compare_exits_non_zero_on_a_regression(self):
+        old = self.write("old.json", result(encode={"seconds": 1.0}))
+        new = self.write("new.json", result(encode={"seconds": 1.5}))
+        self.assertEqual(self.main("--compare", old, new)[0], 1)
+        code, out = self.main("--compare", old, new, "--threshold", "0.6")
+        self.assertEqual(code, 0)
+        self.assertIn("No regressions beyond 60%", out)
+
+    def test_a_quick_run_writes_a_result_file_with_its_environment(self):
+        out = os.path.join(self.tmp.name, "run.json")
+        # A process of its own, as it is run: the suite configures the app through the environment before importing it
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, "-m", "benchmarks.run", "--quick", "--only", "raster", "--captions", "2",
+                        "--output", out], cwd=root, check=True, capture_output=True)
+        with open(out, encoding="utf-8") as f:
+            report = json.load(f)
+        self.assertEqual(list(report["results"]), ["raster"])
+        self.assertEqual(report["results"]["raster"]["slides"], 2)
+        self.assertGreater(report["results"]["raster"]["memory"]["peak_rss_bytes"], 0)
+        self.assertEqual(report["settings"]["repeat"], 1)
+        self.assertIn("ffmpeg", report["environment"])
+
+    def test_bad_arguments_fail_before_running(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            for argv in (["--only", "raster,warp"], ["--baseline", os.path.join(self.tmp.name, "missing.json")]):
+                with self.assertRaises(SystemExit):
+                    self.main(*argv)
+
+
+if __name__ == "__main__":
+    unittest.main()
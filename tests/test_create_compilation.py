@@ -0,0 +1,51 @@
+"""CompilationBuilder: which clips may be stream-copied into a compilation."""
+import os
+import subprocess
+import tempfile
+import unittest
+
+
+class CompilationTest(unittest.TestCase):
+    W, H = 640, 360
+
+    def setUp(self):
+        from PIL import Image
+        from services.ffmpeg_service import encode_still_segment, encoder_profile
+        from config import FPS
+        self.tmp = tempfile.TemporaryDirectory()
+        self.png = os.path.join(self.tmp.name, "slide.png")
+        Image.new("RGB", (self.W, self.H), (200, 50, 50)).save(self.png)
+        self.same = self.path("same.mp4")
+        encode_still_segment(self.png, self.same, FPS * 2, FPS, encoder_profile(), silent_audio=(44100, 2))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def builder(self):
+        from utils.render_cache import RenderCache
+        from workflows.create_compilation import CompilationBuilder
+        return CompilationBuilder(cache=RenderCache(root=self.path("cache")), width=self.W, height=self.H,
+                                  card_seconds=0.5)
+
+    def test_same_format_with_other_encoder_settings_is_reencoded(self):
+        from config import FPS
+        from services.ffmpeg_service import encoder_profile, ffmpeg_binary, h264_parameter_sets, run_ffmpeg, x264_args
+        other = self.path("other.mp4")  # same size, rate, codec and audio; other x264 headers (refs, SAR)
+        run_ffmpeg(['-f', 'lavfi', '-i', f'testsrc=s={self.W}x{self.H}:r={FPS}', '-f', 'lavfi',
+                    '-i', 'sine=r=44100', '-t', 2, '-ac', 2, *x264_args(encoder_profile("publish")),
+                    '-c:a', 'aac', '-video_track_timescale', 12288, other])
+        self.assertNotEqual(h264_parameter_sets(other), h264_parameter_sets(self.same))
+
+        out = self.path("out.mp4")
+        result = self.builder().build([{"video": self.same}, {"video": other}], "Top 2", out)
+        self.assertEqual((result["copied"], result["encoded"]), (1, 1))
+        decode = subprocess.run([ffmpeg_binary(), '-v', 'error', '-i', out, '-f', 'null', '-'],
+                                capture_output=True, text=True)
+        self.assertEqual(decode.stderr, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""AutopilotDaemon: batch jobs reuse one process pool for the daemon's lifetime."""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+INIT_DIR = os.path.join(tempfile.gettempdir(), f"yt_auto_daemon_init_{os.getpid()}")
+
+
+def note_init(workers):
+    open(os.path.join(INIT_DIR, str(os.getpid())), "w").close()
+
+
+def render_pid(item):
+    return {**item, "pid": os.getpid()}
+
+
+class DaemonTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(INIT_DIR, exist_ok=True)
+
+    def tearDown(self):
+        for name in os.listdir(INIT_DIR):
+            os.remove(os.path.join(INIT_DIR, name))
+        os.rmdir(INIT_DIR)
+        self.tmp.cleanup()
+
+    def test_batch_jobs_share_one_pool_of_warm_workers(self):
+        from workflows import daily_autopilot
+        from workflows.daemon import AutopilotDaemon, submit_job
+        autopilot = daily_autopilot.DailyAutopilot(upload=False)
+        daemon = AutopilotDaemon(autopilot, spool_dir=self.tmp.name)
+        for path in daemon.dirs.values():
+            os.makedirs(path, exist_ok=True)
+        items = lambda n: [{"job_id": None, "topic": f"topic {i}"} for i in range(n)]
+        with mock.patch.object(daily_autopilot, "_init_worker", note_init), \
+                mock.patch.object(daily_autopilot, "_render_item", render_pid), \
+                mock.patch.object(autopilot, "next_items", items), \
+                mock.patch.object(autopilot, "_with_seo", lambda batch: batch):
+            started = []
+            for _ in range(2):
+                submit_job(self.tmp.name, mode="batch", count=2, workers=2)
+                self.assertTrue(daemon.process_one())
+                started.append(set(os.listdir(INIT_DIR)))
+            autopilot.close()
+        pids = set()
+        for name in os.listdir(daemon.dirs["done"]):
+            with open(os.path.join(daemon.dirs["done"], name), encoding="utf-8") as f:
+                pids |= {str(item["pid"]) for item in json.load(f)["result"]}
+        self.assertEqual(len(os.listdir(daemon.dirs["done"])), 2)
+        self.assertEqual(started[1], started[0])  # the second job started no new worker processes
+        self.assertEqual(pids, started[0])
+        self.assertIsNone(autopilot._batch_pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""DailyAutopilot.run_batch: items rendered across a process pool, results in topic order."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+TOPICS = [
+    "Octopuses have three hearts and blue blood.",
+    "Honey never spoils; archaeologists found edible honey in ancient tombs.",
+    "A day on Venus is longer than its year, says a failing render.",
+    "Bananas are berries, but strawberries are not.",
+]
+
+
+def no_init(workers):
+    pass
+
+
+def fake_render(item):
+    if "failing" in item["topic"]:
+        raise RuntimeError("encoder crashed")
+    return {**item, "video": f"{item['job_id']}.mp4", "thumbnail": f"{item['job_id']}.png", "pid": os.getpid()}
+
+
+class RunBatchTest(unittest.TestCase):
+    def setUp(self):
+        from agents.topic_research_agent import TopicResearchAgent
+        from utils.artifact_store import ArtifactStore
+        from utils.job_journal import JobJournal
+        from workflows.daily_autopilot import DailyAutopilot
+        self.tmp = tempfile.TemporaryDirectory()
+        seed = os.path.join(self.tmp.name, "seed.txt")
+        with open(seed, "w", encoding="utf-8") as f:
+            f.write("\n".join(TOPICS) + "\n")
+        self.autopilot = DailyAutopilot(upload=False)
+        # cached_property slots: a throwaway topic store, journal and artifact store for this test
+        self.autopilot.__dict__.update(
+            topic_agent=TopicResearchAgent(seed, dedup=False, trending_path=os.path.join(self.tmp.name, "trends.json"),
+                                           state_path=os.path.join(self.tmp.name, "used.json")),
+            journal=JobJournal(os.path.join(self.tmp.name, "jobs.sqlite")),
+            store=ArtifactStore(os.path.join(self.tmp.name, "artifacts")))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_items_come_back_in_topic_order_and_a_failed_render_is_retried_later(self):
+        from workflows import daily_autopilot
+        with mock.patch.object(daily_autopilot, "_init_worker", no_init), \
+                mock.patch.object(daily_autopilot, "_render_item", fake_render):
+            results = self.autopilot.run_batch(4, workers=2, dry_run=True)
+        self.assertEqual(sorted(r["topic"] for r in results), sorted(TOPICS))
+        self.assertEqual([r["job_id"] for r in results], sorted(r["job_id"] for r in results))
+        self.assertTrue(all(r.get("tags") for r in results if "error" not in r))  # SEO added in the parent
+        self.assertNotIn(os.getpid(), {r.get("pid") for r in results})  # rendered in worker processes
+
+        failed = [r for r in results if "error" in r]
+        self.assertEqual([r["error"] for r in failed], ["encoder crashed"])
+        journal = self.autopilot.journal
+        statuses = {r["job_id"]: journal.job(r["job_id"])["status"] for r in results}
+        self.assertEqual(sorted(statuses.values()), ["failed", "rendered", "rendered", "rendered"])
+        [retry] = journal.claim()
+        self.assertEqual(retry["id"], failed[0]["job_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""ffmpeg helpers: encoder profiles, raw frames piped to x264 and stream-copy joins."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+
+FPS = 10
+W, H = 64, 48
+
+
+def frames(n, color=(200, 30, 30)):
+    for _ in range(n):
+        yield np.full((H, W, 3), color, dtype=np.uint8)
+
+
+class EncoderProfileTest(unittest.TestCase):
+    def test_threads_are_shared_by_parallel_encodes_unless_configured(self):
+        from services import ffmpeg_service
+        with mock.patch.object(ffmpeg_service, "ENCODER_THREADS", 0), mock.patch("os.cpu_count", return_value=8):
+            self.assertEqual(ffmpeg_service.encoder_profile("draft", parallel=3)["threads"], 2)
+            self.assertEqual(ffmpeg_service.encoder_profile("draft", parallel=16)["threads"], 1)
+        with mock.patch.object(ffmpeg_service, "ENCODER_THREADS", 5):
+            self.assertEqual(ffmpeg_service.encoder_profile("publish", parallel=4),
+                             {"preset": "medium", "crf": 20, "name": "publish", "threads": 5})
+        with self.assertRaisesRegex(ValueError, "draft, balanced, publish"):
+            ffmpeg_service.encoder_profile("lossless")
+
+    def test_x264_args_add_a_tune_only_when_asked(self):
+        from services.ffmpeg_service import encoder_profile, x264_args
+        profile = encoder_profile("draft")
+        self.assertNotIn("-tune", x264_args(profile))
+        self.assertEqual(x264_args({**profile, "tune": "stillimage"})[-4:], ["-tune", "stillimage", "-pix_fmt", "yuv420p"])
+
+
+class EncodeTest(unittest.TestCase):
+    def setUp(self):
+        from services.ffmpeg_service import encoder_profile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.profile = encoder_profile("draft")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def encode(self, name, source, **kwargs):
+        from services.ffmpeg_service import encode_raw_frames
+        return encode_raw_frames(source, self.path(name), W, H, FPS, profile=self.profile, **kwargs)
+
+    def test_piped_frames_are_encoded_with_the_audio_cut_to_the_video(self):
+        from services.ffmpeg_service import probe_streams, run_ffmpeg
+        run_ffmpeg(["-f", "lavfi", "-i", "sine=r=44100", "-t", 0.5, self.path("music.wav")])
+        out = self.encode("clip.mp4", frames(20), audio_path=self.path("music.wav"), duration=2.0)
+        streams = probe_streams(out)
+        self.assertAlmostEqual(streams["duration"], 2.0, delta=0.1)  # the 0.5 s track was looped
+        self.assertEqual({k: streams["video"][k] for k in ("codec", "pix_fmt", "width", "height", "fps")},
+                         {"codec": "h264", "pix_fmt": "yuv420p", "width": W, "height": H, "fps": FPS})
+        self.assertEqual(streams["audio"]["codec"], "aac")
+
+    def test_an_ffmpeg_failure_raises_with_its_message(self):
+        self.profile = {**self.profile, "preset": "no-such-preset"}
+        with self.assertRaisesRegex(RuntimeError, "ffmpeg failed"):
+            self.encode("bad.mp4", frames(5))
+
+    def test_a_failing_frame_source_stops_the_encoder(self):
+        def broken():
+            yield from frames(3)
+            raise ValueError("compositor crashed")
+
+        with self.assertRaisesRegex(ValueError, "compositor crashed"):
+            self.encode("partial.mp4", broken())
+
+    def test_segments_are_joined_by_stream_copy(self):
+        from services.ffmpeg_service import concat_segments, h264_parameter_sets, probe_streams
+        red = self.encode("red.mp4", frames(10))
+        blue = self.encode("blue.mp4", frames(15, color=(30, 30, 200)))
+        self.assertEqual(h264_parameter_sets(red), h264_parameter_sets(blue))
+        out = concat_segments([red, blue], self.path("joined.mp4"))
+        self.assertAlmostEqual(probe_streams(out)["duration"], 2.5, delta=0.1)
+        self.assertFalse(os.path.exists(out + ".txt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
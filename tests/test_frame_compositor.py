@@ -0,0 +1,78 @@
+"""CaptionCompositor and typewriter_ranks: what each frame shows."""
+import unittest
+import numpy as np
+
+W, H = 200, 120
+BG, FG = (0, 0, 0), (255, 255, 255)
+
+
+def font(size=40):
+    from PIL import ImageFont
+    return ImageFont.load_default(size=size)
+
+
+def glyphs(lines, fnt):
+    from PIL import Image, ImageDraw
+    img = Image.new("L", (W, H), 0)
+    draw = ImageDraw.Draw(img)
+    for text, x, y in lines:
+        draw.text((x, y), text, font=fnt, fill=255)
+    return np.asarray(img)
+
+
+def ink_box(frame):
+    ys, xs = np.nonzero(frame.any(axis=2))
+    return ys.min(), ys.max(), xs.min(), xs.max()
+
+
+class FrameCompositorTest(unittest.TestCase):
+    def compositor(self, lines, effects, **kwargs):
+        from utils.frame_compositor import CaptionCompositor, typewriter_ranks
+        fnt = font()
+        ranks, n_chars = typewriter_ranks(lines, fnt, (W, H))
+        return CaptionCompositor(glyphs(lines, fnt), BG, FG, kwargs.pop("duration", 1.0), 10, effects=effects,
+                                 ranks=ranks, n_chars=n_chars, **kwargs)
+
+    def test_overlapping_line_boxes_keep_each_line_in_its_own_order(self):
+        from utils.frame_compositor import typewriter_ranks
+        fnt = font()
+        lines = [("gy", 10, 0), ("Tk", 10, 28)]  # descenders of line 1 reach into line 2's ink box
+        ranks, n_chars = typewriter_ranks(lines, fnt, (W, H))
+        first, second = glyphs(lines[:1], fnt) > 0, glyphs(lines[1:], fnt) > 0
+        self.assertTrue((first & second.any(axis=1)[:, None]).any())  # the bands really overlap
+        self.assertTrue((ranks[first] < 2).all())  # revealed with line 1, not when line 2 is typed
+        self.assertTrue((ranks[second & ~first.any(axis=1)[:, None]] >= 2).all())
+        self.assertEqual(n_chars, 4)
+
+    def test_typewriter_reveals_one_character_at_a_time(self):
+        comp = self.compositor([("ab", 10, 20)], ("typewriter",), chars_per_second=10)
+        self.assertFalse(comp.frame(0).any())
+        _, _, left, right = ink_box(comp.frame(1).copy())
+        self.assertLess(right, 10 + font().getlength("a") + 2)  # only "a"
+        full = ink_box(comp.frame(2).copy())
+        self.assertGreater(full[3], right)
+
+    def test_fade_blends_towards_the_text_color(self):
+        comp = self.compositor([("ab", 10, 20)], ("fade",), fade_seconds=1.0, duration=2.0)
+        self.assertEqual(comp.frame(0).max(), 0)
+        self.assertAlmostEqual(int(comp.frame(5).max()), 128, delta=1)
+        self.assertEqual(comp.frame(10).max(), 255)
+
+    def test_zoom_grows_the_text_and_reuses_the_frame_buffer(self):
+        comp = self.compositor([("ab", 60, 40)], ("zoom",), zoom_to=1.5, duration=1.0)
+        start = ink_box(comp.frame(0).copy())
+        end = comp.frame(10)
+        self.assertIs(end, comp.frame(10))
+        top, bottom, left, right = ink_box(end)
+        self.assertGreater(bottom - top, start[1] - start[0])
+        self.assertGreater(right - left, start[3] - start[2])
+
+    def test_unknown_effects_are_rejected(self):
+        from utils.frame_compositor import parse_effects
+        self.assertEqual(parse_effects("Fade, zoom"), ("fade", "zoom"))
+        with self.assertRaises(ValueError):
+            parse_effects("fade,wobble")
+
+
+if __name__ == "__main__":
+    unittest.main()
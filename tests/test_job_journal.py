@@ -0,0 +1,72 @@
+"""JobJournal: steps skipped only while their artifacts are intact, and jobs leased to one process at a time."""
+import os
+import tempfile
+import time
+import unittest
+
+
+class JobJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "jobs.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def journal(self, **kwargs):
+        from utils.job_journal import JobJournal
+        return JobJournal(self.db, **kwargs)
+
+    def artifact(self, name, data=b"frames"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_a_finished_step_is_reused_only_while_its_artifacts_are_unchanged(self):
+        journal = self.journal()
+        job = journal.create("Octopuses have three hearts.")
+        video = self.artifact("short.mp4")
+        outputs = {"video": video, "captions": ["Octopuses", "have three hearts"]}
+        journal.record_step(job, "render", time.time(), outputs)
+        self.assertEqual(self.journal().completed_step(job, "render"), outputs)  # a restarted process sees it
+
+        self.artifact("short.mp4", b"frames, truncated")
+        self.assertIsNone(journal.completed_step(job, "render"))
+        journal.record_step(job, "render", time.time(), outputs)
+        os.remove(video)
+        self.assertIsNone(journal.completed_step(job, "render"))
+
+        journal.record_step(job, "upload", time.time(), error="quota exceeded")
+        self.assertIsNone(journal.completed_step(job, "upload"))
+        self.assertEqual(journal.step_latency()["render"]["runs"], 2)
+
+    def test_a_leased_job_goes_to_another_process_only_after_its_lease_runs_out(self):
+        crashed = self.journal(lease_seconds=0.2)
+        job = crashed.create("Honey never spoils.")
+        other = self.journal()
+        self.assertEqual(other.claim(), [])
+        time.sleep(0.3)
+        [claimed] = other.claim()
+        self.assertEqual((claimed["id"], claimed["attempts"], claimed["claimed_by"]), (job, 2, other.owner))
+        self.assertEqual(self.journal().claim(), [])  # now leased to `other`
+
+    def test_failed_jobs_are_retried_until_the_attempt_limit(self):
+        journal = self.journal(max_attempts=2, lease_seconds=0.1)
+        failed = journal.create("Bananas are berries.")
+        journal.finish(failed, error="encoder crashed")
+        abandoned = journal.create("A day on Venus is longer than its year.")
+        done = journal.create("Starfish are not fish.")
+        journal.finish(done)
+
+        time.sleep(0.2)
+        self.assertEqual([j["id"] for j in journal.claim()], [failed, abandoned])
+        journal.finish(failed, error="encoder crashed again")
+        time.sleep(0.2)
+        self.assertEqual(journal.claim(), [])
+        self.assertEqual((journal.job(abandoned)["status"], journal.job(abandoned)["error"]), ("failed", "abandoned"))
+        self.assertEqual(journal.backlog()["by_status"], {"done": 1, "failed": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
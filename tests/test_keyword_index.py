@@ -0,0 +1,65 @@
+"""KeywordIndex: niche scoring, keyword ranking and SEO tags from a small keyword file."""
+import json
+import os
+import tempfile
+import unittest
+
+KEYWORDS = {
+    "generic_tags": ["facts", "didyouknow"],
+    "stopwords": ["have", "than", "more"],
+    "niches": {
+        "space": {"keywords": ["black hole", "star", "galaxy", "milky way"], "tags": ["space", "astronomy"]},
+        "animals": {"keywords": ["octopus", "heart", "star"], "tags": ["animals", "wildlife"]},
+    },
+}
+CORPUS = [
+    "Octopuses have three hearts.",
+    "Some stars are older than their galaxy.",
+    "A black hole can spin.",
+    "Starfish are not fish.",
+]
+
+
+class KeywordIndexTest(unittest.TestCase):
+    def setUp(self):
+        from services.keyword_index import KeywordIndex
+        self.tmp = tempfile.TemporaryDirectory()
+        self.keywords = os.path.join(self.tmp.name, "keywords.json")
+        with open(self.keywords, "w", encoding="utf-8") as f:
+            json.dump(KEYWORDS, f)
+        self.index = KeywordIndex.build(self.keywords, corpus=CORPUS)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_topics_are_scored_against_every_niche_in_one_batch(self):
+        space, animals, neither = self.index.analyze_many([
+            "The Milky Way galaxy has a black hole at its center.",
+            "An octopus has three hearts.",
+            "Bananas are berries.",
+        ])
+        self.assertEqual((space["niche"], animals["niche"], neither["niche"]), ("space", "animals", None))
+        self.assertEqual(space["keywords"][:3], ["milky way", "galaxy", "black hole"])  # rarest first, ties in topic order
+        self.assertIn("octopus", animals["keywords"])  # plural folded onto the phrase
+        self.assertEqual(neither["keywords"], ["bananas", "berries"])  # plain words keep their surface form
+
+    def test_a_phrase_in_two_niches_counts_where_it_was_indexed_first(self):
+        [info] = self.index.analyze_many(["A star is born."])
+        self.assertEqual(info["niche"], "space")
+
+    def test_seo_tags_are_deduplicated_and_capped(self):
+        [seo] = self.index.seo_many(["An octopus heart"], n_tags=5)
+        self.assertEqual(seo["tags"], ["octopus", "heart", "animals", "wildlife", "facts"])
+        self.assertTrue(seo["description"].startswith("An octopus heart\n"))
+        self.assertIn("#shorts #animals #wildlife #octopus #heart", seo["description"])
+
+    def test_a_saved_index_loads_with_the_same_scores(self):
+        from services.keyword_index import KeywordIndex
+        path = os.path.join(self.tmp.name, "index.json")
+        self.index.save(path, sources=[])
+        topics = ["Black holes and stars", "Octopus hearts"]
+        self.assertEqual(KeywordIndex.load(path).analyze_many(topics), self.index.analyze_many(topics))
+
+
+if __name__ == "__main__":
+    unittest.main()
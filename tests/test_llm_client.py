@@ -0,0 +1,85 @@
+"""LLMClient against a local stub of the /invoke endpoint."""
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from tests.http_stub import StubHandler, serve
+
+
+def take_tokens(path, n, times):
+    from services.llm_client import SharedRateLimiter
+    limiter = SharedRateLimiter(path, "endpoint", calls=4, period=1)
+    for _ in range(n):
+        limiter.acquire()
+        times.put(time.time())
+
+
+class StubLLM(StubHandler):
+    def do_POST(self):
+        request = json.loads(self.body())
+        with self.state["lock"]:
+            self.state["calls"] += 1
+            self.state["connections"].add(self.client_address)
+        if "fail" in request["input"]:
+            return self.reply(500)
+        time.sleep(0.05)
+        out = json.dumps({"output": [f"echo: {request['input']}"], "model": request["model"]}).encode()
+        self.reply(200, out, {"Content-Type": "application/json"})
+
+
+class LLMClientTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base, self.server = serve(StubLLM, calls=0, connections=set())
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.tmp.cleanup()
+
+    def client(self, **kwargs):
+        from services.llm_client import LLMClient
+        return LLMClient("key", self.base, cache_path=os.path.join(self.tmp.name, "llm.sqlite"), **kwargs)
+
+    def test_responses_are_cached_in_memory_and_on_disk(self):
+        self.assertEqual(self.client().complete("hello")["output"], ["echo: hello"])
+        fresh = self.client()  # new process-equivalent: only the SQLite cache is shared
+        self.assertEqual(fresh.complete("hello")["output"], ["echo: hello"])
+        self.assertEqual(self.server.state["calls"], 1)
+        self.assertEqual(fresh.stats, {"requests": 0, "cache_hits": 1})
+
+    def test_complete_many_keeps_order_pools_connections_and_returns_errors(self):
+        client = self.client(max_workers=3)
+        prompts = [f"topic {i}" for i in range(9)] + ["fail please"]
+        results = client.complete_many(prompts)
+        self.assertEqual([r["output"][0] for r in results[:9]], [f"echo: {p}" for p in prompts[:9]])
+        self.assertIsInstance(results[9], Exception)
+        self.assertLessEqual(len(self.server.state["connections"]), 3)  # keep-alive pool, not a connection per call
+
+    def test_clients_sharing_a_cache_share_the_rate_limit(self):
+        first, second = self.client(calls_per_minute=2), self.client(calls_per_minute=2)
+        first.complete_many(["a", "b"])
+        with mock.patch("services.llm_client.time.sleep", side_effect=InterruptedError) as sleep:
+            with self.assertRaises(InterruptedError):
+                second.complete("c")  # the other client used up the bucket: wait ~30 s for the next token
+        self.assertAlmostEqual(sleep.call_args[0][0], 30, delta=1)
+        self.assertEqual(self.server.state["calls"], 2)
+
+    def test_the_limit_holds_across_processes(self):
+        path = os.path.join(self.tmp.name, "llm.sqlite")
+        ctx = multiprocessing.get_context("spawn")
+        times = ctx.Queue()
+        procs = [ctx.Process(target=take_tokens, args=(path, 4, times)) for _ in range(3)]
+        for p in procs:
+            p.start()
+        calls = sorted(times.get(timeout=30) for _ in range(12))
+        for p in procs:
+            p.join(30)
+        # 4/s with a burst of 4: the 12th call comes 2 s after the first, however many processes ask
+        self.assertGreaterEqual(calls[-1] - calls[0], 1.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
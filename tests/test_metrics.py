@@ -0,0 +1,70 @@
+"""Metrics: per-stage records, JSON-lines export, aggregates and the Prometheus textfile."""
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        from utils.metrics import Metrics
+        self.tmp = tempfile.TemporaryDirectory()
+        self.jsonl = os.path.join(self.tmp.name, "metrics", "stages.jsonl")
+        self.prom = os.path.join(self.tmp.name, "ytshorts.prom")
+        self.metrics = Metrics(jsonl_path=self.jsonl, prom_path=self.prom)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_a_stage_records_its_time_outputs_and_failure(self):
+        out = os.path.join(self.tmp.name, "short.mp4")
+        with self.metrics.stage("render", topic="Octopuses") as rec:
+            time.sleep(0.05)
+            with open(out, "wb") as f:
+                f.write(b"x" * 1234)
+            rec.add_file(out)
+        with self.assertRaises(RuntimeError), self.metrics.stage("upload"):
+            raise RuntimeError("quota exceeded")
+
+        with open(self.jsonl, encoding="utf-8") as f:
+            render, upload = [json.loads(line) for line in f]
+        self.assertEqual((render["stage"], render["topic"], render["ok"], render["output_bytes"]),
+                         ("render", "Octopuses", True, 1234))
+        self.assertGreaterEqual(render["wall_seconds"], 0.05)
+        self.assertGreater(render["peak_rss_bytes"], 0)
+        self.assertEqual((upload["ok"], upload["error"]), (False, "quota exceeded"))
+
+    def test_runs_are_aggregated_into_a_summary_and_prometheus_histograms(self):
+        for seconds, ok in ((0.2, True), (3.0, True), (40.0, False)):
+            self.metrics.observe({"stage": "render", "ok": ok, "wall_seconds": seconds, "cpu_seconds": 1.0,
+                                  "output_bytes": 100}, write=False)
+        summary = self.metrics.summary()["render"]
+        self.assertEqual({k: summary[k] for k in ("count", "failures", "wall_p50", "wall_max", "output_bytes")},
+                         {"count": 3, "failures": 1, "wall_p50": 3.0, "wall_max": 40.0, "output_bytes": 300})
+        self.assertFalse(os.path.exists(self.jsonl))
+
+        self.assertEqual(self.metrics.write_prometheus(), self.prom)
+        with open(self.prom, encoding="utf-8") as f:
+            text = f.read()
+        for line in ('ytshorts_stage_duration_seconds_bucket{stage="render",le="0.5"} 1',
+                     'ytshorts_stage_duration_seconds_bucket{stage="render",le="5"} 2',
+                     'ytshorts_stage_duration_seconds_bucket{stage="render",le="+Inf"} 3',
+                     'ytshorts_stage_failures_total{stage="render"} 1'):
+            self.assertIn(line, text)
+
+    def test_memory_stays_bounded_in_a_long_running_process(self):
+        from utils import metrics
+        with mock.patch.object(metrics, "MAX_RECORDS", 5), mock.patch.object(metrics, "RECENT_WALLS", 3):
+            bounded = metrics.Metrics(jsonl_path=None, prom_path=None)
+            for i in range(10):
+                bounded.observe({"stage": "render", "ok": True, "wall_seconds": float(i), "cpu_seconds": 0.0})
+        self.assertEqual(len(bounded.records), 5)
+        summary = bounded.summary()["render"]
+        self.assertEqual((summary["count"], summary["wall_p50"], summary["wall_max"]), (10, 8.0, 9.0))
+        self.assertIsNone(bounded.write_prometheus())
+
+
+if __name__ == "__main__":
+    unittest.main()
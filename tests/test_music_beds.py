@@ -0,0 +1,63 @@
+"""MusicBeds: tracks prepared once into looped, normalized AAC beds that renders rotate through."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+class MusicBedsTest(unittest.TestCase):
+    def setUp(self):
+        from services.ffmpeg_service import run_ffmpeg
+        self.tmp = tempfile.TemporaryDirectory()
+        self.music = os.path.join(self.tmp.name, "music")
+        os.makedirs(self.music)
+        for name, hz in (("calm.wav", 220), ("upbeat.wav", 440)):
+            run_ffmpeg(["-f", "lavfi", "-i", f"sine=f={hz}:r=44100", "-t", 1, os.path.join(self.music, name)])
+        with open(os.path.join(self.music, "notes.txt"), "w") as f:
+            f.write("not a track")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def beds(self):
+        from services.music_beds import MusicBeds
+        return MusicBeds(music_dir=self.music, beds_dir=os.path.join(self.tmp.name, "beds"))
+
+    def test_a_bed_is_looped_to_length_normalized_and_attenuated(self):
+        from services.ffmpeg_service import probe_streams
+        built = self.beds().build(3.0)
+        self.assertEqual([b["source"] for b in built], ["calm.wav", "upbeat.wav"])
+        streams = probe_streams(built[0]["path"])
+        self.assertAlmostEqual(streams["duration"], 3.0, delta=0.1)  # a 1 s track looped three times
+        self.assertEqual((streams["video"], streams["audio"]["codec"]), (None, "aac"))
+        self.assertAlmostEqual(built[0]["loudness_lufs"], -16.0 - 12.0, delta=2.0)  # -16 LUFS, then volume=0.25
+
+    def test_unchanged_tracks_are_not_built_again_and_changed_ones_replace_their_bed(self):
+        from services import music_beds
+        beds = self.beds()
+        old = {b["source"]: b["path"] for b in beds.build(3.0)}
+        with mock.patch.object(music_beds, "run_ffmpeg") as ffmpeg:
+            beds.build(3.0)
+        ffmpeg.assert_not_called()
+
+        upbeat = os.path.join(self.music, "upbeat.wav")
+        os.utime(upbeat, (1, 1))
+        new = {b["source"]: b["path"] for b in self.beds().build(3.0)}
+        self.assertEqual(new["calm.wav"], old["calm.wav"])
+        self.assertNotEqual(new["upbeat.wav"], old["upbeat.wav"])
+        self.assertFalse(os.path.exists(old["upbeat.wav"]))
+
+    def test_renders_rotate_through_the_shortest_beds_long_enough(self):
+        beds = self.beds()
+        beds.build(3.0)
+        beds.build(6.0)
+        three = {b["path"] for b in beds.beds_for(3.0)}
+        picks = [beds.next_bed(2.5) for _ in range(4)]
+        self.assertEqual(set(picks), three)
+        self.assertEqual(picks[:2], picks[2:])
+        self.assertTrue(all(b["duration"] == 6.0 for b in beds.beds_for(4.0)))
+        self.assertIsNone(beds.next_bed(10.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
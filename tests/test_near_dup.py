@@ -0,0 +1,54 @@
+"""NearDuplicateIndex: paraphrases and reorderings match, unrelated facts don't."""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+PUBLISHED = [
+    "Earth has more trees than the Milky Way has stars.",
+    "Octopuses have three hearts and blue blood.",
+    "Honey never spoils; archaeologists found edible honey in ancient tombs.",
+]
+
+
+class NearDuplicateTest(unittest.TestCase):
+    def setUp(self):
+        from utils.near_dup import NearDuplicateIndex
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "near_dup.sqlite")
+        self.index = NearDuplicateIndex(self.path, threshold=0.5)
+        for text in PUBLISHED:
+            self.index.add(text)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_paraphrases_and_reorderings_are_duplicates(self):
+        for text in ("There are more trees on Earth than stars in the Milky Way.",
+                     "An octopus has blue blood and three hearts.",
+                     "Archaeologists found edible honey in ancient tombs: honey never spoils."):
+            self.assertTrue(self.index.is_near_duplicate(text), text)
+
+    def test_unrelated_facts_are_not(self):
+        for text in ("Bananas are berries, but strawberries are not.",
+                     "Oxford University is older than the Aztec Empire.",
+                     "The Eiffel Tower was originally intended for Barcelona."):
+            self.assertFalse(self.index.is_near_duplicate(text), text)
+
+    def test_stopwords_are_dropped_before_plurals_are_stripped(self):
+        from utils.near_dup import shingles
+        self.assertEqual(shingles("This is why cats sleep so much"), {"why", "cat", "sleep", "much"})
+        self.assertEqual(shingles("Does this octopus have glass eyes?"), {"octopus", "glass", "eye"})
+
+    def test_an_index_from_older_shingling_is_resigned(self):
+        from utils.near_dup import NearDuplicateIndex
+        with sqlite3.connect(self.path) as db:
+            db.execute("DELETE FROM meta")
+            db.execute("UPDATE topics SET sig = zeroblob(length(sig))")
+        reopened = NearDuplicateIndex(self.path, threshold=0.5)
+        self.assertEqual(len(reopened), len(PUBLISHED))
+        self.assertTrue(reopened.is_near_duplicate("An octopus has blue blood and three hearts."))
+
+
+if __name__ == "__main__":
+    unittest.main()
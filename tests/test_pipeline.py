@@ -0,0 +1,93 @@
+"""StagedPipeline: items flow through bounded stages in source order; failures pass through marked."""
+import threading
+import time
+import unittest
+
+
+def slow(seconds, key):
+    def fn(item):
+        time.sleep(seconds)
+        return {**item, key: True}
+    return fn
+
+
+class StagedPipelineTest(unittest.TestCase):
+    def test_items_come_back_in_source_order_across_parallel_workers(self):
+        from workflows.pipeline import Stage, StagedPipeline
+
+        def render(item):
+            time.sleep(0.02 * (5 - item["n"]))  # later items finish first
+            return {**item, "rendered": True}
+
+        pipeline = StagedPipeline([Stage("render", render, workers=3), Stage("upload", slow(0, "uploaded"))])
+        results = pipeline.run({"n": n} for n in range(5))
+        self.assertEqual([r["n"] for r in results], list(range(5)))
+        self.assertTrue(all(r["rendered"] and r["uploaded"] for r in results))
+        stages = pipeline.stats()["stages"]
+        self.assertEqual((stages["render"]["workers"], stages["render"]["processed"]), (3, 5))
+        self.assertLessEqual(stages["upload"]["max_queue_depth"], pipeline.queue_size)
+
+    def test_a_failed_item_skips_later_stages_and_the_rest_still_finish(self):
+        from workflows.pipeline import Stage, StagedPipeline
+
+        def render(item):
+            if item["n"] == 1:
+                raise RuntimeError("encoder crashed")
+            return {**item, "rendered": True}
+
+        uploaded = []
+        pipeline = StagedPipeline([Stage("render", render), Stage("upload", lambda item: uploaded.append(item["n"]) or item)])
+        results = pipeline.run({"n": n} for n in range(3))
+        self.assertEqual((results[1]["error"], results[1]["failed_stage"]), ("encoder crashed", "render"))
+        self.assertEqual(uploaded, [0, 2])
+        self.assertEqual(pipeline.stats()["stages"]["render"]["failed"], 1)
+
+    def test_a_failing_source_stops_the_feed_but_keeps_what_was_fed(self):
+        from workflows.pipeline import Stage, StagedPipeline
+
+        def source():
+            yield {"n": 0}
+            yield {"n": 1}
+            raise ValueError("topic file vanished")
+
+        pipeline = StagedPipeline([Stage("render", slow(0, "rendered"))])
+        results = pipeline.run(source(), source_name="topics")
+        self.assertEqual([r["n"] for r in results], [0, 1])
+        self.assertEqual(pipeline.stats()["stages"]["topics"]["error"], "topic file vanished")
+
+    def test_stages_overlap_instead_of_running_back_to_back(self):
+        from workflows.pipeline import Stage, StagedPipeline
+        pipeline = StagedPipeline([Stage("render", slow(0.05, "rendered")), Stage("upload", slow(0.05, "uploaded"))])
+        pipeline.run({"n": n} for n in range(6))
+        self.assertLess(pipeline.stats()["wall_seconds"], 0.55)  # 0.6s if the stages ran one after the other
+
+
+class FanOutTest(unittest.TestCase):
+    def test_steps_run_concurrently_and_their_outputs_are_merged(self):
+        from workflows.pipeline import fan_out
+        barrier = threading.Barrier(2, timeout=5)  # both steps must be running at once to get past it
+
+        def video(item):
+            barrier.wait()
+            return {"video": f"{item['id']}.mp4"}
+
+        def thumbnail(item):
+            barrier.wait()
+            return {"thumbnail": f"{item['id']}.png"}
+
+        self.assertEqual(fan_out(video, thumbnail)({"id": "a"}), {"id": "a", "video": "a.mp4", "thumbnail": "a.png"})
+
+    def test_the_first_error_in_argument_order_is_raised(self):
+        from workflows.pipeline import fan_out
+
+        def fail(message):
+            def fn(item):
+                raise RuntimeError(message)
+            return fn
+
+        with self.assertRaisesRegex(RuntimeError, "first"):
+            fan_out(lambda item: {}, fail("first"), fail("second"))({})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""RenderCache: content-addressed entries, LRU eviction and hit statistics."""
+import os
+import tempfile
+import time
+import unittest
+
+
+class RenderCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def cache(self, max_bytes=1000):
+        from utils.render_cache import RenderCache
+        return RenderCache(root=self.root, max_bytes=max_bytes)
+
+    def put(self, cache, key, size=300, seconds=0.0):
+        src = os.path.join(self.tmp.name, f"{key}.bin")
+        with open(src, "wb") as f:
+            f.write(b"x" * size)
+        return cache.put("segment", key, "mp4", src, seconds)
+
+    def test_keys_depend_on_every_parameter_but_not_their_order(self):
+        from utils.render_cache import make_key
+        self.assertEqual(make_key(text="a", size=90), make_key(size=90, text="a"))
+        self.assertNotEqual(make_key(text="a", size=90), make_key(text="a", size=91))
+
+    def test_least_recently_used_entries_are_evicted_down_to_the_low_watermark(self):
+        cache = self.cache()
+        paths = [self.put(cache, key) for key in ("aa1", "bb2", "cc3")]
+        now = time.time()
+        for age, path in zip((300, 200, 100), paths):
+            os.utime(path, (now - age, now - age))
+        self.assertEqual(cache.get("segment", "aa1", "mp4"), paths[0])  # oldest, but just used
+
+        newest = self.put(cache, "dd4")  # 1200 bytes > 1000: evict to <= 800
+        self.assertEqual([os.path.exists(p) for p in paths], [True, False, False])
+        self.assertTrue(os.path.exists(newest))
+        self.assertEqual(cache.stats()["bytes"], 600)
+        self.assertEqual(self.cache().stats()["bytes"], 600)  # a new process sums what is on disk
+
+    def test_hits_report_the_render_time_they_saved(self):
+        cache = self.cache()
+        self.assertIsNone(cache.get("segment", "aa1", "mp4"))
+        self.put(cache, "aa1", seconds=2.0)
+        for _ in range(3):
+            cache.get("segment", "aa1", "mp4")
+        stats = cache.stats()
+        self.assertEqual(stats["kinds"]["segment"], {"hits": 3, "misses": 1, "hit_rate": 0.75, "saved_seconds": 6.0})
+        self.assertEqual(stats["saved_seconds"], 6.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Render farm: several local worker processes sharing one SQLite queue."""
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+
+class EchoAgent:
+    """Stands in for VideoEditorAgent: writes the captions (and the staged audio's bytes) as the "video"."""
+
+    def create_video(self, captions, audio_path=None, durations=None, out_path=None):
+        audio = open(audio_path, "rb").read() if audio_path else b""
+        with open(out_path, "wb") as f:
+            f.write("|".join(captions).encode() + audio)
+        return out_path
+
+
+def echo_agent(profile, effects):
+    return EchoAgent()
+
+
+def run_worker(url, farm_dir, name):
+    from utils.render_queue import open_render_queue
+    from workflows.render_farm import RenderWorker
+    RenderWorker(open_render_queue(url), farm_dir, worker_id=name, agent_factory=echo_agent).serve_forever(idle_exit=2)
+
+
+class RenderFarmTest(unittest.TestCase):
+    def setUp(self):
+        from utils.render_queue import open_render_queue
+        self.tmp = tempfile.TemporaryDirectory()
+        self.farm = os.path.join(self.tmp.name, "farm")
+        self.url = self.queue_url()
+        self.queue = open_render_queue(self.url)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def queue_url(self):
+        return "sqlite:///" + os.path.join(self.tmp.name, "queue.sqlite")
+
+    def test_worker_processes_render_every_job_once(self):
+        from workflows.render_farm import FarmVideoAgent
+        audio = os.path.join(self.tmp.name, "voice.mp3")
+        with open(audio, "wb") as f:
+            f.write(b"AUDIO")
+        coordinator = FarmVideoAgent(self.queue, self.farm, timeout=60)
+        ids = [coordinator.submit([f"caption {i}"], audio) for i in range(12)]
+        ctx = multiprocessing.get_context("spawn")
+        workers = [ctx.Process(target=run_worker, args=(self.url, self.farm, f"w{n}")) for n in range(3)]
+        for w in workers:
+            w.start()
+        try:
+            results = [coordinator.wait(job_id) for job_id in ids]
+        finally:
+            for w in workers:
+                w.join(30)
+        for i, result in enumerate(results):
+            with open(result["video"], "rb") as f:
+                self.assertEqual(f.read(), f"caption {i}AUDIO".encode())
+        stats = self.queue.stats()
+        self.assertEqual(stats["queue"], {"done": 12})
+        self.assertEqual(sum(w["jobs_done"] for w in stats["workers"].values()), 12)
+        self.assertTrue(all(self.queue.get(job_id)["attempts"] == 1 for job_id in ids))
+
+    def test_a_worker_that_lost_its_lease_gets_no_credit(self):
+        self.queue.register_worker("slow", "host", 1)
+        self.queue.register_worker("fast", "host", 2)
+        job_id = self.queue.enqueue({"captions": ["x"]})
+        self.assertEqual(self.queue.lease("slow", 0.01)["id"], job_id)
+        time.sleep(0.05)
+        self.queue.requeue_expired()
+        self.assertEqual(self.queue.lease("fast", 60)["id"], job_id)
+        self.assertFalse(self.queue.complete(job_id, "slow", {"video": "late.mp4"}, 1.0))
+        self.assertTrue(self.queue.complete(job_id, "fast", {"video": "ok.mp4"}, 1.0))
+        workers = self.queue.stats()["workers"]
+        self.assertEqual((workers["slow"]["jobs_done"], workers["fast"]["jobs_done"]), (0, 1))
+
+    def test_staged_inputs_are_removed_and_orphans_swept(self):
+        from workflows.render_farm import FarmVideoAgent, RenderWorker, sweep_farm
+        audio = os.path.join(self.tmp.name, "voice.mp3")
+        with open(audio, "wb") as f:
+            f.write(b"AUDIO")
+        worker = RenderWorker(self.queue, self.farm, worker_id="w", agent_factory=echo_agent)
+        thread = threading.Thread(target=worker.serve_forever, kwargs={"max_jobs": 1})
+        thread.start()
+        FarmVideoAgent(self.queue, self.farm, timeout=30).create_video(["a"], audio,
+                                                                       out_path=os.path.join(self.tmp.name, "out.mp4"))
+        thread.join()
+        coordinator = FarmVideoAgent(self.queue, self.farm)
+        self.assertEqual(os.listdir(os.path.join(self.farm, "inputs")), [])
+
+        pending = coordinator.submit(["b"], audio)  # still queued: its input must survive the sweep
+        orphan = os.path.join(self.farm, "results", "job99_gone.mp4")
+        with open(orphan, "wb") as f:
+            f.write(b"lost")
+        old = time.time() - 7200
+        for d in ("inputs", "results"):
+            for name in os.listdir(os.path.join(self.farm, d)):
+                os.utime(os.path.join(self.farm, d, name), (old, old))
+        self.assertEqual(sweep_farm(self.queue, self.farm, max_age=3600), 1)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(self.queue.get(pending)["payload"]["audio"]))
+
+
+class DirRenderFarmTest(RenderFarmTest):
+    """The same farm on the shared-directory backend (the one meant for NFS)."""
+
+    def queue_url(self):
+        return "dir://" + os.path.join(self.tmp.name, "queue")
+
+    def test_a_lock_left_by_a_dead_process_is_broken(self):
+        from utils import render_queue
+        job_id = self.queue.enqueue({"captions": ["x"]})
+        lock = os.path.join(self.tmp.name, "queue", "locks", f"job{job_id}.lock")
+        open(lock, "w").close()
+        time.sleep(0.1)
+        with mock.patch.object(render_queue, "LOCK_STALE_SECONDS", 0.05):
+            self.assertEqual(self.queue.lease("w", 60)["id"], job_id)
+        self.assertFalse(os.path.exists(lock))
+
+    def test_the_interface_is_abstract(self):
+        from utils.render_queue import RenderQueue
+        with self.assertRaises(TypeError):
+            RenderQueue()
+
+
+if __name__ == "__main__":
+    unittest.main()
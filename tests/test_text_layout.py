@@ -0,0 +1,44 @@
+"""Font cache and memoized text layout."""
+import os
+import unittest
+from tests.test_video_editing_agent import FONT
+
+
+class TextLayoutTest(unittest.TestCase):
+    def setUp(self):
+        from utils import text_layout
+        for fn in (text_layout.get_font, text_layout.get_font_or_default, text_layout.text_width,
+                   text_layout.text_bbox, text_layout.layout_lines):
+            fn.cache_clear()
+
+    def test_a_font_is_loaded_once_per_path_and_size(self):
+        from utils.text_layout import get_font, get_font_or_default
+        self.assertIs(get_font(FONT, 90), get_font(FONT, 90))
+        self.assertIsNot(get_font(FONT, 90), get_font(FONT, 40))
+        self.assertEqual(get_font.cache_info().misses, 2)
+        missing = os.path.join(os.path.dirname(FONT), "missing.ttf")
+        self.assertIs(get_font_or_default(missing, 90), get_font_or_default(missing, 90))
+
+    def test_each_distinct_word_is_measured_once(self):
+        from utils.text_layout import get_font, text_width, wrap_words
+        font = get_font(FONT, 90)
+        text = "the cat and the dog and the bird"
+        lines = wrap_words(text, font, 500)
+        self.assertEqual(" ".join(lines), text)
+        self.assertTrue(all(font.getlength(line) <= 500 for line in lines if " " in line))
+        self.assertEqual(text_width.cache_info().misses, len(set(text.split())) + 1)  # words plus the space
+
+    def test_line_boxes_are_the_ink_boxes_and_reused_across_captions(self):
+        from utils.text_layout import get_font, layout_lines
+        font = get_font(FONT, 90)
+        lines = layout_lines("Honey never spoils at all", font, 600)
+        for line, width, height in lines:
+            left, top, right, bottom = font.getbbox(line)
+            self.assertEqual((width, height), (right - left, bottom - top))
+        self.assertIs(layout_lines("Honey never spoils at all", font, 600), lines)
+        a_word_that_is_too_long = "Supercalifragilisticexpialidocious"
+        self.assertEqual([l for l, _, _ in layout_lines(a_word_that_is_too_long, font, 100)], [a_word_that_is_too_long])
+
+
+if __name__ == "__main__":
+    unittest.main()
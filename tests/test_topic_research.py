@@ -0,0 +1,51 @@
+"""TopicResearchAgent: topics from the seed file and from ingested trending facts."""
+import os
+import tempfile
+import unittest
+
+SEED = [
+    "Bananas are berries, but strawberries are not.",
+    "Oxford University is older than the Aztec Empire.",
+    "The Eiffel Tower was originally intended for Barcelona.",
+    "Honey never spoils; archaeologists found edible honey in ancient tombs.",
+]
+
+
+class TopicResearchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.seed = os.path.join(self.tmp.name, "seed.txt")
+        with open(self.seed, "w", encoding="utf-8") as f:
+            f.write("# comment\n" + "\n".join(SEED) + "\n")
+        self.trending = os.path.join(self.tmp.name, "trending.json")
+        self.state = os.path.join(self.tmp.name, "used.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def agent(self):
+        from agents.topic_research_agent import TopicResearchAgent
+        from utils.near_dup import NearDuplicateIndex
+        return TopicResearchAgent(self.seed, dedup=NearDuplicateIndex(os.path.join(self.tmp.name, "near_dup.sqlite")),
+                                  trending_path=self.trending, state_path=self.state)
+
+    def test_an_ingested_trending_fact_comes_out_of_the_agent(self):
+        from services.trend_ingester import TrendingTopics
+        agent = self.agent()
+        for topic in agent.suggest_topics(4):
+            agent.mark_published(topic)
+        self.assertEqual(agent.suggest_topics(1), [])
+
+        TrendingTopics(self.trending).append([
+            "Octopuses have three hearts and blue blood.",
+            "Strawberries are not berries, but bananas are.",  # paraphrase of a published topic
+            SEED[2],
+        ], source="fixture")
+        self.assertEqual(agent.suggest_topics(5), ["Octopuses have three hearts and blue blood."])
+        self.assertEqual(agent.merge_trending(), 0)  # unchanged file: nothing merged again
+        with open(self.seed, encoding="utf-8") as f:
+            self.assertEqual(f.read().count("Octopuses"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""TopicStore: offset-indexed seed facts sampled without replacement through a persisted cursor."""
+import json
+import os
+import tempfile
+import unittest
+
+SEED = [
+    "Bananas are berries, but strawberries are not.",
+    "Oxford University is older than the Aztec Empire.",
+    "The Eiffel Tower was originally intended for Barcelona.",
+    "Honey never spoils; archaeologists found edible honey in ancient tombs.",
+]
+
+
+class TopicStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.seed = os.path.join(self.tmp.name, "seed.txt")
+        with open(self.seed, "w", encoding="utf-8") as f:
+            f.write("# comment\n\n" + "\n".join(SEED) + "\n")
+        self.state = os.path.join(self.tmp.name, "used.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def store(self):
+        from utils.topic_store import TopicStore
+        return TopicStore(self.seed, state_path=self.state)
+
+    def append(self, *lines):
+        with open(self.seed, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def test_a_cycle_hands_out_every_topic_once_and_survives_a_restart(self):
+        first = self.store().sample(2)
+        store = self.store()  # new process: the cursor and permutation were persisted
+        self.assertEqual(store.remaining(), 2)
+        rest = store.sample(2)
+        self.assertEqual(sorted(first + rest), sorted(SEED))
+        with open(self.state, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"cursor": 4, "cycle": 0, "total": 4})
+
+    def test_an_exhausted_cycle_starts_over_without_repeating_within_a_call(self):
+        store = self.store()
+        store.sample(3)
+        topics = store.sample(4)
+        self.assertEqual(len(topics), 4)
+        self.assertEqual(sorted(topics), sorted(SEED))  # one left over, then three from the new cycle
+        with open(self.state, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["cycle"], 1)
+
+    def test_appended_seed_lines_are_indexed_without_a_rebuild(self):
+        store = self.store()
+        store.sample(4)
+        offsets = list(store._offsets)
+        self.append("Octopuses have three hearts and blue blood.", SEED[0])
+        self.assertEqual(store.sample(1), ["Octopuses have three hearts and blue blood."])
+        self.assertEqual(len(store), 5)  # the repeated line was not indexed again
+        self.assertEqual(list(store._offsets[:4]), offsets)
+        self.assertEqual(len(self.store()), 5)  # the extended index was saved
+
+    def test_added_facts_are_appended_once(self):
+        store = self.store()
+        self.assertEqual(store.add_facts(["Starfish  are not fish.", SEED[1], "Starfish are not fish.", "# no"]), 1)
+        with open(self.seed, encoding="utf-8") as f:
+            self.assertEqual(f.read().splitlines()[-1], "Starfish are not fish.")
+        self.assertEqual((len(store), store.remaining()), (5, 5))
+
+    def test_a_shrunk_seed_file_is_reindexed_from_scratch(self):
+        self.store().sample(4)
+        with open(self.seed, "w", encoding="utf-8") as f:
+            f.write(SEED[0] + "\n")
+        store = self.store()
+        self.assertEqual(store.sample(2), [SEED[0]])  # one fact, never twice in one call
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""TrendIngester against local fixture pages."""
+import os
+import tempfile
+import unittest
+from tests.http_stub import StubHandler, serve
+
+FACT = "Honey never spoils: archaeologists have eaten 3000-year-old honey from Egyptian tombs."
+PAGES = {
+    "/plain": ("text/html", f"<ul><li>Café owners know: {FACT}</li></ul>".encode("utf-8")),
+    "/meta": ("text/html", f'<meta charset="windows-1252"><p>Café fact: {FACT}</p>'.encode("cp1252")),
+    "/big": ("text/html; charset=utf-8", "".join(f"<li>Fact number {i}: {FACT}</li>" for i in range(2000)).encode()),
+}
+
+
+class FixturePages(StubHandler):
+    def do_GET(self):
+        with self.state["lock"]:
+            self.state["gets"] += 1
+        if self.headers.get("If-None-Match") == '"v1"':
+            return self.reply(304)
+        content_type, body = PAGES[self.path]
+        self.reply(200, body, {"Content-Type": content_type, "ETag": '"v1"'})
+
+
+class TrendIngesterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base, self.server = serve(FixturePages, gets=0)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.tmp.cleanup()
+
+    def ingester(self, *paths, **kwargs):
+        from services.trend_ingester import TrendIngester, TrendingTopics
+        return TrendIngester([{"name": p, "url": self.base + p} for p in paths],
+                             store=TrendingTopics(os.path.join(self.tmp.name, "trending.json")),
+                             cache_path=os.path.join(self.tmp.name, "cache.json"), **kwargs)
+
+    def test_pages_without_a_charset_header_are_not_decoded_as_latin1(self):
+        ingester = self.ingester("/plain", "/meta")
+        self.assertEqual(sum(r["facts_added"] for r in ingester.ingest()), 2)
+        facts = [e["fact"] for e in ingester.store.load()]
+        self.assertEqual(sorted(f.split(":")[0] for f in facts), ["Café fact", "Café owners know"])
+
+    def test_a_large_page_is_cut_off_and_fetched_again_next_time(self):
+        [report] = self.ingester("/big", max_bytes=8192).ingest()
+        self.assertTrue(report["truncated"])
+        self.assertEqual(report["bytes"], 8192)
+        self.assertGreater(report["facts_added"], 0)
+        self.ingester("/big", max_bytes=8192).ingest()
+        self.assertEqual(self.server.state["gets"], 2)  # no validators stored for a cut-off page: full GET again
+
+    def test_unchanged_page_is_a_304(self):
+        self.ingester("/plain").ingest()
+        [report] = self.ingester("/plain").ingest()
+        self.assertEqual((report["status"], report["bytes"]), (304, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
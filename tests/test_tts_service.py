@@ -0,0 +1,78 @@
+"""TTS: sentences synthesized concurrently, cached per sentence and stitched with their timings."""
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+class CountingEngine:
+    """SilentEngine that counts calls and records how many ran at once."""
+
+    def __init__(self):
+        from services.tts_service import SilentEngine
+        self.silent = SilentEngine(words_per_minute=120)
+        self.name, self.ext, self.voice = "counting", self.silent.ext, self.silent.voice
+        self.calls = []
+        self.running = self.peak = 0
+        self._lock = threading.Lock()
+        self._both_started = threading.Barrier(2, timeout=5)
+
+    def synthesize_to(self, text, path):
+        with self._lock:
+            self.calls.append(text)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        if len(self.calls) <= 2:
+            self._both_started.wait()  # the first two sentences only get past here together
+        self.silent.synthesize_to(text, path)
+        with self._lock:
+            self.running -= 1
+
+
+class TTSServiceTest(unittest.TestCase):
+    def setUp(self):
+        from services import tts_service
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        for name, path in (("OUTPUT_AUDIO_DIR", root / "audio"), ("TTS_CACHE_DIR", root / "cache")):
+            patcher = mock.patch.object(tts_service, name, path)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sentences_are_split_on_end_punctuation(self):
+        from services.tts_service import split_sentences
+        self.assertEqual(split_sentences("  Octopuses have three hearts! Really?  Yes.\nHoney never spoils. "),
+                         ["Octopuses have three hearts!", "Really?", "Yes.", "Honey never spoils."])
+
+    def test_timings_follow_the_clips_and_repeated_sentences_come_from_the_cache(self):
+        from services.tts_service import synthesize_sentences
+        engine = CountingEngine()
+        sentences = ["Octopuses have three hearts.", "And it has blue blood."]  # 4 and 5 words at 120 wpm
+        out, timings = synthesize_sentences(sentences, engine=engine, max_workers=2)
+        self.assertTrue(out.exists())
+        self.assertEqual(engine.peak, 2)
+        self.assertEqual([t["text"] for t in timings], sentences)
+        self.assertAlmostEqual(timings[0]["end"], 2.0, delta=0.05)
+        self.assertEqual(timings[1]["start"], timings[0]["end"])
+        self.assertAlmostEqual(timings[1]["end"], 4.5, delta=0.1)
+
+        again, _ = synthesize_sentences(sentences + ["New."], engine=engine)
+        self.assertEqual(engine.calls.count("Octopuses have three hearts."), 1)
+        self.assertEqual(engine.calls[-1], "New.")
+        self.assertNotEqual(again, out)
+        self.assertEqual(synthesize_sentences(sentences, engine=engine)[0], out)  # same narration, same file
+        self.assertFalse([p for p in os.listdir(out.parent) if ".tmp" in p])
+
+    def test_nothing_to_say_is_an_error(self):
+        from services.tts_service import SilentEngine, synthesize_sentences
+        with self.assertRaises(ValueError):
+            synthesize_sentences(["", "  "], engine=SilentEngine())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""UploadAgent against a local fake of the YouTube resumable-upload endpoint."""
+import json
+import os
+import re
+import tempfile
+import unittest
+from tests.http_stub import StubHandler, serve
+
+
+class FakeYouTube(StubHandler):
+    """Session start (POST), chunk PUTs with 308 + Range, status queries ("bytes */size"), injected 503s."""
+
+    def do_POST(self):
+        self.body()
+        self.state["sessions"] += 1
+        self.reply(200, headers={"Location": f"{self.state['base']}/session/1"})
+
+    def do_PUT(self):
+        data = self.body()
+        content_range = self.headers.get("Content-Range", "")
+        if content_range.startswith("bytes */"):
+            self.state["status_queries"] += 1
+            return self._resume_incomplete()
+        self.state["chunks"] += 1
+        if self.state["chunks"] in self.state["fail_chunks"]:
+            return self.reply(503)
+        first, last, total = map(int, re.match(r"bytes (\d+)-(\d+)/(\d+)", content_range).groups())
+        if first != self.state["received"]:
+            return self.reply(400)  # the client must continue exactly where the server is
+        self.state["received"] = last + 1
+        self.state["bytes_sent"] += len(data)
+        if self.state["received"] == total:
+            return self.reply(200, json.dumps({"id": "vid123"}).encode(), {"Content-Type": "application/json"})
+        self._resume_incomplete()
+
+    def _resume_incomplete(self):
+        received = self.state["received"]
+        self.reply(308, headers={"Range": f"bytes=0-{received - 1}"} if received else {})
+
+
+def fake_client(base: str):
+    from googleapiclient.discovery import build
+    from googleapiclient.http import HttpRequest
+
+    class PlainHttpRequest(HttpRequest):
+        def __init__(self, http, postproc, uri, *args, **kwargs):
+            super().__init__(http, postproc, uri.replace("https://", "http://"), *args, **kwargs)
+
+    return build("youtube", "v3", developerKey="test", static_discovery=True,
+                 client_options={"api_endpoint": base}, requestBuilder=PlainHttpRequest)
+
+
+class UploadAgentTest(unittest.TestCase):
+    CHUNK = 256 * 1024
+
+    def setUp(self):
+        from agents.upload_agent import UploadAgent
+        from utils.upload_queue import UploadQueue
+        self.UploadAgent, self.UploadQueue = UploadAgent, UploadQueue
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video = os.path.join(self.tmp.name, "video.mp4")
+        with open(self.video, "wb") as f:
+            f.write(os.urandom(3 * self.CHUNK + 100))
+        self.size = os.path.getsize(self.video)
+        self.base, self.server = serve(FakeYouTube, sessions=0, chunks=0, status_queries=0, received=0,
+                                       bytes_sent=0, fail_chunks=set())
+        self.server.state["base"] = self.base
+        self.queue_path = os.path.join(self.tmp.name, "queue.json")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.tmp.cleanup()
+
+    def agent(self, **kwargs):
+        return self.UploadAgent(youtube=fake_client(self.base), queue=self.UploadQueue(self.queue_path),
+                                chunksize=self.CHUNK, max_backoff=0, **kwargs)
+
+    def test_transient_errors_are_retried_from_the_acknowledged_offset(self):
+        self.server.state["fail_chunks"] = {2, 3}
+        self.assertEqual(self.agent().upload_video(self.video, title="t"), "vid123")
+        self.assertEqual(self.server.state["bytes_sent"], self.size)  # nothing sent twice
+        self.assertEqual(self.server.state["sessions"], 1)
+        self.assertGreaterEqual(self.server.state["status_queries"], 2)
+        self.assertEqual(self.UploadQueue(self.queue_path).pending(), [])
+
+    def test_interrupted_upload_resumes_in_a_new_process(self):
+        self.server.state["fail_chunks"] = {2, 3, 4}
+        self.assertIsNone(self.agent(max_retries=1).upload_video(self.video, title="t", job_id=7))
+        pending = self.UploadQueue(self.queue_path).pending()
+        self.assertEqual(len(pending), 1)
+        self.assertTrue(pending[0]["resumable_uri"])
+
+        [done] = self.agent().resume_pending()
+        self.assertEqual((done["video_id"], done["job_id"]), ("vid123", 7))
+        self.assertEqual(self.server.state["sessions"], 1)  # the stored session was reused
+        self.assertEqual(self.server.state["bytes_sent"], self.size)
+        self.assertEqual(self.UploadQueue(self.queue_path).pending(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
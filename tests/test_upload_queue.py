@@ -0,0 +1,61 @@
+"""UploadQueue: processes sharing one queue file keep each other's entries."""
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+
+def put_many(path, prefix, n):
+    from utils.upload_queue import UploadQueue
+    queue = UploadQueue(path)
+    for i in range(n):
+        queue.put(f"/videos/{prefix}{i}.mp4", topic=prefix)
+        queue.put("/videos/shared.mp4", **{prefix: i})
+
+
+class UploadQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "upload_queue.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def queue(self):
+        from utils.upload_queue import UploadQueue
+        return UploadQueue(self.path)
+
+    def test_queues_sharing_a_file_do_not_overwrite_each_other(self):
+        first, second = self.queue(), self.queue()
+        first.put("a.mp4", title="A")
+        second.put("b.mp4", title="B")
+        first.put("b.mp4", progress=100)  # fields set by the other process are kept
+        self.assertEqual([e["title"] for e in second.pending()], ["A", "B"])
+        self.assertEqual(second.get("b.mp4")["progress"], 100)
+        second.remove("a.mp4")
+        self.assertIsNone(first.get("a.mp4"))
+
+    def test_concurrent_processes_lose_no_updates(self):
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=put_many, args=(self.path, prefix, 20)) for prefix in ("x", "y", "z")]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(60)
+        queue = self.queue()
+        self.assertEqual(len(queue.pending()), 61)
+        shared = queue.get("/videos/shared.mp4")
+        self.assertEqual((shared["x"], shared["y"], shared["z"]), (19, 19, 19))
+
+    def test_a_json_queue_from_older_versions_is_imported(self):
+        legacy = os.path.join(self.tmp.name, "upload_queue.json")
+        entry = {"video_path": "/videos/old.mp4", "created": 1.0, "resumable_uri": "https://upload/session"}
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump({entry["video_path"]: entry}, f)
+        self.assertEqual(self.queue().get("/videos/old.mp4"), entry)
+        self.assertFalse(os.path.exists(legacy))
+
+
+if __name__ == "__main__":
+    unittest.main()
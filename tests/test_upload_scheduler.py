@@ -0,0 +1,103 @@
+"""UploadScheduler quota bookkeeping against the local fake YouTube endpoint."""
+import os
+import tempfile
+import unittest
+from tests.http_stub import serve
+from tests.test_upload_agent import FakeYouTube, fake_client
+
+DAY = 24 * 3600
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class UploadSchedulerTest(unittest.TestCase):
+    CHUNK = 256 * 1024
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video = os.path.join(self.tmp.name, "video.mp4")
+        with open(self.video, "wb") as f:
+            f.write(os.urandom(2 * self.CHUNK + 100))
+        self.base, self.server = serve(FakeYouTube, sessions=0, chunks=0, status_queries=0, received=0,
+                                       bytes_sent=0, fail_chunks=set())
+        self.server.state["base"] = self.base
+        self.clock = Clock()
+        self.ledger_path = os.path.join(self.tmp.name, "quota.sqlite")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.tmp.cleanup()
+
+    def ledger(self):
+        from utils.quota_ledger import QuotaLedger
+        return QuotaLedger(self.ledger_path, clock=self.clock)
+
+    def scheduler(self, youtube=None, max_retries=3):
+        from agents.upload_agent import UploadAgent
+        from utils.upload_queue import UploadQueue
+        from workflows.upload_scheduler import Channel, UploadScheduler
+        channel = Channel("main", daily_quota=5000)
+        channel.queue = UploadQueue(os.path.join(self.tmp.name, "queue_main.json"))
+        # Without a client the agent finds no credentials and skips the upload
+        channel.agent_factory = lambda c: UploadAgent(credentials_path=os.path.join(self.tmp.name, "none.pkl"),
+                                                      youtube=youtube, queue=c.queue, chunksize=self.CHUNK,
+                                                      max_retries=max_retries, max_backoff=0)
+        return UploadScheduler([channel], ledger=self.ledger())
+
+    def test_units_are_refunded_when_the_upload_never_reaches_the_api(self):
+        scheduler = self.scheduler()
+        result = scheduler.upload_item({"video": self.video, "topic": "t"})
+        self.assertIn("error", result)
+        self.assertEqual(scheduler.report()["main"]["used"], 0)
+        self.assertIsNone(scheduler.channels[0].queue.get(self.video))
+
+    def test_resuming_on_a_later_quota_day_charges_that_day(self):
+        self.server.state["fail_chunks"] = {2, 3}
+        scheduler = self.scheduler(fake_client(self.base), max_retries=1)
+        self.assertIn("error", scheduler.upload_item({"video": self.video, "topic": "t"}))
+        self.assertEqual(scheduler.report()["main"]["used"], 1600)
+
+        self.clock.now += DAY
+        self.assertEqual(scheduler.report()["main"]["used"], 0)
+        [done] = scheduler.resume_pending()
+        self.assertEqual((done["video_id"], done["channel"]), ("vid123", "main"))
+        self.assertEqual(scheduler.report()["main"]["used"], 1600)
+        self.assertEqual(self.server.state["sessions"], 1)
+
+    def test_a_slot_booked_concurrently_by_another_process_is_not_handed_out_twice(self):
+        import time
+        from workflows.upload_scheduler import Channel, UploadScheduler
+        channel = Channel("main", daily_quota=5000, publish_slots=["09:00", "18:00"])
+        scheduler = UploadScheduler([channel], ledger=self.ledger(), lead_minutes=0)
+        first = channel.next_slot([], time.time(), 0)
+        # Another process books the same slot after this one has read the booked slots
+        fresh = scheduler.ledger.booked_slots
+
+        def booked_slots(name):
+            scheduler.ledger.booked_slots = fresh
+            self.ledger().book_slot(name, first)
+            return []
+        scheduler.ledger.booked_slots = booked_slots
+        _, slot = scheduler._assign(1600)
+        self.assertNotEqual(slot, first)
+        self.assertEqual(sorted(self.ledger().booked_slots("main")), [first, slot])
+        self.assertEqual(self.ledger().remaining("main", 5000), 5000 - 1600)  # the lost attempt was refunded
+
+    def test_ledgers_sharing_a_file_do_not_overwrite_each_other(self):
+        first, second = self.ledger(), self.ledger()
+        self.assertTrue(first.reserve("main", 3000, 5000))
+        self.assertTrue(second.reserve("main", 1600, 5000))
+        self.assertFalse(first.reserve("main", 1600, 5000))
+        self.assertTrue(first.book_slot("main", self.clock.now + 3600))
+        self.assertFalse(second.book_slot("main", self.clock.now + 3600))
+        self.assertEqual(self.ledger().remaining("main", 5000), 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""VideoEditorAgent: slides rendered in memory and the ffmpeg static-slide engine."""
+import os
+import tempfile
+import unittest
+import numpy as np
+
+FONT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fonts", "DejaVuSans.ttf")
+
+
+class VideoEditorAgentTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def agent(self, **kwargs):
+        from agents.video_editing_agent import VideoEditorAgent
+        from utils.render_cache import RenderCache
+        kwargs.setdefault("cache", RenderCache(root=os.path.join(self.tmp.name, "cache")))
+        return VideoEditorAgent(font_path=FONT, effects="", **kwargs)
+
+    def test_a_slide_frame_comes_straight_from_the_renderer(self):
+        from config import VIDEO_HEIGHT, VIDEO_WIDTH
+        agent = self.agent()
+        cwd = set(os.listdir("."))
+        frame = agent.slide_frame("Octopuses have three hearts")
+        self.assertEqual(frame.shape, (VIDEO_HEIGHT, VIDEO_WIDTH, 3))
+        self.assertTrue(np.array_equal(frame, np.asarray(agent.render_slide("Octopuses have three hearts"))))
+        self.assertEqual(tuple(frame[0, 0]), agent.BG_COLOR)
+        self.assertEqual(frame[VIDEO_HEIGHT // 2 - 200:VIDEO_HEIGHT // 2 + 200].max(), 255)  # white text mid-frame
+        self.assertEqual(set(os.listdir(".")), cwd)  # no temp_slide.png next to the code
+
+    def test_a_cached_slide_is_loaded_pixel_for_pixel(self):
+        agent = self.agent()
+        first = agent.slide_frame("Honey never spoils")
+        second = agent.slide_frame("Honey never spoils")
+        self.assertTrue(np.array_equal(first, second))
+        slides = agent.cache.stats()["kinds"]["slide"]
+        self.assertEqual((slides["hits"], slides["misses"]), (1, 1))
+
+    def test_the_ffmpeg_engine_encodes_each_distinct_caption_once(self):
+        from config import FPS
+        from services.ffmpeg_service import run_ffmpeg, probe_streams
+        voice = os.path.join(self.tmp.name, "voice.wav")
+        run_ffmpeg(['-f', 'lavfi', '-i', 'sine=r=44100', '-t', 2, voice])
+        agent = self.agent(engine="ffmpeg", profile="draft")
+        out = agent.create_video(["Same caption", "Other caption", "Same caption"], voice, durations=[0.5, 0.5, 1.0],
+                                 out_path=os.path.join(self.tmp.name, "short.mp4"))
+        streams = probe_streams(out)
+        self.assertAlmostEqual(streams["duration"], 2.0, delta=2 / FPS)
+        self.assertEqual((streams["video"]["codec"], streams["video"]["fps"]), ("h264", FPS))
+        self.assertEqual(streams["audio"]["codec"], "aac")
+        slides = agent.cache.stats()["kinds"]["slide"]
+        self.assertEqual((slides["hits"], slides["misses"]), (1, 2))  # the repeat is a new segment length only
+
+        agent.create_video(["Same caption", "Other caption"], durations=[0.5, 0.5],
+                           out_path=os.path.join(self.tmp.name, "again.mp4"))
+        self.assertEqual(agent.cache.stats()["kinds"]["segment"]["hits"], 2)  # nothing re-encoded
+
+
+if __name__ == "__main__":
+    unittest.main()
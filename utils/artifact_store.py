@@ -0,0 +1,187 @@
+"""
+ArtifactStore — collision-free, sharded home for finished videos and thumbnails.
+- Producers write to a unique staging path (staging_path()) and hand the file to put(), which names it
+  by job id and content hash and files it under <root>/<kind>/<YYYY-MM-DD>/<hash[:2]>/.
+- Content lives once in <root>/blobs/<hash[:2]>/<hash>.<ext>; every named artifact is a hardlink to its
+  blob, so identical outputs cost no extra disk. Blobs and links appear via temp file + atomic rename,
+  so readers never see a partial file.
+- An SQLite index remembers each artifact's job, hash and whether it was uploaded; gc() deletes
+  uploaded artifacts, oldest first, while the store is over its disk budget.
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from config import ARTIFACTS_DIR, ARTIFACT_BUDGET_MB
+from utils.logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    job_id INTEGER,
+    sha256 TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    uploaded REAL
+);
+CREATE INDEX IF NOT EXISTS artifacts_gc ON artifacts (uploaded, created);
+"""
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ArtifactStore:
+    def __init__(self, root: str = ARTIFACTS_DIR, budget_bytes: int = ARTIFACT_BUDGET_MB * 1024 * 1024):
+        """
+        :param root: store directory (staging, blobs, per-kind shards and the index live under it)
+        :param budget_bytes: disk usage above which gc() prunes uploaded artifacts
+        """
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.staging_dir = os.path.join(root, "staging")
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def staging_path(self, kind: str, ext: str) -> str:
+        """Unique path (on the store's filesystem, so put() can rename it in) for a file being produced."""
+        return os.path.join(self.staging_dir, f"{kind}_{os.getpid()}_{uuid.uuid4().hex}.{ext}")
+
+    def _blob_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.blobs_dir, digest[:2], f"{digest}.{ext}")
+
+    def path_for(self, kind: str, digest: str, ext: str, job_id=None, created: float | None = None) -> str:
+        day = time.strftime("%Y-%m-%d", time.localtime(created or time.time()))
+        name = f"{kind}_{job_id if job_id is not None else 'nojob'}_{digest[:16]}.{ext}"
+        return os.path.join(self.root, kind, day, digest[:2], name)
+
+    def _store_blob(self, src_path: str, digest: str, ext: str) -> str:
+        """Move src into the blob store (or drop it if the content is already there). Returns the blob path."""
+        blob = self._blob_path(digest, ext)
+        if os.path.exists(blob):
+            os.remove(src_path)
+            return blob
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp = f"{blob}.{os.getpid()}.tmp"
+        shutil.move(src_path, tmp)  # rename when on the same filesystem, else copy + delete
+        os.replace(tmp, blob)
+        return blob
+
+    def _link(self, blob: str, path: str):
+        """Atomically make `path` a hardlink of blob (a copy where hardlinks are unsupported)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, path)
+
+    def put(self, src_path: str, kind: str, job_id=None) -> str:
+        """
+        Take ownership of a finished file (it is moved, not copied) and return its path in the store.
+        Storing the same content for the same kind and job again returns the existing path.
+        """
+        ext = os.path.splitext(src_path)[1].lstrip(".") or "bin"
+        digest = _sha256(src_path)
+        created = time.time()
+        path = self.path_for(kind, digest, ext, job_id, created)
+        with self._lock:
+            blob = self._store_blob(src_path, digest, ext)
+            if not os.path.exists(path):
+                self._link(blob, path)
+            self._db.execute(
+                "INSERT OR IGNORE INTO artifacts (path, kind, job_id, sha256, bytes, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, kind, job_id, digest, os.path.getsize(blob), created),
+            )
+            self._db.commit()
+        return path
+
+    def mark_uploaded(self, *paths):
+        """Flag artifacts as published, which makes them eligible for gc()."""
+        with self._lock:
+            self._db.executemany("UPDATE artifacts SET uploaded = ? WHERE path = ? AND uploaded IS NULL",
+                                 [(time.time(), p) for p in paths if p])
+            self._db.commit()
+
+    def usage(self) -> int:
+        """Bytes used by stored content (each blob counted once, however many names link to it)."""
+        total = 0
+        for dirpath, _, files in os.walk(self.blobs_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    def _sweep(self, max_age: float = 3600) -> int:
+        """Delete blobs no artifact links to any more, and staging/temp files left by crashed writers."""
+        freed = 0
+        cutoff = time.time() - max_age
+        for top in (self.blobs_dir, self.staging_dir):
+            for dirpath, _, files in os.walk(top):
+                for name in files:
+                    full = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(full)
+                    except OSError:
+                        continue
+                    # Age check for orphans too: a blob being put() by another process is briefly unlinked
+                    orphan = top == self.blobs_dir and st.st_nlink == 1
+                    if st.st_mtime < cutoff and (orphan or top == self.staging_dir or name.endswith(".tmp")):
+                        os.remove(full)
+                        freed += st.st_size
+        return freed
+
+    def gc(self, budget_bytes: int | None = None) -> dict:
+        """
+        Prune uploaded artifacts, oldest upload first, until usage fits the budget; unpublished
+        artifacts are never deleted. Returns {"removed", "freed_bytes", "usage_bytes"}.
+        """
+        budget = self.budget_bytes if budget_bytes is None else budget_bytes
+        freed = self._sweep()
+        usage = self.usage()
+        removed = 0
+        if usage > budget:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT path, sha256, bytes FROM artifacts WHERE uploaded IS NOT NULL ORDER BY uploaded, created"
+                ).fetchall()
+            for path, digest, size in rows:
+                if usage <= budget:
+                    break
+                try:
+                    os.remove(path)
+                    os.rmdir(os.path.dirname(path))  # drop the shard directory once it is empty
+                except OSError:
+                    pass
+                with self._lock:
+                    self._db.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+                    self._db.commit()
+                removed += 1
+                blob = self._blob_path(digest, os.path.splitext(path)[1].lstrip(".") or "bin")
+                try:
+                    if os.stat(blob).st_nlink == 1:  # last name gone: reclaim the content
+                        os.remove(blob)
+                        usage -= size
+                        freed += size
+                except FileNotFoundError:
+                    pass
+        if removed:
+            logger.info(f"Artifact GC removed {removed} uploaded artifacts, freed {freed} bytes ({usage} in use)")
+        return {"removed": removed, "freed_bytes": freed, "usage_bytes": usage}
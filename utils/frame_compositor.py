@@ -0,0 +1,184 @@
+"""
+CaptionCompositor — NumPy frame compositor for animated caption slides (fade, zoom, typewriter).
+- The glyph layer (anti-aliased text coverage) and the flat background are prepared once per slide;
+  only the caption's bounding region is recomposed per frame, the rest of the frame never changes.
+- Each frame is a few whole-array operations into preallocated buffers: a separable nearest-neighbour
+  resample for the zoom (two np.take calls), a rank comparison for the typewriter mask, and one
+  alpha blend. The returned frame is the same buffer every time; frames whose effect state did not
+  change since the previous one are returned without recomputation.
+"""
+import math
+import numpy as np
+
+EFFECTS = ("fade", "zoom", "typewriter")
+
+
+def parse_effects(spec) -> tuple:
+    """'fade,zoom' (or a list) -> ('fade', 'zoom'); raises ValueError on unknown effects."""
+    if isinstance(spec, str):
+        spec = spec.split(',')
+    effects = tuple(e.strip().lower() for e in spec if e and e.strip())
+    unknown = [e for e in effects if e not in EFFECTS]
+    if unknown:
+        raise ValueError(f"Unknown caption effect(s): {', '.join(unknown)} (expected {', '.join(EFFECTS)})")
+    return effects
+
+
+def typewriter_ranks(lines: list, font, size: tuple) -> tuple:
+    """
+    Per-pixel reveal order for a typewriter effect.
+    :param lines: [(text, x, y)] as drawn with ImageDraw.text((x, y), text, font=font)
+    :param size: (width, height) of the frame
+    :return: (ranks, n_chars) — ranks[y, x] is the index of the character covering that pixel
+             (counted across all lines); pixels outside the lines get n_chars (never revealed)
+    """
+    width, height = size
+    total = sum(len(text) for text, _, _ in lines)
+    cols = np.arange(width, dtype=np.float32)
+    # Rows of each line's ink box, and the same boxes padded by 2px for anti-aliasing. With tight line
+    # spacing the boxes can overlap: there the earlier line (lower rank) wins, and padding never takes
+    # rows from another line's ink box.
+    ink = np.full((height, width), total, dtype=np.int32)
+    padded = np.full((height, width), total, dtype=np.int32)
+    offset = 0
+    for text, x, y in lines:
+        if not text:
+            continue
+        _, top, _, bottom = font.getbbox(text)
+        # Left edge of each character; a pixel belongs to the last character starting at or before it
+        edges = np.array([font.getlength(text[:i]) for i in range(len(text))], dtype=np.float32) + x
+        line_ranks = np.clip(np.searchsorted(edges, cols, side='right') - 1, 0, len(text) - 1) + offset
+        for layer, pad in ((ink, 0), (padded, 2)):
+            y0, y1 = max(0, int(y + top) - pad), min(height, int(math.ceil(y + bottom)) + pad)
+            np.minimum(layer[y0:y1], line_ranks[None, :], out=layer[y0:y1])
+        offset += len(text)
+    ranks = np.where(ink < total, ink, padded)
+    return ranks, total
+
+
+class CaptionCompositor:
+    def __init__(self, glyphs: np.ndarray, bg_color: tuple, text_color: tuple, duration: float, fps: int,
+                 effects: tuple = (), ranks: np.ndarray | None = None, n_chars: int = 0,
+                 fade_seconds: float = 0.5, zoom_to: float = 1.08, chars_per_second: float = 20.0):
+        """
+        :param glyphs: (H, W) uint8 text coverage for the full frame (255 = solid text)
+        :param duration: slide length in seconds (zoom runs for the whole slide)
+        :param effects: any of EFFECTS
+        :param ranks, n_chars: output of typewriter_ranks() (required for "typewriter")
+        :param fade_seconds: fade-in length
+        :param zoom_to: text scale reached at the end of the slide (slow push-in from 1.0)
+        :param chars_per_second: typewriter speed; capped so the text is complete by 70% of the slide
+        """
+        self.effects = parse_effects(effects)
+        if "typewriter" in self.effects and ranks is None:
+            raise ValueError("typewriter effect needs per-pixel ranks")
+        self.height, self.width = glyphs.shape
+        self.duration = duration
+        self.fps = fps
+        self.fade_seconds = fade_seconds
+        self.zoom_to = zoom_to if "zoom" in self.effects else 1.0
+        self.n_chars = n_chars
+        self.type_seconds = min(n_chars / chars_per_second, 0.7 * duration) if n_chars else 0.0
+
+        bg = np.asarray(bg_color, dtype=np.float32)
+        self._frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._frame[:] = np.asarray(bg_color, dtype=np.uint8)
+        self._bg = bg + 0.5  # +0.5 so the float -> uint8 cast rounds
+        self._delta = np.asarray(text_color, dtype=np.float32) - bg
+
+        # Region that can ever contain text: the ink box grown by the final zoom around its center
+        ys, xs = np.nonzero(glyphs)
+        if len(ys) == 0:
+            self._region = None
+            return
+        top, bottom, left, right = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+        self._cy, self._cx = (top + bottom) / 2.0, (left + right) / 2.0
+        hh, hw = (bottom - top) / 2.0 * self.zoom_to + 1, (right - left) / 2.0 * self.zoom_to + 1
+        y0, y1 = max(0, int(self._cy - hh)), min(self.height, int(math.ceil(self._cy + hh)))
+        x0, x1 = max(0, int(self._cx - hw)), min(self.width, int(math.ceil(self._cx + hw)))
+        self._region = (y0, y1, x0, x1)
+        rh, rw = y1 - y0, x1 - x0
+
+        # Layers cropped to the region, plus one trailing zero row/column that
+        # out-of-range resample indices point at
+        self._alpha = np.zeros((rh + 1, rw + 1), dtype=np.float32)
+        self._alpha[:rh, :rw] = glyphs[y0:y1, x0:x1] / np.float32(255)
+        self._ranks = None
+        if "typewriter" in self.effects:
+            self._ranks = np.full((rh + 1, rw + 1), n_chars, dtype=np.int32)
+            self._ranks[:rh, :rw] = ranks[y0:y1, x0:x1]
+
+        # Preallocated per-frame buffers
+        self._dst_rows = np.arange(y0, y1, dtype=np.float32)
+        self._dst_cols = np.arange(x0, x1, dtype=np.float32)
+        self._row_idx = np.empty(rh, dtype=np.intp)
+        self._col_idx = np.empty(rw, dtype=np.intp)
+        self._tmp_alpha = np.empty((rh, rw + 1), dtype=np.float32)
+        self._tmp_ranks = np.empty((rh, rw + 1), dtype=np.int32)
+        self._cur_alpha = np.empty((rh, rw), dtype=np.float32)
+        self._cur_ranks = np.empty((rh, rw), dtype=np.int32)
+        self._mask = np.empty((rh, rw), dtype=bool)
+        self._rgb = np.empty((rh, rw, 3), dtype=np.float32)
+        self._state = None
+
+    def _effect_state(self, t: float) -> tuple:
+        fade = min(1.0, t / self.fade_seconds) if "fade" in self.effects and self.fade_seconds > 0 else 1.0
+        scale = 1.0 + (self.zoom_to - 1.0) * min(1.0, t / self.duration) if self.duration > 0 else 1.0
+        if "typewriter" in self.effects:
+            visible = self.n_chars if t >= self.type_seconds else int(self.n_chars * t / self.type_seconds)
+        else:
+            visible = self.n_chars
+        # Zoom steps finer than a pixel at the region's edge don't change the nearest-neighbour result
+        return round(fade, 3), round(scale, 4), visible
+
+    def _resample(self, index: np.ndarray, dst: np.ndarray, center: float, scale: float, limit: int, origin: int):
+        """Nearest source index (relative to the region) for each destination coordinate; out of range -> pad."""
+        src = (dst - center) / scale + center - origin
+        np.rint(src, out=src)
+        np.copyto(index, src, casting='unsafe')
+        index[(index < 0) | (index >= limit)] = limit
+
+    def _scaled(self, layer: np.ndarray, tmp: np.ndarray, out: np.ndarray) -> np.ndarray:
+        np.take(layer, self._row_idx, axis=0, out=tmp)
+        np.take(tmp, self._col_idx, axis=1, out=out)
+        return out
+
+    def frame(self, i: int) -> np.ndarray:
+        """Frame i as an (H, W, 3) uint8 array. The buffer is reused: consume it before the next call."""
+        if self._region is None:
+            return self._frame
+        state = self._effect_state(i / self.fps)
+        if state == self._state:
+            return self._frame
+        self._state = state
+        fade, scale, visible = state
+        y0, y1, x0, x1 = self._region
+        rh, rw = y1 - y0, x1 - x0
+
+        if scale != 1.0:
+            self._resample(self._row_idx, self._dst_rows, self._cy, scale, rh, y0)
+            self._resample(self._col_idx, self._dst_cols, self._cx, scale, rw, x0)
+            alpha = self._scaled(self._alpha, self._tmp_alpha, self._cur_alpha)
+            ranks = self._scaled(self._ranks, self._tmp_ranks, self._cur_ranks) if self._ranks is not None else None
+        else:
+            alpha = self._alpha[:rh, :rw]
+            ranks = self._ranks[:rh, :rw] if self._ranks is not None else None
+
+        if ranks is not None and visible < self.n_chars:
+            np.less(ranks, visible, out=self._mask)
+            alpha = np.multiply(alpha, self._mask, out=self._cur_alpha)
+
+        # frame = bg + alpha * fade * (text - bg), over the region only
+        np.multiply(alpha[:, :, None], self._delta * np.float32(fade), out=self._rgb)
+        np.add(self._rgb, self._bg, out=self._rgb)
+        np.copyto(self._frame[y0:y1, x0:x1], self._rgb, casting='unsafe')
+        return self._frame
+
+    def frames(self, n: int):
+        """Yield frames 0..n-1 (all the same reused buffer)."""
+        for i in range(n):
+            yield self.frame(i)
+
+    def frame_at(self, t: float) -> np.ndarray:
+        """Frame at time t in seconds (moviepy make_frame signature)."""
+        return self.frame(int(round(t * self.fps)))
@@ -0,0 +1,250 @@
+"""
+JobJournal — durable record of every short being produced (SQLite, WAL mode).
+- One row per job (topic, status, attempts) and one per completed/failed step with its timing,
+  outputs (captions, artifact paths...) and the SHA-256 of every artifact file.
+- completed_step() only reports a step as done if its artifacts still exist with the same hash,
+  so a restart skips finished work but redoes a step whose output was lost or truncated.
+- claim() hands out unfinished jobs (crashed or failed, under the attempt limit) before new topics.
+  A claim counts as an attempt and leases the job to this process for lease_seconds (renewed by every
+  recorded step), so a cron run and the daemon never work on the same job, and a job whose process
+  died comes back once its lease runs out.
+- A job ends "done" once uploaded, "rendered" when its run skipped the upload (dry run), or "failed".
+- backlog() and step_latency() answer "what is stuck where" and "how long does each step take" over time.
+Safe to share between threads and between processes (each process opens its own connection).
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from config import JOB_JOURNAL_DB, JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending | done | rendered | failed
+    attempts INTEGER NOT NULL DEFAULT 0,      -- claims so far
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    claimed_by TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS steps (
+    job_id INTEGER NOT NULL REFERENCES jobs (id),
+    step TEXT NOT NULL,
+    status TEXT NOT NULL,                     -- done | failed | skipped
+    started REAL NOT NULL,
+    finished REAL NOT NULL,
+    outputs TEXT,                             -- JSON of the item keys the step produced
+    artifacts TEXT,                           -- JSON {path: sha256}
+    error TEXT,
+    PRIMARY KEY (job_id, step)
+);
+CREATE TABLE IF NOT EXISTS step_runs (
+    job_id INTEGER NOT NULL,
+    step TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started REAL NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS step_runs_step ON step_runs (step, started);
+"""
+
+# Jobs claim() may hand out (params: max_attempts, now)
+_RESUMABLE = "status IN ('pending', 'failed') AND attempts < ? AND (lease_until IS NULL OR lease_until < ?)"
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _artifact_paths(outputs: dict) -> list:
+    """Output values that are paths of existing files."""
+    return [v for v in outputs.values() if isinstance(v, str) and v and os.path.isfile(v)]
+
+
+class JobJournal:
+    def __init__(self, path: str = JOB_JOURNAL_DB, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 lease_seconds: float = JOB_LEASE_SECONDS):
+        """
+        :param path: SQLite file (":memory:" for a throwaway journal)
+        :param max_attempts: claims after which an unfinished job is no longer handed out
+        :param lease_seconds: how long a claimed job stays with this process without a recorded step
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("claimed_by", "TEXT"), ("lease_until", "REAL")):  # journals from before claims
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._db.commit()
+
+    def _write(self, sql: str, params=()):
+        with self._lock:
+            cur = self._db.execute(sql, params)
+            self._db.commit()
+            return cur
+
+    def create(self, topic: str) -> int:
+        """New job for topic, claimed by this process (its first attempt)."""
+        now = time.time()
+        return self._write("INSERT INTO jobs (topic, attempts, created, updated, claimed_by, lease_until) "
+                           "VALUES (?, 1, ?, ?, ?, ?)", (topic, now, now, self.owner, now + self.lease_seconds)).lastrowid
+
+    def job(self, job_id: int) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def unfinished(self, limit: int | None = None) -> list:
+        """Jobs claim() would hand out, oldest first: interrupted or failed, unclaimed and under the attempt limit."""
+        sql = f"SELECT * FROM jobs WHERE {_RESUMABLE} ORDER BY id" + (" LIMIT ?" if limit else "")
+        params = (self.max_attempts, time.time()) + ((limit,) if limit else ())
+        with self._lock:
+            return [dict(r) for r in self._db.execute(sql, params).fetchall()]
+
+    def claim(self, limit: int | None = None) -> list:
+        """
+        Take up to limit unfinished jobs (oldest first) for this process: each claim counts as an attempt.
+        Pending jobs whose lease ran out after their last attempt are marked failed instead.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")  # one claimer at a time, across processes
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'abandoned'), claimed_by = NULL, "
+                    "lease_until = NULL, updated = ? WHERE status = 'pending' AND attempts >= ? "
+                    "AND (lease_until IS NULL OR lease_until < ?)", (now, self.max_attempts, now))
+                rows = self._db.execute(f"SELECT id FROM jobs WHERE {_RESUMABLE} ORDER BY id"
+                                        + (" LIMIT ?" if limit else ""),
+                                        (self.max_attempts, now) + ((limit,) if limit else ())).fetchall()
+                ids = [r["id"] for r in rows]
+                self._db.executemany(
+                    "UPDATE jobs SET status = 'pending', attempts = attempts + 1, claimed_by = ?, lease_until = ?, "
+                    "updated = ? WHERE id = ?", [(self.owner, now + self.lease_seconds, now, i) for i in ids])
+                jobs = [dict(self._db.execute("SELECT * FROM jobs WHERE id = ?", (i,)).fetchone()) for i in ids]
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._db.commit()
+        return jobs
+
+    def completed_step(self, job_id: int, step: str) -> dict | None:
+        """Outputs of a finished step, or None if it has to (re)run because it never finished or its artifacts changed."""
+        with self._lock:
+            row = self._db.execute("SELECT status, outputs, artifacts FROM steps WHERE job_id = ? AND step = ?",
+                                   (job_id, step)).fetchone()
+        if row is None or row["status"] not in ("done", "skipped"):
+            return None
+        for path, digest in json.loads(row["artifacts"] or "{}").items():
+            if not os.path.isfile(path) or file_sha256(path) != digest:
+                return None
+        return json.loads(row["outputs"] or "{}")
+
+    def record_step(self, job_id: int, step: str, started: float, outputs: dict | None = None,
+                    error: str | None = None, status: str | None = None):
+        """Store the outcome of one step run (replacing any earlier outcome of the same step)."""
+        outputs = outputs or {}
+        status = status or ("failed" if error else "done")
+        artifacts = {p: file_sha256(p) for p in _artifact_paths(outputs)} if status == "done" else {}
+        finished = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO steps (job_id, step, status, started, finished, outputs, artifacts, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, step, status, started, finished, json.dumps(outputs, default=str), json.dumps(artifacts), error),
+            )
+            self._db.execute("INSERT INTO step_runs (job_id, step, status, started, seconds) VALUES (?, ?, ?, ?, ?)",
+                             (job_id, step, status, started, finished - started))
+            self._db.execute("UPDATE jobs SET updated = ?, lease_until = CASE WHEN status = 'pending' THEN ? END "
+                             "WHERE id = ?", (finished, finished + self.lease_seconds, job_id))
+            self._db.commit()
+
+    def finish(self, job_id: int, error: str | None = None, status: str = "done"):
+        """
+        Release a job: failed when error is given (retried by a later claim while under the attempt limit),
+        else `status` ("done" once uploaded, "rendered" when the upload was skipped).
+        """
+        if error:
+            status = "failed"
+        self._write("UPDATE jobs SET status = ?, error = ?, claimed_by = NULL, lease_until = NULL, updated = ? "
+                    "WHERE id = ?", (status, error, time.time(), job_id))
+
+    def step_outputs(self, step: str, since: float | None = None, limit: int | None = None) -> list:
+        """
+        [{"job_id", "topic", **outputs}] of finished (done or rendered) jobs whose step completed after `since`,
+        newest first.
+        """
+        sql = ("SELECT j.id, j.topic, s.outputs FROM jobs j JOIN steps s ON s.job_id = j.id "
+               "WHERE j.status IN ('done', 'rendered') AND s.step = ? AND s.status = 'done' AND s.finished >= ? "
+               "ORDER BY s.finished DESC" + (" LIMIT ?" if limit else ""))
+        params = (step, since or 0, limit) if limit else (step, since or 0)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [{"job_id": r["id"], "topic": r["topic"], **json.loads(r["outputs"] or "{}")} for r in rows]
+
+    def backlog(self) -> dict:
+        """Job counts by status, and unfinished jobs by the last step they completed."""
+        with self._lock:
+            by_status = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            rows = self._db.execute(
+                "SELECT j.id, (SELECT s.step FROM steps s WHERE s.job_id = j.id AND s.status IN ('done', 'skipped') "
+                "ORDER BY s.finished DESC LIMIT 1) AS last_step FROM jobs j WHERE j.status NOT IN ('done', 'rendered')"
+            ).fetchall()
+        by_step = {}
+        for row in rows:
+            key = row["last_step"] or "(none)"
+            by_step[key] = by_step.get(key, 0) + 1
+        return {"by_status": by_status, "unfinished_after_step": by_step}
+
+    def step_latency(self, since: float | None = None, step: str | None = None) -> dict:
+        """Per-step run count, failures and seconds (avg/p50/p95/max) for runs started after `since` (epoch)."""
+        sql = "SELECT step, status, seconds FROM step_runs WHERE started >= ?"
+        params = [since or 0]
+        if step:
+            sql += " AND step = ?"
+            params.append(step)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY step, seconds", params).fetchall()
+        out = {}
+        for row in rows:
+            entry = out.setdefault(row["step"], {"runs": 0, "failed": 0, "seconds": []})
+            entry["runs"] += 1
+            entry["failed"] += row["status"] == "failed"
+            entry["seconds"].append(row["seconds"])
+        for entry in out.values():
+            s = entry.pop("seconds")
+            entry.update(avg=round(sum(s) / len(s), 3), p50=round(s[int(0.5 * (len(s) - 1))], 3),
+                         p95=round(s[int(0.95 * (len(s) - 1))], 3), max=round(s[-1], 3))
+        return out
+
+    def daily_latency(self, step: str, days: int = 30) -> list:
+        """[(day, runs, avg seconds)] for a step over the last `days` days, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT date(started, 'unixepoch') AS day, COUNT(*), AVG(seconds) FROM step_runs "
+                "WHERE step = ? AND started >= ? GROUP BY day ORDER BY day",
+                (step, time.time() - days * 86400),
+            ).fetchall()
+        return [(day, n, round(avg, 3)) for day, n, avg in rows]
@@ -4,7 +4,17 @@ from config import OUTPUT_DIR
 import os
 
 LOG_FILE = os.path.join(OUTPUT_DIR, 'logs', 'run.log')
-os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)  # make sure log dir exists
+
+
+class LazyFileHandler(FileHandler):
+    """FileHandler that creates the log directory and opens the file on the first record, not at import."""
+
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)  # make sure log dir exists
+        return super()._open()
 
 def setup_logger(name=__name__):
     logger = logging.getLogger(name)
@@ -15,7 +25,7 @@ def setup_logger(name=__name__):
         sh.setFormatter(Formatter('%(asctime)s - %(levelname)s - %(message)s'))
         logger.addHandler(sh)
         # File handler
-        fh = FileHandler(LOG_FILE)
+        fh = LazyFileHandler(LOG_FILE)
         fh.setFormatter(Formatter('%(asctime)s - %(levelname)s - %(message)s'))
         logger.addHandler(fh)
     return logger
@@ -0,0 +1,249 @@
+"""
+Lightweight per-stage instrumentation.
+- `with metrics.stage("render", topic=...) as rec:` (or the @metrics.timed("name") decorator) records
+  wall time, CPU time (this thread plus finished child processes such as ffmpeg), peak RSS
+  (of this process, and of the largest child so far),
+  bytes written to storage by this process and the size of the files the stage produced.
+- Every record is appended to a JSON-lines file (METRICS_JSONL) as one object per line.
+- Records are also aggregated in memory into per-stage histograms: summary() for logs,
+  write_prometheus() for a node-exporter textfile collector (METRICS_PROM_FILE).
+- Memory stays flat in long-lived processes: only the latest MAX_RECORDS records are kept, and the
+  wall-time percentiles are taken over each stage's latest RECENT_WALLS runs (counters are cumulative).
+Resource figures are process-wide where the OS offers nothing finer, so with stages running
+concurrently (pipelined mode) CPU of child processes and I/O can be attributed to an overlapping stage.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from config import METRICS_JSONL, METRICS_PROM_FILE
+from utils.logger import logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper bounds (seconds) of the wall-time histogram buckets
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Records kept in memory, and runs per stage the wall-time percentiles are computed over
+MAX_RECORDS = 1000
+RECENT_WALLS = 1000
+
+
+def _read_proc(path: str, field: str) -> int | None:
+    """Integer value of `field` from a /proc key/value file (None if unavailable)."""
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _io_write_bytes() -> int | None:
+    return _read_proc("/proc/self/io", "write_bytes")
+
+
+def _peak_rss_bytes() -> int | None:
+    kb = _read_proc("/proc/self/status", "VmHWM")
+    if kb is not None:
+        return kb * 1024
+    if resource:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's RSS high-water mark (Linux), so VmHWM becomes the peak since now."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _children_peak_rss_bytes() -> int | None:
+    """Peak RSS of the largest finished child process (e.g. ffmpeg) so far."""
+    if not resource:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _children_cpu_seconds() -> float:
+    if not resource:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageRecord(dict):
+    """One stage measurement; stages can register the files they produced."""
+
+    def add_file(self, path):
+        if path and os.path.exists(path):
+            self["output_bytes"] = self.get("output_bytes", 0) + os.path.getsize(path)
+
+
+class Metrics:
+    def __init__(self, jsonl_path: str | None = METRICS_JSONL, prom_path: str | None = METRICS_PROM_FILE,
+                 prefix: str = "ytshorts"):
+        """
+        :param jsonl_path: JSON-lines file each record is appended to (None: keep in memory only)
+        :param prom_path: Prometheus text-format file rewritten by write_prometheus() (None/empty: disabled)
+        :param prefix: metric name prefix in the Prometheus output
+        """
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.prefix = prefix
+        self.records = deque(maxlen=MAX_RECORDS)  # latest records, newest last
+        self._agg = {}
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, **labels):
+        """Measure the enclosed block as one run of stage `name`; labels (e.g. topic) go into the record."""
+        rec = StageRecord(stage=name, **labels)
+        with self._lock:
+            self._active += 1
+            # Only reset the RSS high-water mark when no other stage is being measured
+            exclusive_peak = self._active == 1 and _reset_peak_rss()
+        io_start = _io_write_bytes()
+        child_cpu_start = _children_cpu_seconds()
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        rec["ok"] = False
+        try:
+            yield rec
+            rec["ok"] = True
+        except Exception as e:
+            rec["error"] = str(e)
+            raise
+        finally:
+            rec["wall_seconds"] = round(time.perf_counter() - wall_start, 4)
+            rec["cpu_seconds"] = round(time.thread_time() - cpu_start + _children_cpu_seconds() - child_cpu_start, 4)
+            io_end = _io_write_bytes()
+            rec["io_write_bytes"] = io_end - io_start if io_start is not None and io_end is not None else None
+            rec.setdefault("output_bytes", 0)
+            rec["peak_rss_bytes"] = _peak_rss_bytes()
+            rec["peak_rss_scope"] = "stage" if exclusive_peak else "process"
+            rec["child_peak_rss_bytes"] = _children_peak_rss_bytes()
+            rec["ts"] = round(time.time(), 3)
+            with self._lock:
+                self._active -= 1
+            self.observe(rec)
+
+    def timed(self, name: str):
+        """Decorator form of stage()."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, rec: dict, write: bool = True):
+        """Add a record to the aggregates (and append it to the JSON-lines file when write is set)."""
+        with self._lock:
+            self.records.append(rec)
+            agg = self._agg.setdefault(rec["stage"], {
+                "count": 0, "failures": 0, "wall_sum": 0.0, "cpu_sum": 0.0, "io_write_bytes": 0,
+                "output_bytes": 0, "peak_rss_bytes": 0, "buckets": [0] * len(DURATION_BUCKETS),
+                "walls": deque(maxlen=RECENT_WALLS), "wall_max": 0.0,
+            })
+            agg["count"] += 1
+            agg["failures"] += 0 if rec.get("ok") else 1
+            agg["wall_sum"] += rec["wall_seconds"]
+            agg["cpu_sum"] += rec["cpu_seconds"]
+            agg["io_write_bytes"] += rec.get("io_write_bytes") or 0
+            agg["output_bytes"] += rec.get("output_bytes") or 0
+            agg["peak_rss_bytes"] = max(agg["peak_rss_bytes"], rec.get("peak_rss_bytes") or 0)
+            agg["walls"].append(rec["wall_seconds"])
+            agg["wall_max"] = max(agg["wall_max"], rec["wall_seconds"])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if rec["wall_seconds"] <= bound:
+                    agg["buckets"][i] += 1
+            if write and self.jsonl_path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.jsonl_path)), exist_ok=True)
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(rec, default=str) + "\n")
+
+    def summary(self) -> dict:
+        """Per-stage count, failures, wall/CPU totals, wall p50/p95 (recent runs) and max, bytes and peak RSS."""
+        out = {}
+        with self._lock:
+            for name, agg in self._agg.items():
+                walls = sorted(agg["walls"])
+                out[name] = {
+                    "count": agg["count"],
+                    "failures": agg["failures"],
+                    "wall_seconds": round(agg["wall_sum"], 3),
+                    "cpu_seconds": round(agg["cpu_sum"], 3),
+                    "wall_p50": walls[int(0.5 * (len(walls) - 1))],
+                    "wall_p95": walls[int(0.95 * (len(walls) - 1))],
+                    "wall_max": agg["wall_max"],
+                    "io_write_bytes": agg["io_write_bytes"],
+                    "output_bytes": agg["output_bytes"],
+                    "peak_rss_bytes": agg["peak_rss_bytes"],
+                }
+        return out
+
+    def prometheus_text(self) -> str:
+        """Aggregates in Prometheus text exposition format."""
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_stage_duration_seconds Wall time per stage run.",
+            f"# TYPE {p}_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            aggs = sorted(self._agg.items())
+            for name, agg in aggs:
+                for bound, count in zip(DURATION_BUCKETS, agg["buckets"]):
+                    lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {agg["count"]}')
+                lines.append(f'{p}_stage_duration_seconds_sum{{stage="{name}"}} {agg["wall_sum"]:.4f}')
+                lines.append(f'{p}_stage_duration_seconds_count{{stage="{name}"}} {agg["count"]}')
+            counters = [
+                ("stage_cpu_seconds_total", "counter", "CPU time per stage, including child processes.", "cpu_sum"),
+                ("stage_failures_total", "counter", "Failed stage runs.", "failures"),
+                ("stage_io_write_bytes_total", "counter", "Bytes written to storage by this process during the stage.", "io_write_bytes"),
+                ("stage_output_bytes_total", "counter", "Size of the files produced by the stage.", "output_bytes"),
+                ("stage_peak_rss_bytes", "gauge", "Highest peak RSS observed during the stage.", "peak_rss_bytes"),
+            ]
+            for metric, kind, help_text, field in counters:
+                lines.append(f"# HELP {p}_{metric} {help_text}")
+                lines.append(f"# TYPE {p}_{metric} {kind}")
+                for name, agg in aggs:
+                    lines.append(f'{p}_{metric}{{stage="{name}"}} {agg[field]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | None = None) -> str | None:
+        """Atomically rewrite the textfile-collector file (no-op when no path is configured)."""
+        path = path or self.prom_path
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+        return path
+
+    def flush(self):
+        """Log the per-stage summary and refresh the Prometheus file."""
+        if self._agg:
+            logger.info(f"Stage metrics: {self.summary()}")
+        self.write_prometheus()
+
+
+metrics = Metrics()
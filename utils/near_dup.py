@@ -0,0 +1,144 @@
+"""
+NearDuplicateIndex — MinHash + LSH index of published topics, for rejecting paraphrases.
+- Each text becomes a set of word shingles (content words by default) and a MinHash signature.
+- Signatures are split into bands; texts sharing any band bucket are candidates, and a candidate
+  counts as a duplicate when the estimated Jaccard similarity reaches the threshold.
+- Stored in SQLite with an index on the band keys, so a query is a handful of B-tree lookups
+  no matter how many topics have been published. An index built with older shingling rules is
+  re-signed from its stored texts when opened.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+from config import NEAR_DUP_DB, NEAR_DUP_THRESHOLD
+
+# Bumped whenever shingles() changes, so stored signatures are recomputed
+SHINGLE_VERSION = 2
+# Where the index lived before it moved under OUTPUT_DIR (relative to the working directory)
+_LEGACY_DB = os.path.join('data', 'near_dup.sqlite')
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_STOPWORDS = frozenset(
+    'a actually an and are as at be but by did do does fact for from fun had has have in is it its know '
+    'of on or so than that the their there these they this to true was were what when which who will with '
+    'you your'.split()
+)
+
+
+def shingles(text: str, k: int = 1) -> set:
+    """
+    Word k-shingles over the content words of text (lowercased, stopwords dropped, then plural 's' stripped).
+    k=1 (bag of content words) is what catches reordered paraphrases of short facts.
+    """
+    words = [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in _STOPWORDS]
+    content = [w[:-1] if len(w) > 3 and w.endswith('s') and not w.endswith(('ss', 'us', 'is')) else w
+               for w in words]
+    return {" ".join(content[i:i + k]) for i in range(max(len(content) - k + 1, 0))}
+
+
+class NearDuplicateIndex:
+    def __init__(self, path: str = NEAR_DUP_DB, threshold: float = NEAR_DUP_THRESHOLD,
+                 num_perm: int = 64, bands: int = 16, shingle_size: int = 1, seed: int = 1):
+        """
+        :param path: SQLite file (":memory:" for a throwaway index)
+        :param threshold: estimated Jaccard similarity at or above which a text is a near-duplicate
+        :param num_perm: MinHash signature length
+        :param bands: LSH bands (num_perm must be divisible by it); more bands = more recall
+        :param shingle_size: words per shingle
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # 32-bit coefficients keep a*h + b inside uint64 before the modulo
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            if path == NEAR_DUP_DB and not os.path.exists(path) and os.path.exists(_LEGACY_DB):
+                # Keep the published history of an index from older versions (with its WAL, if any)
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(_LEGACY_DB + suffix):
+                        os.replace(_LEGACY_DB + suffix, path + suffix)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS topics (id INTEGER PRIMARY KEY, text TEXT NOT NULL, sig BLOB NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS bands (key INTEGER NOT NULL, topic_id INTEGER NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands (key)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+        self._resign()
+
+    def _resign(self):
+        """Recompute every stored signature if the index was built with other shingling or hash parameters."""
+        params = f"{SHINGLE_VERSION}:{self.num_perm}:{self.bands}:{self.shingle_size}:{self._a[0]}"
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if row and row[0] == params:
+            return
+        topics = self._db.execute("SELECT id, text FROM topics").fetchall()
+        self._db.execute("DELETE FROM bands")
+        for topic_id, text in topics:
+            sig = self.signature(text)
+            self._db.execute("UPDATE topics SET sig = ? WHERE id = ?", (sig.tobytes(), topic_id))
+            self._db.executemany("INSERT INTO bands (key, topic_id) VALUES (?, ?)",
+                                 [(k, topic_id) for k in self._band_keys(sig)])
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)", (params,))
+        self._db.commit()
+
+    def signature(self, text: str) -> np.ndarray:
+        grams = shingles(text, self.shingle_size) or {text.strip().lower()}
+        hv = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=4).digest(), 'little') for g in grams),
+            dtype=np.uint64, count=len(grams),
+        )
+        perm = (self._a[:, None] * hv[None, :] + self._b[:, None]) % _MERSENNE
+        return perm.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray) -> list:
+        keys = []
+        for i in range(self.bands):
+            chunk = sig[i * self.rows:(i + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(bytes([i]) + chunk, digest_size=8).digest()
+            keys.append(int.from_bytes(digest, 'little', signed=True))
+        return keys
+
+    def query(self, text: str) -> tuple:
+        """Return (most similar published text, estimated similarity), or (None, 0.0)."""
+        sig = self.signature(text)
+        keys = self._band_keys(sig)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT DISTINCT t.text, t.sig FROM bands b JOIN topics t ON t.id = b.topic_id "
+                f"WHERE b.key IN ({','.join('?' * len(keys))})", keys,
+            ).fetchall()
+        best, best_score = None, 0.0
+        for other, blob in rows:
+            score = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == sig))
+            if score > best_score:
+                best, best_score = other, score
+        return best, best_score
+
+    def is_near_duplicate(self, text: str) -> bool:
+        return self.query(text)[1] >= self.threshold
+
+    def add(self, text: str):
+        """Record text as published."""
+        sig = self.signature(text)
+        keys = self._band_keys(sig)
+        with self._lock:
+            cur = self._db.execute("INSERT INTO topics (text, sig) VALUES (?, ?)", (text, sig.tobytes()))
+            self._db.executemany("INSERT INTO bands (key, topic_id) VALUES (?, ?)", [(k, cur.lastrowid) for k in keys])
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM topics").fetchone()[0]
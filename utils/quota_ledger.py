@@ -0,0 +1,144 @@
+"""
+QuotaLedger — persistent per-channel bookkeeping for the YouTube Data API quota and publish slots.
+- Units spent per channel per quota day (quota days start at midnight Pacific time, like Google's reset).
+- Units are reserved before a call is made, so concurrent uploads can never overspend a channel,
+  and refunded when the upload never reached the API.
+- Publish slots booked for scheduled videos, so a restart never double-books a slot.
+- Stored in SQLite (WAL); every check-and-charge is one BEGIN IMMEDIATE transaction, so several
+  processes (cron runs, the daemon) share one ledger without overwriting each other's bookings.
+  A ledger left by older versions (the JSON file next to it) is imported once.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from config import UPLOAD_QUOTA_STATE
+
+try:
+    from zoneinfo import ZoneInfo
+    _QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+except Exception:  # no tz database: fixed PST offset
+    _QUOTA_TZ = timezone(timedelta(hours=-8))
+
+# Quota cost of the calls an upload makes
+VIDEO_INSERT_UNITS = 1600
+THUMBNAIL_SET_UNITS = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    channel TEXT NOT NULL,
+    day TEXT NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (channel, day)
+);
+CREATE TABLE IF NOT EXISTS slots (
+    channel TEXT NOT NULL,
+    at REAL NOT NULL,
+    PRIMARY KEY (channel, at)
+);
+"""
+
+
+def quota_day(now: float | None = None) -> str:
+    return datetime.fromtimestamp(time.time() if now is None else now, _QUOTA_TZ).strftime("%Y-%m-%d")
+
+
+class QuotaLedger:
+    def __init__(self, path: str = UPLOAD_QUOTA_STATE, clock=time.time):
+        """
+        :param path: SQLite file (":memory:" for a throwaway ledger)
+        :param clock: time source (epoch seconds), replaceable for tests
+        """
+        self.path = path
+        self.clock = clock
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode; changes use explicit BEGIN IMMEDIATE transactions
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        if path != ":memory:":
+            self._import_json(os.path.splitext(path)[0] + ".json")
+
+    def _tx(self, fn):
+        """Run fn(db) inside one write transaction (serialized across processes)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return out
+
+    def _import_json(self, path: str):
+        """Carry over today's spent units and the future slots of a JSON ledger, then set the file aside."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = self.clock()
+
+        def load(db):
+            for name, entry in (state.items() if isinstance(state, dict) else ()):
+                if entry.get("day") == quota_day(now):
+                    db.execute("INSERT OR IGNORE INTO usage (channel, day, used) VALUES (?, ?, ?)",
+                               (name, entry["day"], int(entry.get("used", 0))))
+                db.executemany("INSERT OR IGNORE INTO slots (channel, at) VALUES (?, ?)",
+                               [(name, s) for s in entry.get("slots", []) if s > now])
+        self._tx(load)
+        os.replace(path, path + ".imported")
+
+    def _used(self, db, name: str) -> int:
+        row = db.execute("SELECT used FROM usage WHERE channel = ? AND day = ?",
+                         (name, quota_day(self.clock()))).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self, name: str, daily_quota: int) -> int:
+        with self._lock:
+            return max(0, daily_quota - self._used(self._db, name))
+
+    def reserve(self, name: str, units: int, daily_quota: int) -> bool:
+        """Charge units to the channel if its quota allows; returns whether they were reserved."""
+        def charge(db):
+            if self._used(db, name) + units > daily_quota:
+                return False
+            db.execute("INSERT INTO usage (channel, day, used) VALUES (?, ?, ?) "
+                       "ON CONFLICT (channel, day) DO UPDATE SET used = used + excluded.used",
+                       (name, quota_day(self.clock()), units))
+            return True
+        return self._tx(charge)
+
+    def refund(self, name: str, units: int):
+        """Give back units reserved today for a call that was never made."""
+        self._tx(lambda db: db.execute("UPDATE usage SET used = MAX(0, used - ?) WHERE channel = ? AND day = ?",
+                                       (units, name, quota_day(self.clock()))))
+
+    def booked_slots(self, name: str) -> list:
+        with self._lock:
+            rows = self._db.execute("SELECT at FROM slots WHERE channel = ? AND at > ? ORDER BY at",
+                                    (name, self.clock())).fetchall()
+        return [r[0] for r in rows]
+
+    def book_slot(self, name: str, when: float) -> bool:
+        """Book a publish time (epoch seconds) for the channel; False if it is already taken."""
+        def book(db):
+            db.execute("DELETE FROM slots WHERE at <= ?", (self.clock(),))  # forget published slots
+            return db.execute("INSERT OR IGNORE INTO slots (channel, at) VALUES (?, ?)", (name, when)).rowcount == 1
+        return self._tx(book)
+
+    def release_slot(self, name: str, when: float):
+        self._tx(lambda db: db.execute("DELETE FROM slots WHERE channel = ? AND at = ?", (name, when)))
+
+    def snapshot(self) -> dict:
+        """{channel: {"day", "used", "slots"}} for reporting."""
+        with self._lock:
+            names = sorted({r[0] for r in self._db.execute("SELECT channel FROM usage UNION SELECT channel FROM slots")})
+            used = {name: self._used(self._db, name) for name in names}
+        return {name: {"day": quota_day(self.clock()), "used": used[name], "slots": self.booked_slots(name)}
+                for name in names}
@@ -0,0 +1,128 @@
+"""
+RenderCache — content-addressed disk cache for rendered slides and encoded segments.
+- Entries are keyed by a hash of everything that affects the output (text, font, colors, codec settings...).
+- Total size is capped; least recently used entries are evicted first (mtime is bumped on every hit),
+  down to a low watermark so the next puts don't have to walk the tree again.
+- Hit/miss counters per kind, plus an estimate of the render time the hits saved.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from config import RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB
+
+
+def make_key(**params) -> str:
+    """Stable hash of the render parameters."""
+    blob = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    LOW_WATERMARK = 0.8  # eviction frees space down to this fraction of max_bytes
+
+    def __init__(self, root: str = RENDER_CACHE_DIR, max_bytes: int = RENDER_CACHE_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+        self._stats = {}
+
+    def _counter(self, kind: str) -> dict:
+        return self._stats.setdefault(kind, {"hits": 0, "misses": 0, "miss_seconds": 0.0})
+
+    def path_for(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{ext}")
+
+    def get(self, kind: str, key: str, ext: str) -> str | None:
+        """Return the cached file path for key, or None on a miss."""
+        path = self.path_for(key, ext)
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            self._counter(kind)["misses"] += 1
+            return None
+        self._counter(kind)["hits"] += 1
+        return path
+
+    def put(self, kind: str, key: str, ext: str, src_path: str, build_seconds: float = 0.0) -> str:
+        """
+        Move a freshly built file into the cache (atomic rename) and return its cached path.
+        :param build_seconds: how long the miss took to build, used for the saved-time estimate
+        """
+        path = self.path_for(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temp name: threads of one process may build the same key at the same time
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        shutil.move(src_path, tmp_path)
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            self._total_bytes += size - replaced
+            self._counter(kind)["miss_seconds"] += build_seconds
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self.evict(keep=path)
+        return path
+
+    def _entries(self):
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                yield full, st.st_size, st.st_mtime
+
+    def evict(self, keep: str | None = None) -> int:
+        """
+        Delete least recently used entries until the cache is under LOW_WATERMARK * max_bytes.
+        Returns bytes freed.
+        """
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * self.LOW_WATERMARK
+        freed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            freed += size
+        with self._lock:
+            self._total_bytes -= freed  # not the walk's total: puts may have landed since the walk
+        return freed
+
+    def stats(self) -> dict:
+        """Hit/miss counters per kind, total size and an estimate of render seconds saved by hits."""
+        out = {"bytes": self._total_bytes, "max_bytes": self.max_bytes, "kinds": {}}
+        saved = 0.0
+        for kind, c in self._stats.items():
+            lookups = c["hits"] + c["misses"]
+            avg_miss = c["miss_seconds"] / c["misses"] if c["misses"] else 0.0
+            kind_saved = c["hits"] * avg_miss
+            saved += kind_saved
+            out["kinds"][kind] = {
+                "hits": c["hits"],
+                "misses": c["misses"],
+                "hit_rate": round(c["hits"] / lookups, 3) if lookups else 0.0,
+                "saved_seconds": round(kind_saved, 2),
+            }
+        out["saved_seconds"] = round(saved, 2)
+        return out
+
@@ -0,0 +1,504 @@
+"""
+RenderQueue — shared work queue for the render farm, with leases.
+- The coordinator enqueue()s jobs; a worker lease()s the oldest queued job for lease_seconds and keeps
+  it alive with heartbeat(). complete() / fail() only succeed for the worker that still holds the lease.
+- requeue_expired() (called by coordinators and workers alike) puts jobs whose lease ran out back in
+  the queue, or fails them after max_attempts.
+- Workers register themselves; busy time, jobs done/failed and last heartbeat are kept per worker,
+  so stats() can report cluster throughput and per-worker utilization.
+Backends are pluggable: open_render_queue(url) picks one by URL scheme (BACKENDS).
+- sqlite:///path/queue.sqlite (WAL, BEGIN IMMEDIATE for claims) is single-host only: WAL needs shared memory,
+  so the file must be on a local disk and every worker runs on that host (one per core).
+- dir:///shared/farm/queue keeps one JSON file per job and per worker in a directory that every node mounts
+  (NFS included). Changes are made under per-file locks taken with link(2), the lock protocol that
+  open(2) documents for NFS, and written with an atomic rename, so workers on several machines can share it.
+  Lease times come from each node's clock: keep the nodes in sync (NTP).
+"""
+import abc
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import quote
+from utils.logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',   -- queued | leased | done | failed
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    busy_seconds REAL NOT NULL DEFAULT 0,
+    jobs_done INTEGER NOT NULL DEFAULT 0,
+    jobs_failed INTEGER NOT NULL DEFAULT 0,
+    current_job INTEGER
+);
+"""
+
+
+class RenderQueue(abc.ABC):
+    """Interface every backend implements (jobs are dicts: id, payload, status, worker, attempts, result, error...)."""
+
+    @abc.abstractmethod
+    def enqueue(self, payload: dict) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def lease(self, worker: str, lease_seconds: float) -> dict | None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def heartbeat(self, job_id: int, worker: str, lease_seconds: float) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def complete(self, job_id: int, worker: str, result: dict, busy_seconds: float) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def fail(self, job_id: int, worker: str, error: str, busy_seconds: float) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def requeue_expired(self) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get(self, job_id: int) -> dict | None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def active(self) -> list:
+        """Jobs still queued or leased."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def register_worker(self, worker: str, host: str, pid: int):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stats(self, window_seconds: float = 600) -> dict:
+        raise NotImplementedError
+
+
+class SQLiteRenderQueue(RenderQueue):
+    def __init__(self, path: str, max_attempts: int = 3):
+        """
+        :param path: SQLite file shared by the coordinator and all workers
+        :param max_attempts: leases per job before it is marked failed
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode; multi-statement changes use explicit BEGIN IMMEDIATE transactions
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def _tx(self, fn):
+        """Run fn(db) inside one write transaction (serialized across processes)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return out
+
+    @staticmethod
+    def _job(row) -> dict | None:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, payload: dict) -> int:
+        return self._tx(lambda db: db.execute("INSERT INTO jobs (payload, created) VALUES (?, ?)",
+                                              (json.dumps(payload), time.time())).lastrowid)
+
+    def lease(self, worker: str, lease_seconds: float) -> dict | None:
+        def claim(db):
+            row = db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            now = time.time()
+            if row is None:
+                db.execute("UPDATE workers SET last_seen = ? WHERE id = ?", (now, worker))  # idle, but alive
+                return None
+            db.execute("UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                       "started = ? WHERE id = ?", (worker, now + lease_seconds, now, row["id"]))
+            db.execute("UPDATE workers SET current_job = ?, last_seen = ? WHERE id = ?", (row["id"], now, worker))
+            return self._job(db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+        return self._tx(claim)
+
+    def heartbeat(self, job_id: int, worker: str, lease_seconds: float) -> bool:
+        def beat(db):
+            now = time.time()
+            db.execute("UPDATE workers SET last_seen = ? WHERE id = ?", (now, worker))
+            return db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                              (now + lease_seconds, job_id, worker)).rowcount == 1
+        return self._tx(beat)
+
+    def _finish(self, job_id: int, worker: str, busy_seconds: float, done: bool, result=None, error=None) -> bool:
+        def finish(db):
+            now = time.time()
+            row = db.execute("SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'leased'",
+                             (job_id, worker)).fetchone()
+            # The time was spent either way; the job only counts for the worker that still holds the lease
+            counter = "" if row is None else ", jobs_done = jobs_done + 1" if done else ", jobs_failed = jobs_failed + 1"
+            db.execute("UPDATE workers SET busy_seconds = busy_seconds + ?, last_seen = ?, current_job = NULL"
+                       + counter + " WHERE id = ?", (busy_seconds, now, worker))
+            if row is None:
+                return False  # lease lost (expired and taken over): the result is discarded
+            if done:
+                status = "done"
+            else:
+                status = "queued" if row["attempts"] < self.max_attempts else "failed"
+            db.execute("UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, "
+                       "worker = CASE WHEN ? = 'queued' THEN NULL ELSE worker END WHERE id = ?",
+                       (status, json.dumps(result) if result is not None else None, error,
+                        now if status != "queued" else None, status, job_id))
+            return True
+        return self._tx(finish)
+
+    def complete(self, job_id: int, worker: str, result: dict, busy_seconds: float) -> bool:
+        return self._finish(job_id, worker, busy_seconds, True, result=result)
+
+    def fail(self, job_id: int, worker: str, error: str, busy_seconds: float) -> bool:
+        """Record a failed attempt; the job is queued again unless it has used up its attempts."""
+        return self._finish(job_id, worker, busy_seconds, False, error=error)
+
+    def requeue_expired(self) -> int:
+        def reap(db):
+            now = time.time()
+            db.execute("UPDATE workers SET current_job = NULL WHERE current_job IN "
+                       "(SELECT id FROM jobs WHERE status = 'leased' AND lease_until < ?)", (now,))
+            failed = db.execute("UPDATE jobs SET status = 'failed', error = 'lease expired', finished = ? "
+                                "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                                (now, now, self.max_attempts)).rowcount
+            requeued = db.execute("UPDATE jobs SET status = 'queued', worker = NULL "
+                                  "WHERE status = 'leased' AND lease_until < ?", (now,)).rowcount
+            return failed + requeued
+        return self._tx(reap)
+
+    def get(self, job_id: int) -> dict | None:
+        with self._lock:
+            return self._job(self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def active(self) -> list:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM jobs WHERE status IN ('queued', 'leased') ORDER BY id").fetchall()
+        return [self._job(r) for r in rows]
+
+    def register_worker(self, worker: str, host: str, pid: int):
+        now = time.time()
+        self._tx(lambda db: db.execute(
+            "INSERT INTO workers (id, host, pid, started, last_seen) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET started = excluded.started, last_seen = excluded.last_seen, "
+            "busy_seconds = 0, jobs_done = 0, jobs_failed = 0, current_job = NULL", (worker, host, pid, now, now)))
+
+    def stats(self, window_seconds: float = 600) -> dict:
+        """
+        Queue depth by status; jobs finished and render seconds over the last window (throughput);
+        and per worker: utilization (busy / alive time), jobs done/failed, seconds since last heartbeat.
+        """
+        now = time.time()
+        with self._lock:
+            depth = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            done, render = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(finished - started), 0) FROM jobs WHERE status = 'done' AND finished >= ?",
+                (now - window_seconds,)).fetchone()
+            workers = [dict(r) for r in self._db.execute("SELECT * FROM workers ORDER BY id").fetchall()]
+        return _stats(depth, done, render, workers, now, window_seconds)
+
+
+def _stats(depth: dict, done: int, render: float, workers: list, now: float, window_seconds: float) -> dict:
+    return {
+        "queue": depth,
+        "window_seconds": window_seconds,
+        "jobs_per_minute": round(done / (window_seconds / 60), 3),
+        "avg_job_seconds": round(render / done, 2) if done else None,
+        "workers": {
+            w["id"]: {
+                "utilization": round(w["busy_seconds"] / max(w["last_seen"] - w["started"], 1e-6), 3),
+                "jobs_done": w["jobs_done"],
+                "jobs_failed": w["jobs_failed"],
+                "current_job": w["current_job"],
+                "seen_seconds_ago": round(now - w["last_seen"], 1),
+            }
+            for w in workers
+        },
+    }
+
+
+LOCK_STALE_SECONDS = 30  # a lock file this old belongs to a process that died while holding it
+LOCK_POLL_SECONDS = 0.005
+
+
+def _link(src: str, dst: str) -> bool:
+    """Hard-link src to dst if dst does not exist yet. On NFS a lost reply can make a link that succeeded
+    look failed (or the retransmit report EEXIST), so the link count of src is what decides."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        pass
+    return os.stat(src).st_nlink == 2
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on path (link(2) protocol: works across NFS clients, unlike flock or O_EXCL on NFSv2)."""
+    unique = f"{path}.{socket.gethostname()}.{os.getpid()}.{threading.get_ident()}"
+    open(unique, "w").close()
+    try:
+        while not _link(unique, path):
+            try:
+                age = time.time() - os.stat(path).st_ctime  # ctime: when the holder linked it
+            except FileNotFoundError:
+                continue
+            if age > LOCK_STALE_SECONDS:
+                logger.warning(f"Breaking stale render queue lock {path} ({age:.0f}s old)")
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            time.sleep(LOCK_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            os.unlink(path)
+    finally:
+        os.unlink(unique)
+
+
+def _read_json(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path: str, data: dict):
+    """Replace path atomically: readers (locked or not) see the old or the new record, never half of one."""
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class DirRenderQueue(RenderQueue):
+    """
+    Queue kept as files in a shared directory:
+    - jobs/<id>.json: queued and leased jobs; finished/<id>.json: done and failed ones (leases only scan jobs/)
+    - workers/<name>.json: per-worker counters; locks/: link(2) lock files
+    A job or worker file is only rewritten under its lock; a new job id is claimed by linking its file into
+    jobs/, which fails if another node took that id first.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        """
+        :param path: directory shared by the coordinator and all workers (local disk or NFS mount)
+        :param max_attempts: leases per job before it is marked failed
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self._jobs, self._finished, self._workers, self._locks = (
+            os.path.join(path, d) for d in ("jobs", "finished", "workers", "locks"))
+        for d in (self._jobs, self._finished, self._workers, self._locks):
+            os.makedirs(d, exist_ok=True)
+
+    @staticmethod
+    def _ids(directory: str) -> list:
+        return sorted(int(name[:-5]) for name in os.listdir(directory) if name.endswith(".json"))
+
+    def _job_path(self, job_id: int, finished: bool = False) -> str:
+        return os.path.join(self._finished if finished else self._jobs, f"{job_id:010d}.json")
+
+    def _job_lock(self, job_id: int):
+        return _file_lock(os.path.join(self._locks, f"job{job_id}.lock"))
+
+    def _worker_path(self, worker: str) -> str:
+        return os.path.join(self._workers, quote(worker, safe="") + ".json")
+
+    def _worker_lock(self, worker: str):
+        return _file_lock(os.path.join(self._locks, "worker-" + quote(worker, safe="") + ".lock"))
+
+    def _update_worker(self, worker: str, fn):
+        """Apply fn(record) to a registered worker's record (unregistered workers are not tracked)."""
+        path = self._worker_path(worker)
+        with self._worker_lock(worker):
+            record = _read_json(path)
+            if record is not None:
+                fn(record)
+                _write_json(path, record)
+
+    def enqueue(self, payload: dict) -> int:
+        job = {"payload": payload, "status": "queued", "worker": None, "lease_until": None, "attempts": 0,
+               "result": None, "error": None, "created": time.time(), "started": None, "finished": None}
+        tmp = os.path.join(self._jobs, f"new.{uuid.uuid4().hex}.tmp")
+        try:
+            while True:
+                # jobs/ before finished/: a job that moves in between is still seen in one of them
+                job["id"] = max(self._ids(self._jobs) + self._ids(self._finished), default=0) + 1
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(job, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if _link(tmp, self._job_path(job["id"])):
+                    return job["id"]
+                os.unlink(tmp)  # another coordinator took that id
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def lease(self, worker: str, lease_seconds: float) -> dict | None:
+        now = time.time()
+        for job_id in self._ids(self._jobs):
+            if (_read_json(self._job_path(job_id)) or {}).get("status") != "queued":
+                continue  # unlocked peek; re-checked under the lock
+            with self._job_lock(job_id):
+                job = _read_json(self._job_path(job_id))
+                if job is None or job["status"] != "queued":
+                    continue
+                job.update(status="leased", worker=worker, lease_until=now + lease_seconds,
+                           attempts=job["attempts"] + 1, started=now)
+                _write_json(self._job_path(job_id), job)
+            self._update_worker(worker, lambda w: w.update(current_job=job_id, last_seen=now))
+            return job
+        self._update_worker(worker, lambda w: w.update(last_seen=now))  # idle, but alive
+        return None
+
+    def heartbeat(self, job_id: int, worker: str, lease_seconds: float) -> bool:
+        now = time.time()
+        self._update_worker(worker, lambda w: w.update(last_seen=now))
+        with self._job_lock(job_id):
+            job = _read_json(self._job_path(job_id))
+            if job is None or job["status"] != "leased" or job["worker"] != worker:
+                return False
+            job["lease_until"] = now + lease_seconds
+            _write_json(self._job_path(job_id), job)
+            return True
+
+    def _store(self, job: dict):
+        """Write a job under its lock; a finished one moves from jobs/ to finished/."""
+        if job["status"] in ("done", "failed"):
+            _write_json(self._job_path(job["id"], finished=True), job)
+            os.unlink(self._job_path(job["id"]))
+        else:
+            _write_json(self._job_path(job["id"]), job)
+
+    def _finish(self, job_id: int, worker: str, busy_seconds: float, done: bool, result=None, error=None) -> bool:
+        now = time.time()
+        with self._job_lock(job_id):
+            job = _read_json(self._job_path(job_id))
+            held = job is not None and job["status"] == "leased" and job["worker"] == worker
+            if held:
+                if done:
+                    status = "done"
+                else:
+                    status = "queued" if job["attempts"] < self.max_attempts else "failed"
+                job.update(status=status, result=result, error=error, finished=now if status != "queued" else None,
+                           worker=None if status == "queued" else worker)
+                self._store(job)
+
+        def account(w):
+            # The time was spent either way; the job only counts for the worker that still held the lease
+            w.update(busy_seconds=w["busy_seconds"] + busy_seconds, last_seen=now, current_job=None)
+            if held:
+                w["jobs_done" if done else "jobs_failed"] += 1
+        self._update_worker(worker, account)
+        return held
+
+    def complete(self, job_id: int, worker: str, result: dict, busy_seconds: float) -> bool:
+        return self._finish(job_id, worker, busy_seconds, True, result=result)
+
+    def fail(self, job_id: int, worker: str, error: str, busy_seconds: float) -> bool:
+        """Record a failed attempt; the job is queued again unless it has used up its attempts."""
+        return self._finish(job_id, worker, busy_seconds, False, error=error)
+
+    def requeue_expired(self) -> int:
+        count = 0
+        for job in self.active():
+            if job["status"] != "leased" or job["lease_until"] >= time.time():
+                continue
+            with self._job_lock(job["id"]):
+                job = _read_json(self._job_path(job["id"]))
+                now = time.time()
+                if job is None or job["status"] != "leased" or job["lease_until"] >= now:
+                    continue
+                expired_worker = job["worker"]
+                if job["attempts"] >= self.max_attempts:
+                    job.update(status="failed", error="lease expired", finished=now)
+                else:
+                    job.update(status="queued", worker=None)
+                self._store(job)
+            count += 1
+            self._update_worker(expired_worker, lambda w, job_id=job["id"]: w.update(
+                current_job=None if w["current_job"] == job_id else w["current_job"]))
+        return count
+
+    def get(self, job_id: int) -> dict | None:
+        # finished/ is written before the jobs/ file goes, so look there again if the job moved meanwhile
+        return (_read_json(self._job_path(job_id, finished=True)) or _read_json(self._job_path(job_id))
+                or _read_json(self._job_path(job_id, finished=True)))
+
+    def active(self) -> list:
+        jobs = (_read_json(self._job_path(job_id)) for job_id in self._ids(self._jobs))
+        return [job for job in jobs if job is not None and job["status"] in ("queued", "leased")]
+
+    def register_worker(self, worker: str, host: str, pid: int):
+        now = time.time()
+        with self._worker_lock(worker):
+            _write_json(self._worker_path(worker), {"id": worker, "host": host, "pid": pid, "started": now, "last_seen": now,
+                               "busy_seconds": 0, "jobs_done": 0, "jobs_failed": 0, "current_job": None})
+
+    def stats(self, window_seconds: float = 600) -> dict:
+        """Same report as SQLiteRenderQueue.stats() (reads every job file: meant for status checks, not polling)."""
+        now = time.time()
+        depth, done, render = {}, 0, 0.0
+        finished = (_read_json(self._job_path(job_id, finished=True)) for job_id in self._ids(self._finished))
+        for job in self.active() + [job for job in finished if job is not None]:
+            depth[job["status"]] = depth.get(job["status"], 0) + 1
+            if job["status"] == "done" and job["finished"] >= now - window_seconds:
+                done, render = done + 1, render + job["finished"] - job["started"]
+        workers = [w for w in (_read_json(os.path.join(self._workers, name))
+                               for name in sorted(os.listdir(self._workers)) if name.endswith(".json")) if w]
+        return _stats(depth, done, render, sorted(workers, key=lambda w: w["id"]), now, window_seconds)
+
+
+# URL scheme -> backend factory(path after "scheme://", **options)
+BACKENDS = {"sqlite": SQLiteRenderQueue, "dir": DirRenderQueue}
+
+
+def open_render_queue(url: str, **options) -> RenderQueue:
+    """Queue for a URL such as sqlite:///srv/farm/queue.sqlite or dir:///mnt/farm/queue (more: register in BACKENDS)."""
+    scheme, sep, rest = url.partition("://")
+    if not sep or scheme not in BACKENDS:
+        raise ValueError(f"Unsupported render queue URL: {url} (schemes: {', '.join(BACKENDS)})")
+    return BACKENDS[scheme](rest, **options)
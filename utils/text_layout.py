@@ -0,0 +1,68 @@
+"""
+Process-wide font cache and memoized text measurement for the slide and thumbnail renderers.
+- Fonts are loaded once per (path, size).
+- Word widths and line boxes are measured once per (font, text) and reused across captions.
+"""
+from functools import lru_cache
+from PIL import ImageFont
+
+
+@lru_cache(maxsize=64)
+def get_font(path: str, size: int):
+    """Load a TrueType font once per process."""
+    return ImageFont.truetype(path, size)
+
+
+@lru_cache(maxsize=64)
+def get_font_or_default(path: str, size: int):
+    """Like get_font, but falls back to PIL's default font (and caches that too) if path can't be loaded."""
+    try:
+        return get_font(path, size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=65536)
+def text_width(font, text: str) -> float:
+    """Advance width of text in font."""
+    return font.getlength(text)
+
+
+@lru_cache(maxsize=16384)
+def text_bbox(font, text: str) -> tuple:
+    """Ink bounding box of text in font, as ImageDraw.textbbox((0, 0), ...) would return."""
+    return font.getbbox(text)
+
+
+def wrap_words(text: str, font, max_width: float) -> list[str]:
+    """
+    Greedy word wrap. Each distinct word is measured once; line widths are the sum
+    of word advances plus spaces, so no prefix of the line is ever re-measured.
+    """
+    space = text_width(font, " ")
+    lines = []
+    current = []
+    current_w = 0.0
+    for word in text.split():
+        w = text_width(font, word)
+        test_w = current_w + space + w if current else w
+        if test_w <= max_width or not current:
+            current.append(word)
+            current_w = test_w
+        else:
+            lines.append(" ".join(current))
+            current = [word]
+            current_w = w
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+
+@lru_cache(maxsize=4096)
+def layout_lines(text: str, font, max_width: float) -> tuple:
+    """Wrapped lines of text as (line, width, height) tuples, using the ink box of each line."""
+    out = []
+    for line in wrap_words(text, font, max_width):
+        left, top, right, bottom = text_bbox(font, line)
+        out.append((line, right - left, bottom - top))
+    return tuple(out)
@@ -0,0 +1,277 @@
+"""
+TopicStore — indexed, no-repeat access to the seed corpus (data/quotes_seed.txt).
+- A compact offset index (one uint64 per fact) is built once and extended incrementally when
+  lines are appended to the seed file; facts are read with a seek + readline, never a full reread.
+- A 64-bit hash per fact is kept alongside, so a line identical to an indexed one is never indexed twice.
+- Sampling without replacement walks a stored random permutation with a cursor: O(1) per topic.
+  New facts are shuffled into the not-yet-used tail of the permutation.
+- The cursor (= which facts are used) lives in OUTPUT_DIR/used_topics.json and is written atomically.
+- With a near-duplicate index attached, new seed lines too similar to a published topic are
+  never indexed, and sampled topics are checked again before use. A topic only counts as published
+  once mark_published() is called for it (after its upload), so topics of failed runs come back
+  in the next cycle while published ones (and their near-duplicates) are skipped.
+- add_facts() appends facts from other sources (e.g. ingested trends) to the seed file, skipping
+  ones already indexed or near-duplicates of published topics; they are indexed like any appended line.
+- Everything loads lazily on first use.
+"""
+import hashlib
+import json
+import os
+import random
+import struct
+import threading
+from array import array
+from pathlib import Path
+from config import TOPIC_STATE_PATH
+from utils.logger import logger
+
+_MAGIC = b'TIDX2'
+_HEADER = struct.Struct('<5sQQ')  # magic, bytes of seed file indexed, number of facts; then offsets, then hashes
+
+
+def _line_hash(raw: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(raw.strip(), digest_size=8).digest(), 'little')
+
+
+def _atomic_write_bytes(path: Path, data: bytes):
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class TopicStore:
+    def __init__(self, seed_path, index_path=None, state_path=TOPIC_STATE_PATH, dedup=None):
+        """
+        :param seed_path: text file with one fact per line ('#' comments and blank lines ignored)
+        :param index_path: offset index file (default: <seed>.idx)
+        :param state_path: used-topic state (cursor into the permutation)
+        :param dedup: optional NearDuplicateIndex of published topics
+        """
+        self.seed_path = Path(seed_path)
+        self.index_path = Path(index_path) if index_path else self.seed_path.with_suffix('.idx')
+        self.order_path = self.index_path.with_suffix('.order')
+        self.state_path = Path(state_path)
+        self.dedup = dedup
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._offsets = array('Q')
+        self._hashes = array('Q')
+        self._known = set()  # hashes of indexed facts
+        self._order = array('Q')
+        self._indexed_size = 0
+        self._cursor = 0
+        self._cycle = 0
+
+    # ---- loading / indexing -------------------------------------------------
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._load_index()
+        self._load_state()
+        self._refresh()
+        self._loaded = True
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                magic, size, count = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC:
+                    raise ValueError('bad index header')
+                offsets, hashes = array('Q'), array('Q')
+                offsets.fromfile(f, count)
+                hashes.fromfile(f, count)
+            order = array('Q')
+            with open(self.order_path, 'rb') as f:
+                order.frombytes(f.read())
+        except (OSError, ValueError, EOFError, struct.error):
+            return
+        self._offsets, self._hashes, self._order, self._indexed_size = offsets, hashes, order, size
+        self._known = set(hashes)
+
+    def _load_state(self):
+        try:
+            state = json.loads(self.state_path.read_text(encoding='utf-8') or '{}')
+        except (OSError, ValueError):
+            state = {}
+        if not isinstance(state, dict):
+            state = {}
+        self._cursor = min(int(state.get('cursor', 0)), len(self._order))
+        self._cycle = int(state.get('cycle', 0))
+
+    def _refresh(self):
+        """Bring the index up to date with the seed file (incremental when the file only grew)."""
+        if not self.seed_path.exists():
+            return
+        size = self.seed_path.stat().st_size
+        if size == self._indexed_size:
+            return
+        if size < self._indexed_size:
+            logger.info(f'{self.seed_path} shrank; rebuilding topic index.')
+            self._offsets, self._hashes, self._order = array('Q'), array('Q'), array('Q')
+            self._known, self._indexed_size, self._cursor = set(), 0, 0
+        added = self._scan_from(self._indexed_size)
+        self._shuffle_in(added)
+        self._save_index()
+        self._save_state()
+        if added:
+            logger.info(f'Indexed {len(added)} new topics ({len(self._offsets)} total).')
+
+    def _scan_from(self, start: int) -> list:
+        """Index the lines from byte `start` to the end of the file; returns the new fact ids."""
+        added = []
+        rejected = repeated = 0
+        pos = start
+        with open(self.seed_path, 'rb') as f:
+            if start:
+                f.seek(start - 1)
+                if f.read(1) != b'\n':
+                    # The last indexed line had no newline and has been extended: it keeps its offset
+                    pos += len(f.readline())
+            for raw in f:
+                if self._is_fact(raw):
+                    if _line_hash(raw) in self._known:
+                        repeated += 1
+                    elif self.dedup is not None and self.dedup.is_near_duplicate(raw.decode('utf-8', errors='replace')):
+                        rejected += 1
+                    else:
+                        added.append(self._add_fact(pos, raw))
+                pos += len(raw)
+        self._indexed_size = pos
+        if repeated:
+            logger.info(f'Skipped {repeated} seed lines identical to indexed ones.')
+        if rejected:
+            logger.info(f'Skipped {rejected} new seed lines that are near-duplicates of published topics.')
+        return added
+
+    def _is_fact(self, raw: bytes) -> bool:
+        line = raw.strip()
+        return bool(line) and not line.startswith(b'#')
+
+    def _add_fact(self, pos: int, raw: bytes) -> int:
+        h = _line_hash(raw)
+        self._offsets.append(pos)
+        self._hashes.append(h)
+        self._known.add(h)
+        return len(self._offsets) - 1
+
+    def _shuffle_in(self, ids: list):
+        """Insert new fact ids at random positions of the unused tail of the permutation."""
+        for fact_id in ids:
+            self._order.append(fact_id)
+            j = random.randrange(self._cursor, len(self._order))
+            self._order[-1], self._order[j] = self._order[j], self._order[-1]
+
+    def _save_index(self):
+        body = (_HEADER.pack(_MAGIC, self._indexed_size, len(self._offsets)) + self._offsets.tobytes()
+                + self._hashes.tobytes())
+        _atomic_write_bytes(self.index_path, body)
+        _atomic_write_bytes(self.order_path, self._order.tobytes())
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        state = {'cursor': self._cursor, 'cycle': self._cycle, 'total': len(self._order)}
+        _atomic_write_bytes(self.state_path, json.dumps(state, indent=2).encode('utf-8'))
+
+    # ---- reading / sampling -------------------------------------------------
+
+    def _read_fact(self, fact_id: int) -> str:
+        with open(self.seed_path, 'rb') as f:
+            f.seek(self._offsets[fact_id])
+            return f.readline().decode('utf-8', errors='replace').strip()
+
+    def _new_cycle(self):
+        logger.warning(f'All {len(self._order)} topics have been used; starting a new cycle.')
+        for i in range(len(self._order) - 1, 0, -1):
+            j = random.randint(0, i)
+            self._order[i], self._order[j] = self._order[j], self._order[i]
+        self._cursor = 0
+        self._cycle += 1
+        _atomic_write_bytes(self.order_path, self._order.tobytes())
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._offsets)
+
+    def remaining(self) -> int:
+        """Topics not used yet in the current cycle."""
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._order) - self._cursor
+
+    def sample(self, n: int = 1) -> list[str]:
+        """
+        Take up to n unused topics (without replacement) and mark them used.
+        Starts a new cycle (at most once per call) when every topic has been used; never repeats within one call.
+        Returns fewer than n (possibly none) when even a new cycle has nothing left that isn't published.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._refresh()
+            if not self._order:
+                return []
+            out = []
+            taken = set()
+            cycled = False
+            while len(out) < min(n, len(self._order)):
+                if self._cursor >= len(self._order):
+                    if cycled:
+                        logger.warning('No unpublished topics left in the seed corpus.')
+                        break
+                    self._new_cycle()
+                    cycled = True
+                fact_id = self._order[self._cursor]
+                self._cursor += 1
+                if fact_id in taken:
+                    continue
+                taken.add(fact_id)
+                text = self._read_fact(fact_id)
+                if self.dedup is not None:
+                    match, score = self.dedup.query(text)
+                    if score >= self.dedup.threshold:
+                        logger.info(f"Skipping topic similar ({score:.2f}) to published '{match}': {text}")
+                        continue
+                out.append(text)
+            self._save_state()
+            return out
+
+    def add_facts(self, facts: list) -> int:
+        """
+        Append facts to the seed file (one line each) unless they are already indexed or near-duplicates
+        of published topics, and index them. Returns how many were added.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._refresh()
+            lines, seen = [], set()
+            for fact in facts:
+                raw = ' '.join(str(fact).split()).encode('utf-8')
+                if not self._is_fact(raw) or _line_hash(raw) in self._known or _line_hash(raw) in seen:
+                    continue
+                if self.dedup is not None and self.dedup.is_near_duplicate(raw.decode('utf-8')):
+                    continue
+                seen.add(_line_hash(raw))
+                lines.append(raw)
+            if not lines:
+                return 0
+            self.seed_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.seed_path, 'ab+') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    lead = b'' if f.read(1) == b'\n' else b'\n'
+                else:
+                    lead = b''
+                f.write(lead + b'\n'.join(lines) + b'\n')
+            before = len(self._offsets)
+            self._refresh()
+            return len(self._offsets) - before
+
+    def mark_published(self, text: str):
+        """Record a topic as published, so neither it nor its near-duplicates are sampled again."""
+        if self.dedup is not None and not self.dedup.is_near_duplicate(text):
+            self.dedup.add(text)
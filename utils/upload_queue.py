@@ -0,0 +1,95 @@
+"""
+UploadQueue — small on-disk queue of pending YouTube uploads.
+- One entry per video path with its metadata and the resumable session URI / acknowledged bytes.
+- Stored in SQLite (WAL). put() reads and updates an entry in one BEGIN IMMEDIATE transaction and
+  nothing is cached in memory, so several processes sharing a queue (cron runs, the daemon) never
+  overwrite each other's entries, and a crash mid-write leaves the last committed queue behind.
+  A queue left by older versions (the JSON file next to it) is imported once.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import UPLOAD_QUEUE_PATH
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    video_path TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_created ON entries (created);
+"""
+
+
+class UploadQueue:
+    def __init__(self, path: str = UPLOAD_QUEUE_PATH):
+        """
+        :param path: SQLite file (":memory:" for a throwaway queue)
+        """
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode; changes use explicit BEGIN IMMEDIATE transactions
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        if path != ":memory:":
+            self._import_json(os.path.splitext(path)[0] + ".json")
+
+    def _tx(self, fn):
+        """Run fn(db) inside one write transaction (serialized across processes)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return out
+
+    def _import_json(self, path: str):
+        """Carry over the entries of a JSON queue, then set the file aside."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        entries = [e for e in (entries.values() if isinstance(entries, dict) else ()) if e.get("video_path")]
+        self._tx(lambda db: db.executemany(
+            "INSERT OR IGNORE INTO entries (video_path, created, entry) VALUES (?, ?, ?)",
+            [(e["video_path"], e.get("created", 0), json.dumps(e)) for e in entries]))
+        os.replace(path, path + ".imported")
+
+    def get(self, video_path: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT entry FROM entries WHERE video_path = ?",
+                                   (os.path.abspath(video_path),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, video_path: str, **fields) -> dict:
+        """Create or update the entry for video_path and persist the queue."""
+        key = os.path.abspath(video_path)
+
+        def update(db):
+            row = db.execute("SELECT entry FROM entries WHERE video_path = ?", (key,)).fetchone()
+            entry = json.loads(row[0]) if row else {"video_path": key, "created": time.time()}
+            entry.update(fields)
+            entry["updated"] = time.time()
+            db.execute("INSERT INTO entries (video_path, created, entry) VALUES (?, ?, ?) "
+                       "ON CONFLICT (video_path) DO UPDATE SET entry = excluded.entry",
+                       (key, entry["created"], json.dumps(entry)))
+            return entry
+        return self._tx(update)
+
+    def remove(self, video_path: str):
+        self._tx(lambda db: db.execute("DELETE FROM entries WHERE video_path = ?", (os.path.abspath(video_path),)))
+
+    def pending(self) -> list[dict]:
+        """All queued entries, oldest first."""
+        with self._lock:
+            rows = self._db.execute("SELECT entry FROM entries ORDER BY created").fetchall()
+        return [json.loads(r[0]) for r in rows]
@@ -0,0 +1,198 @@
+"""
+Compilation videos (e.g. a weekly "Top 50 facts") assembled from shorts that were already rendered.
+- Nothing is composed in memory: ffmpeg handles one clip at a time and the final join is a concat-demuxer
+  stream copy, so memory use is the same for a 2-minute and a 25-minute compilation.
+- Each short is probed and only re-encoded as far as it has to be: clips already in the compilation format
+  are used as they are, clips whose video fits but whose audio (or time base) differs are remuxed with the
+  video stream copied, and clips of another size, frame rate, codec or encoder settings (vertical shorts)
+  are scaled and padded to 16:9 once. A copied video stream must have the same H.264 parameter sets
+  (SPS/PPS) as the cards: the joined file keeps only the first segment's, so a clip encoded with other
+  settings (profile, preset, SAR, colour tags...) would not decode after the join.
+- Title cards (an intro, then "#N" before each fact) are short still segments encoded in the same format;
+  the compilation format itself is read back from the intro card, so copied clips match it exactly.
+- Normalized clips and cards go to the render cache, so next week's compilation reuses most of them.
+"""
+import os
+import tempfile
+import time
+import uuid
+from PIL import Image, ImageDraw
+from config import (OUTPUT_DIR, FPS, ENCODER_PROFILE, RENDER_CACHE_MAX_MB, COMPILATION_WIDTH, COMPILATION_HEIGHT,
+                    COMPILATION_DAYS, COMPILATION_CARD_SECONDS)
+from services.ffmpeg_service import (encoder_profile, x264_args, run_ffmpeg, probe_streams, encode_still_segment,
+                                     concat_segments, h264_parameter_sets)
+from utils.logger import logger
+from utils.render_cache import RenderCache, make_key
+from utils.text_layout import get_font_or_default, layout_lines
+from utils.time_utils import timestamp_now
+
+AUDIO_RATE = 44100
+AUDIO_CHANNELS = 2
+
+
+class CompilationBuilder:
+    BG_COLOR = (18, 18, 18)
+    TEXT_COLOR = "white"
+    FONT_SIZE = 110
+
+    def __init__(self, font_path: str = 'arial.ttf', profile: str = ENCODER_PROFILE, cache: RenderCache | None = None,
+                 width: int = COMPILATION_WIDTH, height: int = COMPILATION_HEIGHT,
+                 card_seconds: float = COMPILATION_CARD_SECONDS):
+        """
+        :param font_path: TrueType font for the title cards (PIL's default font if it can't be loaded)
+        :param profile: encoder profile for re-encoded clips and cards
+        :param cache: where normalized clips and cards are kept; defaults to the shared render cache
+        :param width: compilation frame width (16:9 by default)
+        :param height: compilation frame height
+        :param card_seconds: length of each "#N" card (0: no cards between clips)
+        """
+        self.font_path = font_path
+        self.profile = encoder_profile(profile)
+        if cache is None and RENDER_CACHE_MAX_MB > 0:
+            cache = RenderCache()
+        self.cache = cache
+        self.width = width
+        self.height = height
+        self.card_seconds = card_seconds
+        self.format = None  # stream parameters every segment must share; read from the first card
+
+    def _codec_key(self) -> dict:
+        return {k: v for k, v in self.profile.items() if k != "threads"}  # threads don't change the output
+
+    def _cached(self, kind: str, key: str, build, tmp_dir: str) -> str:
+        """Cached file for key, or build(path) into tmp_dir and store it in the cache."""
+        if self.cache:
+            path = self.cache.get(kind, key, "mp4")
+            if path:
+                return path
+        path = os.path.join(tmp_dir, f"{kind}_{key[:16]}.mp4")
+        start = time.perf_counter()
+        build(path)
+        if self.cache:
+            path = self.cache.put(kind, key, "mp4", path, build_seconds=time.perf_counter() - start)
+        return path
+
+    def render_card(self, text: str) -> Image.Image:
+        """Centered white text on the background color, at compilation size."""
+        img = Image.new("RGB", (self.width, self.height), color=self.BG_COLOR)
+        draw = ImageDraw.Draw(img)
+        font = get_font_or_default(self.font_path, self.FONT_SIZE)
+        lines = layout_lines(text, font, self.width - 200)
+        y = (self.height - sum(h * 1.2 for _, _, h in lines)) / 2
+        for line, w, h in lines:
+            draw.text(((self.width - w) / 2, y), line, font=font, fill=self.TEXT_COLOR)
+            y += h * 1.2
+        return img
+
+    def card(self, text: str, seconds: float, tmp_dir: str) -> str:
+        """A still title-card segment with a silent audio track."""
+        frames = max(1, round(seconds * FPS))
+        key = make_key(kind="compilation_card", text=text, font=self.font_path, size=self.FONT_SIZE,
+                       bg=self.BG_COLOR, fg=self.TEXT_COLOR, width=self.width, height=self.height, frames=frames,
+                       fps=FPS, audio=[AUDIO_RATE, AUDIO_CHANNELS], codec=self._codec_key())
+
+        def build(path):
+            png = path + ".png"
+            self.render_card(text).save(png)
+            try:
+                encode_still_segment(png, path, frames, FPS, self.profile, silent_audio=(AUDIO_RATE, AUDIO_CHANNELS))
+            finally:
+                os.remove(png)
+        return self._cached("compilation_card", key, build, tmp_dir)
+
+    def probe(self, path: str) -> dict:
+        """probe_streams() plus the video's H.264 parameter sets (video["params"])."""
+        info = probe_streams(path)
+        if info["video"]:
+            info["video"]["params"] = h264_parameter_sets(path) if info["video"]["codec"] == "h264" else None
+        return info
+
+    def plan(self, info: dict) -> str:
+        """
+        "copy" (already in the compilation format), "remux" (video fits: copy it, fix the audio / time base)
+        or "encode" (scale and pad the video to the compilation frame; also for a video encoded with other
+        settings, whose SPS/PPS would not match the other segments').
+        """
+        video, audio = info["video"], info["audio"]
+        fields = ("codec", "profile", "pix_fmt", "width", "height", "fps", "params")
+        if not video or not video["params"] or any(video[k] != self.format["video"][k] for k in fields):
+            return "encode"
+        if video["timescale"] != self.format["video"]["timescale"] or audio != self.format["audio"]:
+            return "remux"
+        return "copy"
+
+    def normalize(self, path: str, tmp_dir: str) -> tuple:
+        """(segment path, plan) for one short: the short itself, or a cached normalized copy of it."""
+        info = self.probe(path)
+        plan = self.plan(info)
+        if plan == "copy":
+            return path, plan
+        st = os.stat(path)
+        key = make_key(kind="compilation_clip", src=os.path.abspath(path), size=st.st_size, mtime=st.st_mtime,
+                       plan=plan, format=self.format, codec=self._codec_key())
+        w, h = self.width, self.height
+
+        def build(out):
+            args = ['-i', path]
+            if info["audio"]:
+                args += ['-map', '0:v:0', '-map', '0:a:0']
+            else:  # silent track as long as the video, so every segment has the same streams
+                args += ['-f', 'lavfi', '-t', f'{info["duration"]:.3f}', '-i', f'anullsrc=r={AUDIO_RATE}:cl=stereo',
+                         '-map', '0:v:0', '-map', '1:a:0']
+            if plan == "encode":
+                bg = "0x%02x%02x%02x" % self.BG_COLOR
+                args += ['-vf', f'scale={w}:{h}:force_original_aspect_ratio=decrease,'
+                                f'pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:color={bg},setsar=0,fps={FPS}',  # no SAR, like the cards
+                         *x264_args(self.profile)]
+            else:
+                args += ['-c:v', 'copy']
+            args += ['-c:a', 'aac', '-ar', AUDIO_RATE, '-ac', AUDIO_CHANNELS,
+                     '-video_track_timescale', self.format["video"]["timescale"], out]
+            run_ffmpeg(args)
+        return self._cached("compilation_clip", key, build, tmp_dir), plan
+
+    def build(self, clips: list, title: str, out_path: str | None = None) -> dict:
+        """
+        Join clips ([{"video", "topic"}], in playing order) into one compilation, counting down from #len(clips).
+        :return: {"video", "duration", "clips", "copied", "remuxed", "encoded"}
+        """
+        out_path = out_path or os.path.join(OUTPUT_DIR, "compilations",
+                                            f"compilation_{timestamp_now()}_{uuid.uuid4().hex[:8]}.mp4")
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        counts = {"copy": 0, "remux": 0, "encode": 0}
+        start = time.perf_counter()
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=OUTPUT_DIR) as tmp:
+            intro = self.card(title, max(self.card_seconds, 1.0) * 2, tmp)
+            self.format = self.probe(intro)
+            segments = [intro]
+            for i, clip in enumerate(clips):
+                if self.card_seconds > 0:
+                    segments.append(self.card(f"#{len(clips) - i}", self.card_seconds, tmp))
+                segment, plan = self.normalize(clip["video"], tmp)
+                segments.append(segment)
+                counts[plan] += 1
+            concat_segments(segments, out_path, segment_audio=True)
+        result = {"video": out_path, "duration": round(probe_streams(out_path)["duration"], 2), "clips": len(clips),
+                  "copied": counts["copy"], "remuxed": counts["remux"], "encoded": counts["encode"]}
+        logger.info(f"Compilation {out_path}: {result} in {time.perf_counter() - start:.1f}s")
+        if self.cache:
+            logger.info(f"Render cache: {self.cache.stats()}")
+        return result
+
+
+def recent_shorts(count: int, days: int = COMPILATION_DAYS) -> list:
+    """The `count` most recently rendered shorts (of finished jobs) still on disk, oldest first."""
+    from utils.job_journal import JobJournal
+    outputs = JobJournal().step_outputs("render", since=time.time() - days * 86400)
+    clips = [o for o in outputs if o.get("video") and os.path.isfile(o["video"])][:count]
+    return clips[::-1]
+
+
+def create_compilation(count: int = 50, days: int = COMPILATION_DAYS, title: str | None = None,
+                       out_path: str | None = None) -> dict | None:
+    clips = recent_shorts(count, days)
+    if not clips:
+        logger.warning(f"No rendered shorts from the last {days} days to compile.")
+        return None
+    return CompilationBuilder().build(clips, title or f"Top {len(clips)} facts of the week", out_path)
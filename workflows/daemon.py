@@ -0,0 +1,155 @@
+"""
+AutopilotDaemon — long-lived worker that keeps a DailyAutopilot warm (agents, fonts, music beds,
+YouTube client) and runs jobs dropped into a spool directory, so cron-triggered runs skip cold starts.
+- submit_job() writes a job file atomically into <spool>/incoming (FIFO by file name).
+- The daemon claims a job by renaming it into <spool>/processing (tagged with its pid), so several
+  daemons can share a spool; jobs left behind by a daemon that died are put back on startup.
+- The outcome is written to <spool>/done/<job>.json, or <spool>/failed/<job>.json if the job raised.
+  A job file that can't be parsed is moved to failed/ as it is.
+Job fields: {"mode": "once" | "batch" | "pipelined", "count": 1, "workers": null, "dry_run": true}
+"""
+import json
+import os
+import signal
+import threading
+import time
+import uuid
+from config import SPOOL_DIR, DAEMON_POLL_SECONDS
+from utils.logger import logger
+
+MODES = ("once", "batch", "pipelined")
+
+
+def _write_json(path: str, data: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def submit_job(spool_dir: str = SPOOL_DIR, mode: str = "once", count: int = 1, workers: int | None = None,
+               dry_run: bool | None = None) -> str:
+    """Queue a job for a running daemon; returns the job file path. dry_run=None uses the daemon's setting."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown job mode: {mode} (expected one of {', '.join(MODES)})")
+    incoming = os.path.join(spool_dir, "incoming")
+    os.makedirs(incoming, exist_ok=True)
+    path = os.path.join(incoming, f"{time.time_ns()}_{uuid.uuid4().hex[:8]}.json")
+    _write_json(path, {"mode": mode, "count": count, "workers": workers, "dry_run": dry_run,
+                       "submitted": round(time.time(), 3)})
+    return path
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists but not ours (PermissionError), or can't tell
+    return True
+
+
+class AutopilotDaemon:
+    def __init__(self, autopilot, spool_dir: str = SPOOL_DIR, poll_interval: float = DAEMON_POLL_SECONDS):
+        """
+        :param autopilot: DailyAutopilot kept alive between jobs
+        :param spool_dir: directory holding incoming/, processing/, done/ and failed/
+        :param poll_interval: seconds between scans of incoming/ when idle
+        """
+        self.autopilot = autopilot
+        self.autopilot.keep_batch_pool = True  # batch jobs reuse one pool of warm workers
+        self.spool_dir = spool_dir
+        self.poll_interval = poll_interval
+        self.dirs = {name: os.path.join(spool_dir, name) for name in ("incoming", "processing", "done", "failed")}
+        self._stop = threading.Event()
+
+    def stop(self, *_):
+        """Finish the current job, then exit serve_forever()."""
+        self._stop.set()
+
+    def _recover(self):
+        """Return jobs claimed by daemons that are no longer running to incoming/."""
+        for name in os.listdir(self.dirs["processing"]):
+            if not name.endswith(".json"):
+                continue
+            job_name, _, pid = name[:-len(".json")].rpartition(".pid")
+            if not job_name or not pid.isdigit() or _pid_alive(int(pid)):
+                continue
+            logger.warning(f"Requeueing job {job_name} abandoned by pid {pid}")
+            os.replace(os.path.join(self.dirs["processing"], name), os.path.join(self.dirs["incoming"], job_name + ".json"))
+
+    def _claim(self) -> tuple | None:
+        """Atomically take the oldest incoming job: (job name, path in processing/), or None."""
+        for name in sorted(os.listdir(self.dirs["incoming"])):
+            if not name.endswith(".json"):
+                continue
+            job_name = name[:-len(".json")]
+            claimed = os.path.join(self.dirs["processing"], f"{job_name}.pid{os.getpid()}.json")
+            try:
+                os.rename(os.path.join(self.dirs["incoming"], name), claimed)
+            except FileNotFoundError:
+                continue  # another daemon got it first
+            return job_name, claimed
+        return None
+
+    def run_job(self, job: dict):
+        mode = job.get("mode", "once")
+        count = int(job.get("count") or 1)
+        dry_run = job.get("dry_run")
+        dry_run = not self.autopilot.upload if dry_run is None else bool(dry_run)
+        if mode == "once":
+            return self.autopilot.run_once(dry_run=dry_run)
+        if mode == "batch":
+            return self.autopilot.run_batch(count, workers=job.get("workers"), dry_run=dry_run)
+        if mode == "pipelined":
+            return self.autopilot.run_pipelined(count, render_workers=job.get("workers") or 1, dry_run=dry_run)
+        raise ValueError(f"Unknown job mode: {mode}")
+
+    def process_one(self) -> bool:
+        """Run the oldest pending job, if any. Returns whether a job was run."""
+        claimed = self._claim()
+        if claimed is None:
+            return False
+        job_name, path = claimed
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                job = json.load(f)
+            if not isinstance(job, dict):
+                raise ValueError("job is not a JSON object")
+        except (OSError, ValueError) as e:
+            logger.error(f"Bad job file {job_name}: {e}; moved to {self.dirs['failed']}")
+            os.replace(path, os.path.join(self.dirs["failed"], f"{job_name}.json"))
+            return True
+        logger.info(f"Running job {job_name}: {job}")
+        started = time.time()
+        try:
+            record = {**job, "result": self.run_job(job)}
+            outcome = "done"
+        except Exception as e:
+            logger.error(f"Job {job_name} failed: {e}")
+            record = {**job, "error": str(e)}
+            outcome = "failed"
+        record.update(started=round(started, 3), finished=round(time.time(), 3))
+        _write_json(os.path.join(self.dirs[outcome], f"{job_name}.json"), record)
+        os.remove(path)
+        logger.info(f"Job {job_name} {outcome} in {record['finished'] - record['started']:.1f}s")
+        return True
+
+    def serve_forever(self):
+        for path in self.dirs.values():
+            os.makedirs(path, exist_ok=True)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+        self._recover()
+        start = time.perf_counter()
+        self.autopilot.warm_up()
+        logger.info(f"Daemon ready in {time.perf_counter() - start:.1f}s; watching {self.dirs['incoming']}")
+        try:
+            while not self._stop.is_set():
+                if not self.process_one():
+                    self._stop.wait(self.poll_interval)
+        finally:
+            self.autopilot.close()
+        logger.info("Daemon stopped.")
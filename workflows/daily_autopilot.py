@@ -1,25 +1,169 @@
-from agents.topic_research_agent import TopicResearchAgent
-from agents.script_writer_agent import ScriptWriterAgent
-from agents.video_editing_agent import VideoEditorAgent
-from agents.thumbnail_agent import ThumbnailAgent
-from agents.voiceover_agent import VoiceoverAgent
-from agents.upload_agent import UploadAgent
 from utils.file_manager import ensure_dirs
 from utils.logger import logger
+from utils.metrics import metrics
+from workflows.pipeline import StagedPipeline, Stage, fan_out
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import cached_property
 import os
+import threading
+import time
+from config import VIDEO_DURATION_SECONDS, YOUTUBE_CHANNELS_FILE, RENDER_QUEUE_URL
+
+# Agents (and the heavy libraries behind them: moviepy, PIL, numpy, Google clients) are imported
+# and constructed on first use, so importing this module is cheap and has no side effects.
+
+# Per-process agents, journal and artifact store for batch workers (built once by _init_worker, reused for every item)
+_worker_agents = None
+_worker_journal = None
+_worker_store = None
+
+
+def new_video_agent(parallel: int = 1):
+    """
+    VideoEditorAgent, or a FarmVideoAgent that hands renders to farm workers when RENDER_QUEUE_URL is set.
+    :param parallel: local renders running side by side (they share the host's encoder threads)
+    """
+    if RENDER_QUEUE_URL:
+        from workflows.render_farm import FarmVideoAgent
+        return FarmVideoAgent()
+    from agents.video_editing_agent import VideoEditorAgent
+    return VideoEditorAgent(parallel=parallel)
+
+
+def _init_worker(workers: int):
+    global _worker_agents, _worker_journal, _worker_store
+    from agents.script_writer_agent import ScriptWriterAgent
+    from agents.thumbnail_agent import ThumbnailAgent
+    from agents.voiceover_agent import VoiceoverAgent
+    from utils.job_journal import JobJournal
+    from utils.artifact_store import ArtifactStore
+    _worker_agents = (ScriptWriterAgent(), new_video_agent(parallel=workers), ThumbnailAgent(), VoiceoverAgent())
+    _worker_journal = JobJournal()
+    _worker_store = ArtifactStore()
+
+
+def _render_item(item: dict) -> dict:
+    """Batch worker entry point: script + render + thumbnail for one job item."""
+    script_agent, video_agent, thumb_agent, voice_agent = _worker_agents
+    metrics.records.clear()  # a worker runs one item at a time: what is recorded below belongs to this item
+    try:
+        item = produce_assets(item, script_agent, video_agent, thumb_agent, voice_agent, journal=_worker_journal,
+                              store=_worker_store)
+    except Exception as e:
+        logger.error(f"Render failed for topic '{item['topic']}': {e}")
+        item = {**item, "error": str(e)}
+    # Stage records travel back so the parent's aggregates cover the whole batch
+    return {**item, "metrics": list(metrics.records)}
+
+
+def script_step(item: dict, script_agent, voice_agent) -> dict:
+    """Captions (and optional narration) for item["topic"]."""
+    # Generate script
+    with metrics.stage("script", topic=item["topic"]):
+        script_path = script_agent.write_script(item["topic"])
+        captions = script_agent.read_script_lines(script_path)
+
+    # Generate voice audio (plus seconds per caption, so slides follow the narration)
+    audio_path, durations = None, None
+    try:
+        with metrics.stage("voice", topic=item["topic"]) as rec:
+            audio_path, durations = voice_agent.generate_voice_timed(captions)
+            rec.add_file(audio_path)
+        logger.info(f"Generated audio: {audio_path}")
+    except Exception as e:
+        logger.warning("Voice generation failed, proceeding without audio: %s", e)
+
+    return {**item, "captions": captions, "audio": audio_path, "durations": durations}
+
+
+def render_step(item: dict, video_agent, store=None) -> dict:
+    """Render the short; with an artifact store it is written to staging and filed under the job's name."""
+    with metrics.stage("render", topic=item["topic"]) as rec:
+        out_path = store.staging_path("video", "mp4") if store else None
+        video_path = video_agent.create_video(item["captions"], item["audio"], durations=item.get("durations"),
+                                              out_path=out_path)
+        if store:
+            video_path = store.put(video_path, "video", job_id=item.get("job_id"))
+        rec.add_file(video_path)
+    logger.info(f"Created video: {video_path}")
+    return {**item, "video": str(video_path)}
+
+
+def thumbnail_step(item: dict, thumb_agent, store=None) -> dict:
+    with metrics.stage("thumbnail", topic=item["topic"]) as rec:
+        out_path = store.staging_path("thumbnail", "png") if store else None
+        thumb_path = thumb_agent.create_thumbnail(item["captions"], item["topic"], out_path=out_path)
+        if store:
+            thumb_path = store.put(thumb_path, "thumbnail", job_id=item.get("job_id"))
+        rec.add_file(thumb_path)
+    logger.info(f"Created thumbnail: {thumb_path}")
+    return {**item, "thumbnail": str(thumb_path)}
+
+
+def journaled(journal, name: str, fn):
+    """
+    Wrap a step fn(item) -> item for crash-safe reruns: if the journal has step `name` of the item's job
+    done (with its artifacts intact), its recorded outputs are reused instead of running fn again;
+    otherwise fn runs and its outputs (or error) are recorded.
+    """
+    def run(item: dict) -> dict:
+        job_id = item.get("job_id")
+        if journal is None or job_id is None:
+            return fn(item)
+        done = journal.completed_step(job_id, name)
+        if done is not None:
+            logger.info(f"Job {job_id}: '{name}' already done, reusing its outputs")
+            return {**item, **done}
+        started = time.time()
+        try:
+            out = fn(item)
+        except Exception as e:
+            journal.record_step(job_id, name, started, error=str(e))
+            raise
+        produced = {k: v for k, v in out.items() if k not in item or item[k] != v}
+        journal.record_step(job_id, name, started, outputs=produced, error=produced.get("error"))
+        return out
+    return run
+
+
+def _public(item: dict) -> dict:
+    """Drop intermediate keys (captions, audio, durations, metrics) from a pipeline item."""
+    return {k: v for k, v in item.items() if k not in ("captions", "audio", "durations", "metrics")}
+
+
+def produce_assets(item, script_agent, video_agent, thumb_agent, voice_agent, journal=None, store=None) -> dict:
+    """
+    Run script writing, voice, video and thumbnail for an item ({"topic", "job_id"} or just a topic string).
+    With a journal, steps the item's job already completed are skipped; with an artifact store,
+    the video and thumbnail are filed in it.
+    """
+    if isinstance(item, str):
+        item = {"topic": item}
+    item = journaled(journal, "script", lambda it: script_step(it, script_agent, voice_agent))(item)
+    item = journaled(journal, "render", lambda it: render_step(it, video_agent, store))(item)
+    item = journaled(journal, "thumbnail", lambda it: thumbnail_step(it, thumb_agent, store))(item)
+    return _public(item)
 
-ensure_dirs()  # ensure outputs/videos and outputs/thumbnails exist
 
 class DailyAutopilot:
     def __init__(self, upload=False):
-        self.topic_agent = TopicResearchAgent()
-        self.script_agent = ScriptWriterAgent()
-        self.video_agent = VideoEditorAgent()
-        self.thumb_agent = ThumbnailAgent()
-        self.voice_agent = VoiceoverAgent()
+        ensure_dirs()  # ensure outputs/videos and outputs/thumbnails exist
         self.upload = upload
+        self._queue_resumed = False
+        self._resume_lock = threading.Lock()
+        self._resumed = {}  # absolute video path -> upload finished by _resume_uploads()
+        self.scheduler = None
+        # Long-lived callers (the daemon) keep one batch process pool, with warm workers, across run_batch() calls
+        self.keep_batch_pool = False
+        self._batch_pool = None
 
-        if upload:
+        if upload and os.path.exists(YOUTUBE_CHANNELS_FILE):
+            # Several channels: quota-aware scheduler instead of a single uploader
+            from workflows.upload_scheduler import UploadScheduler
+            self.scheduler = UploadScheduler.from_config(YOUTUBE_CHANNELS_FILE)
+            self.uploader = None
+        elif upload:
             # Use environment variable or fallback to ./client_secret.json
             client_secrets_path = os.environ.get(
                 "YOUTUBE_CLIENT_SECRETS_JSON", "./client_secret.json"
@@ -31,64 +175,290 @@ class DailyAutopilot:
                 self.uploader = None
                 self.upload = False
             else:
+                from agents.upload_agent import UploadAgent
                 self.uploader = UploadAgent(client_secrets_path=client_secrets_path)
         else:
             self.uploader = None
 
+    @cached_property
+    def journal(self):
+        from utils.job_journal import JobJournal
+        return JobJournal()
+
+    @cached_property
+    def store(self):
+        from utils.artifact_store import ArtifactStore
+        return ArtifactStore()
+
+    @cached_property
+    def topic_agent(self):
+        from agents.topic_research_agent import TopicResearchAgent
+        return TopicResearchAgent()
+
+    @cached_property
+    def script_agent(self):
+        from agents.script_writer_agent import ScriptWriterAgent
+        return ScriptWriterAgent()
+
+    @cached_property
+    def video_agent(self):
+        return new_video_agent()
+
+    @cached_property
+    def thumb_agent(self):
+        from agents.thumbnail_agent import ThumbnailAgent
+        return ThumbnailAgent()
+
+    @cached_property
+    def voice_agent(self):
+        from agents.voiceover_agent import VoiceoverAgent
+        return VoiceoverAgent()
+
+    def warm_up(self):
+        """
+        Build every agent and load what they keep warm (fonts, music bed index, YouTube client),
+        so the first job of a long-lived process doesn't pay for it.
+        """
+        from utils.text_layout import get_font
+        for name in ("topic_agent", "script_agent", "video_agent", "thumb_agent", "voice_agent"):
+            getattr(self, name)  # cached_property: constructed once, here
+        video = self.video_agent
+        if hasattr(video, "font_path"):  # a farm client has nothing to preload: its workers keep their own warm
+            try:
+                get_font(video.font_path, video.FONT_SIZE)
+            except OSError as e:
+                logger.warning(f"Could not preload font {video.font_path}: {e}")
+            video.music_beds.beds_for(VIDEO_DURATION_SECONDS)
+        if self.uploader is not None:
+            self.uploader.youtube  # authenticate now rather than mid-job
+        if self.scheduler is not None:
+            self.scheduler.warm_up()
+
+    def next_items(self, n: int) -> list[dict]:
+        """
+        Up to n job items ({"job_id", "topic"}), claimed for this process: unfinished jobs from the journal
+        first (so a crashed or failed run continues where it stopped), then new jobs for freshly selected topics.
+        """
+        items = [{"job_id": job["id"], "topic": job["topic"]} for job in self.journal.claim(limit=n)]
+        for item in items:
+            logger.info(f"Resuming job {item['job_id']}: {item['topic']}")
+        if len(items) < n:
+            with metrics.stage("topic", count=n - len(items)):
+                topics = self.topic_agent.suggest_topics(n - len(items))
+            for topic in topics:
+                logger.info(f"Selected topic: {topic}")
+                items.append({"job_id": self.journal.create(topic), "topic": topic})
+        return items
+
+    def _finish(self, item: dict) -> dict:
+        """Close the item's job in the journal: done if uploaded, else rendered (failed jobs are retried by later runs)."""
+        if item.get("job_id") is not None:
+            self.journal.finish(item["job_id"], error=item.get("error"),
+                                status="done" if item.get("video_id") else "rendered")
+        return item
+
+    def _housekeeping(self):
+        """End of a run: report stage metrics and prune uploaded artifacts above the disk budget."""
+        metrics.flush()
+        try:
+            self.store.gc()
+        except OSError as e:
+            logger.warning(f"Artifact GC failed: {e}")
+
+    def _with_seo(self, items: list) -> list:
+        """Add upload tags and description to items (one keyword-index pass for the whole list, no network)."""
+        from services.seo_service import seo_for_topics
+        todo = [i for i, item in enumerate(items) if "error" not in item and "tags" not in item]
+        for i, seo in zip(todo, seo_for_topics([items[i]["topic"] for i in todo])):
+            items[i] = {**items[i], **seo}
+        return items
+
+    def _publish_step(self, item: dict, dry_run: bool) -> dict:
+        item = self._with_seo([item])[0]
+        if dry_run or not (self.upload and (self.uploader or self.scheduler)):
+            # Nothing is recorded: the upload step stays open and the job ends up "rendered", not "done"
+            logger.info("[Dry run] Skipping upload" if dry_run else "No uploader configured; skipping upload")
+            return item
+        return journaled(self.journal, "upload", self._publish)(item)
+
     def run_once(self, dry_run=True):
-        topic = self.topic_agent.suggest_topic()
-        logger.info(f"Selected topic: {topic}")
+        items = self.next_items(1)
+        if not items:
+            logger.warning("No topic available; skipping this run.")
+            return None
+        item = items[0]
+        try:
+            item = produce_assets(item, self.script_agent, self.video_agent, self.thumb_agent, self.voice_agent,
+                                  journal=self.journal, store=self.store)
+            return self._finish(self._publish_step(item, dry_run))
+        except Exception as e:
+            self._finish({**item, "error": str(e)})
+            raise
+        finally:
+            self._housekeeping()
 
-        # Generate script
-        script_path = self.script_agent.write_script(topic)
-        captions = self.script_agent.read_script_lines(script_path)
+    def _batch_executor(self, workers: int) -> tuple:
+        """
+        (pool, pool size, owned): a new pool of `workers` processes for this batch, or with keep_batch_pool
+        the kept pool (one process per core, started on first use), which close() shuts down.
+        """
+        if not self.keep_batch_pool:
+            return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(workers,)), workers, True
+        if self._batch_pool is None:
+            size = os.cpu_count() or 1
+            self._batch_pool = (ProcessPoolExecutor(max_workers=size, initializer=_init_worker, initargs=(size,)), size)
+        return (*self._batch_pool, False)
+
+    def close(self):
+        """Shut down the kept batch pool, if any."""
+        if self._batch_pool is not None:
+            self._batch_pool[0].shutdown()
+            self._batch_pool = None
+
+    def run_batch(self, n: int, workers: int | None = None, dry_run=True) -> list[dict]:
+        """
+        Render n shorts with distinct topics across a process pool.
+        :param n: number of shorts to produce
+        :param workers: items rendered at once (defaults to the number of CPU cores; at most the kept pool's size)
+        :param dry_run: skip upload
+        :return: one result dict per item, in topic order (failed items carry an "error" key)
+        """
+        items = self.next_items(n)
+        if len(items) < n:
+            logger.warning(f"Only {len(items)} distinct topics available, batch reduced from {n}.")
+        if not items:
+            return []
+        workers = max(1, min(workers or os.cpu_count() or 1, len(items)))
+        pool, size, owned = self._batch_executor(workers)
+        workers = min(workers, size)
+        logger.info(f"Rendering batch of {len(items)} shorts on {workers} workers")
+
+        results = [None] * len(items)
+        todo = iter(range(len(items)))
+        futures = {}
+        broken = []
+
+        def submit():
+            # At most `workers` items in flight, also when the kept pool has more processes
+            for i in todo:
+                try:
+                    futures[pool.submit(_render_item, items[i])] = i
+                    return
+                except BrokenProcessPool as e:
+                    broken.append(e)
+                    results[i] = {**items[i], "error": str(e)}
 
-        # Generate voice audio
-        audio_path = None
         try:
-            audio_path = self.voice_agent.generate_voice(script_path)
-            logger.info(f"Generated audio: {audio_path}")
+            for _ in range(workers):
+                submit()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i = futures.pop(fut)
+                    try:
+                        results[i] = fut.result()
+                    except Exception as e:
+                        # Worker process died (e.g. OOM in ffmpeg)
+                        if isinstance(e, BrokenProcessPool):
+                            broken.append(e)
+                        logger.error(f"Batch item {i} failed: {e}")
+                        results[i] = {**items[i], "error": str(e)}
+                    for rec in results[i].get("metrics", []):
+                        metrics.observe(rec, write=False)  # the worker already wrote it to the JSON-lines file
+                    submit()
+        finally:
+            if owned:
+                pool.shutdown()
+            elif broken:
+                # A dead worker breaks the whole pool: start a fresh one for the next batch
+                self.close()
+
+        # Uploads stay in this process: a single authenticated client, one item at a time
+        try:
+            results = self._with_seo([_public(item) for item in results])
+            publish = lambda item: self._finish(item if "error" in item else self._publish_step(item, dry_run))
+            if self.scheduler is not None and not dry_run:
+                # Several channels: upload concurrently, the scheduler caps each channel's parallelism
+                self._resume_uploads()
+                with ThreadPoolExecutor(max_workers=self.scheduler.max_parallel) as pool:
+                    return list(pool.map(publish, results))
+            return [publish(item) for item in results]
+        finally:
+            self._housekeeping()
+
+    def run_pipelined(self, n: int, render_workers: int = 1, queue_size: int = 2, dry_run=True) -> list[dict]:
+        """
+        Produce n shorts through a staged pipeline (topic -> script -> render + thumbnail -> upload)
+        with bounded queues between stages: an item's thumbnail is drawn while its video renders,
+        and the script of item k+1 and the upload of item k-1 run alongside.
+        Per-stage stats are logged and kept in self.last_pipeline_stats.
+        """
+        def topics():
+            yield from self.next_items(n)
+
+        journal = self.journal
+        pipeline = StagedPipeline([
+            Stage("script", journaled(journal, "script", lambda item: script_step(item, self.script_agent, self.voice_agent))),
+            Stage("render+thumbnail", fan_out(
+                journaled(journal, "render", lambda item: render_step(item, self.video_agent, self.store)),
+                journaled(journal, "thumbnail", lambda item: thumbnail_step(item, self.thumb_agent, self.store)),
+            ), workers=render_workers),
+            Stage("upload", lambda item: self._publish_step(_public(item), dry_run),
+                  workers=self.scheduler.max_parallel if self.scheduler is not None else 1),
+        ], queue_size=queue_size)
+        results = [self._finish(item) for item in pipeline.run(topics(), source_name="topic")]
+        self.last_pipeline_stats = pipeline.stats()
+        logger.info(f"Pipeline stats: {self.last_pipeline_stats}")
+        self._housekeeping()
+        return [_public(item) for item in results]
+
+    def _resume_uploads(self):
+        """
+        Finish uploads interrupted by an earlier run before adding new ones (once per process), and close
+        their jobs: the upload step is recorded, the job marked done and its artifacts marked uploaded.
+        """
+        with self._resume_lock:
+            if self._queue_resumed:
+                return
+            self._queue_resumed = True
+            with metrics.stage("upload_resume"):
+                finished = (self.scheduler or self.uploader).resume_pending()
+            for up in finished:
+                self._resumed[os.path.abspath(up["video_path"])] = up
+                self.store.mark_uploaded(up["video_path"], up.get("thumbnail_path"))
+                job = self.journal.job(up["job_id"]) if up.get("job_id") is not None else None
+                if job is None:
+                    continue
+                outputs = {k: up[k] for k in ("video_id", "channel", "publish_at") if up.get(k) is not None}
+                self.journal.record_step(job["id"], "upload", time.time(), outputs=outputs)
+                self.journal.finish(job["id"])
+                self.topic_agent.mark_published(job["topic"])
+                logger.info(f"Job {job['id']}: interrupted upload finished as video {up['video_id']}")
+
+    def _publish(self, item: dict) -> dict:
+        """Upload the item through the uploader or the multi-channel scheduler."""
+        self._resume_uploads()
+        resumed = self._resumed.get(os.path.abspath(item["video"]))
+        if resumed is not None:
+            # Finished by _resume_uploads(): don't upload it again
+            return {**item, **{k: resumed[k] for k in ("video_id", "channel", "publish_at") if resumed.get(k)}}
+        try:
+            with metrics.stage("upload", topic=item["topic"]):
+                if self.scheduler is not None:
+                    item = self.scheduler.upload_item(item)
+                    video_id = item.get("video_id")
+                else:
+                    video_id = self.uploader.upload_video(
+                        item["video"], item["thumbnail"], title=item["topic"],
+                        description=item.get("description", ""), tags=item.get("tags"), job_id=item.get("job_id"),
+                    )
+            if video_id is None:
+                # Left in the upload queue (transient failure, no client or no quota); a later run resumes it
+                return {"error": "upload did not complete", **item}
+            logger.info(f"Uploaded video id: {video_id}")
+            self.store.mark_uploaded(item["video"], item.get("thumbnail"))
+            self.topic_agent.mark_published(item["topic"])
+            return {**item, "video_id": video_id}
         except Exception as e:
-            logger.warning("Voice generation failed, proceeding without audio: %s", e)
-
-        # Create video
-        video_path = self.video_agent.create_video(captions, audio_path)
-        logger.info(f"Created video: {video_path}")
-
-        # Create thumbnail
-        thumb_path = self.thumb_agent.create_thumbnail(captions, topic)
-        logger.info(f"Created thumbnail: {thumb_path}")
-
-        # Dry run: skip upload
-        if dry_run:
-            logger.info("[Dry run] Skipping upload")
-            return {
-                "topic": topic,
-                "video": str(video_path),
-                "thumbnail": str(thumb_path),
-            }
-
-        # Upload if enabled and uploader is available
-        if self.upload and self.uploader:
-            try:
-                video_id = self.uploader.upload_video(
-                    str(video_path), str(thumb_path), title=topic
-                )
-                logger.info(f"Uploaded video id: {video_id}")
-                return {
-                    "topic": topic,
-                    "video": str(video_path),
-                    "thumbnail": str(thumb_path),
-                    "video_id": video_id,
-                }
-            except Exception as e:
-                logger.error(f"Video upload failed: {e}")
-                return {
-                    "topic": topic,
-                    "video": str(video_path),
-                    "thumbnail": str(thumb_path),
-                    "error": str(e),
-                }
-
-        # Fallback return if no upload
-        return {"topic": topic, "video": str(video_path), "thumbnail": str(thumb_path)}
+            logger.error(f"Video upload failed: {e}")
+            return {**item, "error": str(e)}
@@ -0,0 +1,185 @@
+"""
+StagedPipeline — runs per-item work through a chain of stages connected by bounded queues.
+- Every stage has its own worker thread(s), so item k can be uploading while item k+1 renders.
+- Bounded queues apply back-pressure: a fast stage can't run more than `queue_size` items ahead.
+- A failing item is marked with "error"/"failed_stage" and passed through without running later stages.
+- A failing source stops the feed; items already fed still finish, and the error is kept in source_error.
+- fan_out() builds a stage fn that runs independent steps of one item concurrently (e.g. render + thumbnail).
+- stats() reports per-stage items processed, busy time, utilization and current/max queue depth.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import logger
+
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name: str, fn, workers: int = 1):
+        """
+        :param name: stage name used in logs and stats
+        :param fn: callable(item: dict) -> dict
+        :param workers: number of threads running this stage
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.inbox = None
+        self._lock = threading.Lock()
+
+    def _record(self, seconds: float, failed: bool):
+        with self._lock:
+            self.busy_seconds += seconds
+            self.processed += 1
+            if failed:
+                self.failed += 1
+
+    def _note_depth(self):
+        depth = self.inbox.qsize()
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+
+def fan_out(*fns):
+    """
+    Stage fn running several independent fn(item) -> item concurrently on the same item and merging their
+    outputs. If any of them raises, the first error (in argument order) is raised once all have finished.
+    """
+    def run(item: dict) -> dict:
+        with ThreadPoolExecutor(max_workers=len(fns)) as pool:
+            futures = [pool.submit(fn, item) for fn in fns]
+        merged = dict(item)
+        for fut in futures:
+            merged.update(fut.result())
+        return merged
+    return run
+
+
+class StagedPipeline:
+    def __init__(self, stages: list, queue_size: int = 2):
+        """
+        :param stages: Stage objects in execution order
+        :param queue_size: capacity of the queue in front of each stage
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+        self.source_name = "source"
+        self.source_busy_seconds = 0.0
+        self.source_error = None
+        self._started = None
+        self._finished = None
+
+    def run(self, source, source_name: str = "source") -> list:
+        """
+        Feed items from `source` (any iterable of dicts, consumed lazily) through all stages.
+        Time spent pulling from the source is reported as its own stage.
+        :return: the output items in source order
+        """
+        self.source_name = source_name
+        self.source_busy_seconds = 0.0
+        self.source_error = None
+        for stage in self.stages:
+            stage.inbox = queue.Queue(maxsize=self.queue_size)
+        outbox = queue.Queue()
+        self._started = time.perf_counter()
+
+        threads = []
+        for i, stage in enumerate(self.stages):
+            next_stage = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            remaining = [stage.workers]  # shared countdown so only the last worker forwards _DONE
+            for w in range(stage.workers):
+                t = threading.Thread(target=self._work, args=(stage, next_stage, outbox, remaining),
+                                     name=f"pipeline-{stage.name}-{w}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        # The source runs on this thread; put() blocks when the first stage is saturated.
+        first = self.stages[0].inbox if self.stages else outbox
+        index = 0
+        try:
+            it = iter(source)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                self.source_busy_seconds += time.perf_counter() - start
+                first.put((index, item))
+                if self.stages:
+                    self.stages[0]._note_depth()
+                index += 1
+        except Exception as e:
+            # Stop feeding, but let the items already fed finish (the stages still get _DONE below)
+            logger.error(f"Pipeline source '{source_name}' failed after {index} items: {e}")
+            self.source_error = str(e)
+        finally:
+            first.put(_DONE)
+
+        results = {}
+        while True:
+            entry = outbox.get()
+            if entry is _DONE:
+                break
+            results[entry[0]] = entry[1]
+        for t in threads:
+            t.join()
+        self._finished = time.perf_counter()
+        return [results[i] for i in sorted(results)]
+
+    def _work(self, stage: Stage, next_stage: Stage | None, outbox: queue.Queue, remaining: list):
+        downstream = next_stage.inbox if next_stage else outbox
+        while True:
+            entry = stage.inbox.get()
+            if entry is _DONE:
+                with stage._lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    downstream.put(_DONE)
+                else:
+                    stage.inbox.put(_DONE)  # let sibling workers see it too
+                return
+            index, item = entry
+            if "error" in item:
+                downstream.put((index, item))
+                continue
+            start = time.perf_counter()
+            failed = False
+            try:
+                item = stage.fn(item)
+            except Exception as e:
+                logger.error(f"Pipeline stage '{stage.name}' failed for item {index}: {e}")
+                item = {**item, "error": str(e), "failed_stage": stage.name}
+                failed = True
+            stage._record(time.perf_counter() - start, failed)
+            downstream.put((index, item))
+            if next_stage:
+                next_stage._note_depth()
+
+    def stats(self) -> dict:
+        """Per-stage processed/failed counts, busy seconds, utilization and queue depths."""
+        end = self._finished or time.perf_counter()
+        wall = (end - self._started) if self._started else 0.0
+        source = {"busy_seconds": round(self.source_busy_seconds, 3)}
+        if self.source_error:
+            source["error"] = self.source_error
+        out = {"wall_seconds": round(wall, 3), "stages": {self.source_name: source}}
+        for stage in self.stages:
+            capacity = wall * stage.workers
+            out["stages"][stage.name] = {
+                "workers": stage.workers,
+                "processed": stage.processed,
+                "failed": stage.failed,
+                "busy_seconds": round(stage.busy_seconds, 3),
+                "utilization": round(stage.busy_seconds / capacity, 3) if capacity else 0.0,
+                "queue_depth": stage.inbox.qsize() if stage.inbox else 0,
+                "max_queue_depth": stage.max_queue_depth,
+            }
+        return out
@@ -0,0 +1,227 @@
+"""
+Render farm — spreads VideoEditorAgent.create_video work over worker processes.
+- FarmVideoAgent (coordinator side) is a drop-in for VideoEditorAgent: create_video() stages the audio in
+  the farm directory, enqueues a job (captions, durations, audio ref, encoder profile, effects)
+  and waits for a worker to push the finished video back, then moves it to the requested path and
+  deletes the staged audio.
+- RenderWorker leases jobs, renders them with a local VideoEditorAgent (one per profile/effects combination,
+  kept warm), heartbeats while rendering, and copies the video into <farm dir>/results with an atomic rename.
+- Expired leases (a worker died or hung) are requeued by whoever polls the queue next.
+- Files a crashed coordinator or worker leaves in the farm directory are deleted by sweep_farm() (run by
+  idle workers) once they are RENDER_FARM_RETENTION_SECONDS old and no pending job needs them.
+The queue (RENDER_QUEUE_URL) and RENDER_FARM_DIR must be reachable from every worker: one host with the
+sqlite:// backend, or a shared mount on every machine with dir:// (see utils/render_queue.py).
+"""
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from config import (RENDER_QUEUE_URL, RENDER_FARM_DIR, RENDER_LEASE_SECONDS, RENDER_MAX_ATTEMPTS,
+                    RENDER_FARM_RETENTION_SECONDS, CAPTION_EFFECTS, ENCODER_PROFILE, OUTPUT_DIR)
+from utils.logger import logger
+from utils.render_queue import open_render_queue
+
+POLL_SECONDS = 0.5
+SWEEP_SECONDS = 600  # how often an idle worker looks for orphaned farm files
+
+
+def _copy_atomic(src: str, dest: str):
+    """Copy (or move, for a temp file we own) src to dest so that dest appears complete or not at all."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{socket.gethostname()}.{os.getpid()}.tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+def sweep_farm(queue, farm_dir: str, max_age: float = RENDER_FARM_RETENTION_SECONDS) -> int:
+    """
+    Delete inputs, results and leftover temp files older than max_age seconds that no queued or leased
+    job still needs (their coordinator or worker crashed before cleaning up). Returns the number removed.
+    """
+    keep = {os.path.abspath(job["payload"]["audio"]) for job in queue.active() if job["payload"].get("audio")}
+    cutoff = time.time() - max_age
+    removed = 0
+    for sub in ("inputs", "results"):
+        try:
+            entries = list(os.scandir(os.path.join(farm_dir, sub)))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff and os.path.abspath(entry.path) not in keep:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass  # taken or removed by another process meanwhile
+    if removed:
+        logger.info(f"Removed {removed} orphaned files from {farm_dir}")
+    return removed
+
+
+class FarmVideoAgent:
+    def __init__(self, queue=None, farm_dir: str = RENDER_FARM_DIR, effects=CAPTION_EFFECTS,
+                 profile: str = ENCODER_PROFILE, timeout: float | None = None):
+        """
+        :param queue: RenderQueue (default: open_render_queue(RENDER_QUEUE_URL))
+        :param farm_dir: shared directory for job inputs (audio) and results (videos)
+        :param effects: caption effects the workers should render
+        :param profile: encoder profile name the workers should use
+        :param timeout: seconds to wait for a job before giving up (None: wait as long as it takes)
+        """
+        self.queue = queue or open_render_queue(RENDER_QUEUE_URL, max_attempts=RENDER_MAX_ATTEMPTS)
+        self.farm_dir = farm_dir
+        self.effects = effects
+        self.profile = profile
+        self.timeout = timeout
+
+    def _stage_input(self, path: str | None) -> str | None:
+        """Copy an input file into the farm's inputs dir under a name of its own (deleted with its job)."""
+        if not path or not os.path.exists(path):
+            return None
+        dest = os.path.join(self.farm_dir, "inputs", uuid.uuid4().hex + os.path.splitext(path)[1])
+        _copy_atomic(path, dest)
+        return dest
+
+    def submit(self, captions: list, audio_path: str | None = None, durations: list | None = None) -> int:
+        effects = self.effects if isinstance(self.effects, str) else ",".join(self.effects)
+        return self.queue.enqueue({"captions": captions, "durations": durations, "audio": self._stage_input(audio_path),
+                                   "profile": self.profile, "effects": effects})
+
+    def wait(self, job_id: int) -> dict:
+        """Block until the job is done (returns its result) or failed (raises RuntimeError)."""
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        while True:
+            job = self.queue.get(job_id)
+            if job["status"] == "done":
+                return job["result"]
+            if job["status"] == "failed":
+                raise RuntimeError(f"Render job {job_id} failed after {job['attempts']} attempts: {job['error']}")
+            if deadline and time.monotonic() > deadline:
+                raise TimeoutError(f"Render job {job_id} not finished after {self.timeout}s")
+            self.queue.requeue_expired()
+            time.sleep(POLL_SECONDS)
+
+    def create_video(self, captions: list, audio_path: str | None = None, durations: list | None = None,
+                     out_path: str | None = None) -> str:
+        """Same contract as VideoEditorAgent.create_video, rendered by a farm worker."""
+        job_id = self.submit(captions, audio_path, durations)
+        logger.info(f"Queued render job {job_id} ({len(captions)} captions)")
+        try:
+            result = self.wait(job_id)
+        finally:
+            job = self.queue.get(job_id)
+            if job["status"] in ("done", "failed") and job["payload"].get("audio"):
+                try:
+                    os.remove(job["payload"]["audio"])
+                except FileNotFoundError:
+                    pass
+        out_path = out_path or os.path.join(OUTPUT_DIR, "videos", os.path.basename(result["video"]))
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        shutil.move(result["video"], out_path)
+        logger.info(f"Render job {job_id} done by {result['worker']} in {result['seconds']}s")
+        return out_path
+
+
+class RenderWorker:
+    def __init__(self, queue=None, farm_dir: str = RENDER_FARM_DIR, lease_seconds: float = RENDER_LEASE_SECONDS,
+                 worker_id: str | None = None, agent_factory=None):
+        """
+        :param queue: RenderQueue (default: open_render_queue(RENDER_QUEUE_URL))
+        :param farm_dir: shared directory results are pushed to
+        :param lease_seconds: lease length; renewed every lease_seconds / 3 while rendering
+        :param worker_id: name in the queue's worker table (default: host-pid)
+        :param agent_factory: callable(profile, effects) -> video agent (default: VideoEditorAgent)
+        """
+        self.queue = queue or open_render_queue(RENDER_QUEUE_URL, max_attempts=RENDER_MAX_ATTEMPTS)
+        self.farm_dir = farm_dir
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.agent_factory = agent_factory
+        self._agents = {}
+        self._stop = threading.Event()
+
+    def stop(self, *_):
+        """Finish the current job, then exit serve_forever()."""
+        self._stop.set()
+
+    def _agent(self, profile: str, effects: str):
+        key = (profile, effects)
+        if key not in self._agents:
+            if self.agent_factory:
+                self._agents[key] = self.agent_factory(profile, effects)
+            else:
+                from agents.video_editing_agent import VideoEditorAgent
+                self._agents[key] = VideoEditorAgent(effects=effects, profile=profile)
+        return self._agents[key]
+
+    def _heartbeat(self, job_id: int, done: threading.Event):
+        while not done.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                logger.warning(f"Lost the lease on render job {job_id}")
+                return
+
+    def run_job(self, job: dict) -> dict:
+        """Render one leased job and push the video to the farm's results dir."""
+        payload = job["payload"]
+        agent = self._agent(payload.get("profile") or ENCODER_PROFILE, payload.get("effects") or "")
+        with tempfile.TemporaryDirectory(prefix="render_") as tmp:
+            local = agent.create_video(payload["captions"], payload.get("audio"), durations=payload.get("durations"),
+                                       out_path=os.path.join(tmp, "video.mp4"))
+            dest = os.path.join(self.farm_dir, "results", f"job{job['id']}_{self.worker_id}.mp4")
+            _copy_atomic(local, dest)
+        return {"video": dest}
+
+    def process_one(self) -> bool:
+        """Lease and run one job, if any is queued. Returns whether a job was run."""
+        self.queue.requeue_expired()
+        job = self.queue.lease(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+        logger.info(f"Worker {self.worker_id} leased render job {job['id']} (attempt {job['attempts']})")
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job["id"], done), daemon=True)
+        beat.start()
+        start = time.perf_counter()
+        try:
+            result = self.run_job(job)
+        except Exception as e:
+            done.set()
+            logger.error(f"Render job {job['id']} failed on {self.worker_id}: {e}")
+            self.queue.fail(job["id"], self.worker_id, str(e), time.perf_counter() - start)
+            return True
+        finally:
+            done.set()
+            beat.join()
+        seconds = round(time.perf_counter() - start, 2)
+        if not self.queue.complete(job["id"], self.worker_id, {**result, "worker": self.worker_id, "seconds": seconds},
+                                   seconds):
+            logger.warning(f"Render job {job['id']} was reassigned while rendering; discarding the result")
+            os.remove(result["video"])
+        return True
+
+    def serve_forever(self, max_jobs: int | None = None, idle_exit: float | None = None):
+        """
+        Process jobs until stop() (or SIGINT/SIGTERM), max_jobs jobs, or idle_exit seconds without work.
+        """
+        import signal
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+        self.queue.register_worker(self.worker_id, socket.gethostname(), os.getpid())
+        logger.info(f"Render worker {self.worker_id} ready")
+        jobs, idle_since, swept = 0, time.monotonic(), None
+        while not self._stop.is_set() and (max_jobs is None or jobs < max_jobs):
+            if self.process_one():
+                jobs += 1
+                idle_since = time.monotonic()
+            elif idle_exit is not None and time.monotonic() - idle_since > idle_exit:
+                break
+            else:
+                if swept is None or time.monotonic() - swept > SWEEP_SECONDS:
+                    sweep_farm(self.queue, self.farm_dir)
+                    swept = time.monotonic()
+                self._stop.wait(POLL_SECONDS)
+        logger.info(f"Render worker {self.worker_id} stopped after {jobs} jobs")
@@ -0,0 +1,237 @@
+"""
+UploadScheduler — spreads uploads over several YouTube channels within each channel's daily API quota.
+- Channels are listed in YOUTUBE_CHANNELS_FILE:
+  [{"name": "main", "client_secrets": "client_secret.json", "credentials": "credentials/main.pkl",
+    "daily_quota": 10000, "max_concurrent": 2, "publish_slots": ["09:00", "18:00"]}]
+- Each channel keeps a pool of warm UploadAgents (one API client per concurrent upload, since the
+  Google client is not thread-safe) and its own resumable-upload queue.
+- upload_item() picks the channel whose next free publish slot is earliest (then the one with the most
+  quota left), reserves the quota units in the QuotaLedger, books the slot (the video goes up private
+  with publishAt) and uploads, waiting while that channel already runs max_concurrent uploads.
+- Channels without publish_slots publish immediately. Items no channel can afford today come back
+  with an "error" and are picked up again by a later run.
+- An item whose upload was interrupted is resumed on the channel whose queue holds it (same session,
+  same slot), never started again on another channel. Its queue entry records the quota day its units were
+  reserved on; resuming it on a later day (also through resume_pending()) reserves them again.
+- Units reserved for an upload that never reached the API (no client, unreadable file) are refunded,
+  as are units reserved for a slot another process booked first (the next free slot is tried instead).
+"""
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from config import YOUTUBE_CHANNELS_FILE, UPLOAD_QUEUE_PATH, PUBLISH_LEAD_MINUTES
+from utils.logger import logger
+from utils.quota_ledger import QuotaLedger, VIDEO_INSERT_UNITS, THUMBNAIL_SET_UNITS, quota_day
+from utils.upload_queue import UploadQueue
+
+
+def rfc3339(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Channel:
+    def __init__(self, name: str, client_secrets: str | None = None, credentials: str | None = None,
+                 daily_quota: int = 10000, max_concurrent: int = 1, publish_slots=(), youtube=None,
+                 agent_factory=None):
+        """
+        :param name: channel key (ledger entry and upload queue file)
+        :param client_secrets: OAuth client secrets for the channel
+        :param credentials: pickled OAuth credentials of the channel
+        :param daily_quota: API units per quota day
+        :param max_concurrent: uploads running at once on this channel
+        :param publish_slots: local "HH:MM" times to publish at (empty: publish on upload)
+        :param youtube: ready-made API client shared by the channel's agents (e.g. a fake in tests)
+        :param agent_factory: callable(channel) -> uploader with upload_video()/resume_pending(),
+                              replacing UploadAgent
+        """
+        self.name = name
+        self.client_secrets = client_secrets
+        self.credentials = credentials
+        self.daily_quota = daily_quota
+        self.max_concurrent = max(1, max_concurrent)
+        self.publish_slots = sorted(publish_slots)
+        self.youtube = youtube
+        self.agent_factory = agent_factory
+        base, ext = os.path.splitext(UPLOAD_QUEUE_PATH)
+        self.queue = UploadQueue(f"{base}_{name}{ext}")
+        self._idle = queue.LifoQueue()  # warm agents not currently uploading
+        self._running = threading.Semaphore(self.max_concurrent)
+
+    def _new_agent(self):
+        if self.agent_factory:
+            return self.agent_factory(self)
+        from agents.upload_agent import UploadAgent
+        return UploadAgent(client_secrets_path=self.client_secrets,
+                           credentials_path=self.credentials or f"./youtube_credentials_{self.name}.pkl",
+                           youtube=self.youtube, queue=self.queue)
+
+    @contextmanager
+    def agent(self):
+        """An idle warm agent (or a new one), once fewer than max_concurrent uploads are running."""
+        with self._running:
+            try:
+                agent = self._idle.get_nowait()
+            except queue.Empty:
+                agent = self._new_agent()
+            try:
+                yield agent
+            finally:
+                self._idle.put(agent)
+
+    def next_slot(self, booked: list, now: float, lead_seconds: float) -> float | None:
+        """Earliest publish slot at least lead_seconds away that is not booked yet (None: no slots configured)."""
+        if not self.publish_slots:
+            return None
+        today = datetime.fromtimestamp(now).date()
+        for offset in range(366):
+            day = today + timedelta(days=offset)
+            for hhmm in self.publish_slots:
+                hour, minute = map(int, hhmm.split(":"))
+                when = datetime(day.year, day.month, day.day, hour, minute).timestamp()
+                if when >= now + lead_seconds and when not in booked:
+                    return when
+        return None
+
+
+class UploadScheduler:
+    def __init__(self, channels: list, ledger: QuotaLedger | None = None, lead_minutes: float = PUBLISH_LEAD_MINUTES):
+        """
+        :param channels: Channel objects to upload to
+        :param ledger: quota / slot bookkeeping (persisted; defaults to UPLOAD_QUOTA_STATE)
+        :param lead_minutes: minimum time between an upload and its publish slot
+        """
+        if not channels:
+            raise ValueError("UploadScheduler needs at least one channel")
+        self.channels = channels
+        self.ledger = ledger or QuotaLedger()
+        self.lead_seconds = lead_minutes * 60
+        self.max_parallel = sum(c.max_concurrent for c in channels)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, path: str = YOUTUBE_CHANNELS_FILE, **kwargs) -> "UploadScheduler":
+        with open(path, "r", encoding="utf-8") as f:
+            specs = json.load(f)
+        channels = [Channel(s["name"], client_secrets=s.get("client_secrets"), credentials=s.get("credentials"),
+                            daily_quota=int(s.get("daily_quota", 10000)), max_concurrent=int(s.get("max_concurrent", 1)),
+                            publish_slots=s.get("publish_slots", ())) for s in specs]
+        return cls(channels, **kwargs)
+
+    def warm_up(self):
+        """Build and authenticate one client per channel ahead of the first upload."""
+        for channel in self.channels:
+            with channel.agent() as agent:
+                getattr(agent, "youtube", None)
+
+    def resume_pending(self) -> list:
+        """
+        Finish interrupted uploads, each on the channel whose queue holds it.
+        :return: UploadAgent.resume_pending() results, each with its "channel"
+        """
+        uploaded = []
+        for channel in self.channels:
+            with channel.agent() as agent:
+                accept = lambda entry, channel=channel: self._charge_resume(channel, entry)
+                uploaded += [{**up, "channel": channel.name} for up in agent.resume_pending(accept=accept)]
+        return uploaded
+
+    def _charge_resume(self, channel: Channel, entry: dict) -> bool:
+        """Make sure a queued upload has units reserved today before it is resumed; False if the channel is out."""
+        today = quota_day(self.ledger.clock())
+        if entry.get("quota_day") == today:
+            return True
+        units = entry.get("units") or VIDEO_INSERT_UNITS + (THUMBNAIL_SET_UNITS if entry.get("thumbnail_path") else 0)
+        if not self.ledger.reserve(channel.name, units, channel.daily_quota):
+            logger.warning(f"Channel {channel.name} has no quota left today to resume {entry['video_path']}")
+            return False
+        channel.queue.put(entry["video_path"], quota_day=today, units=units)
+        return True
+
+    def _assign(self, units: int) -> tuple:
+        """(channel, publish time or None) with the units reserved and the slot booked, or (None, None)."""
+        now = time.time()
+        with self._lock:
+            while True:
+                options = []
+                for channel in self.channels:
+                    if self.ledger.remaining(channel.name, channel.daily_quota) < units:
+                        continue
+                    slot = channel.next_slot(self.ledger.booked_slots(channel.name), now, self.lead_seconds)
+                    if channel.publish_slots and slot is None:
+                        continue
+                    remaining = self.ledger.remaining(channel.name, channel.daily_quota)
+                    options.append((slot if slot is not None else now, -remaining, channel.name, channel, slot))
+                lost_slot = False
+                for _, _, _, channel, slot in sorted(options, key=lambda o: o[:3]):
+                    if not self.ledger.reserve(channel.name, units, channel.daily_quota):
+                        continue
+                    if slot is None or self.ledger.book_slot(channel.name, slot):
+                        return channel, slot
+                    # Another process booked this slot since booked_slots() was read: undo and look again
+                    self.ledger.refund(channel.name, units)
+                    logger.info(f"Publish slot {rfc3339(slot)} on channel {channel.name} was just taken; retrying")
+                    lost_slot = True
+                    break
+                if not lost_slot:
+                    return None, None
+
+    def upload_item(self, item: dict) -> dict:
+        """Upload one item on the best channel; returns it with "video_id", "channel" and "publish_at" (or "error")."""
+        channel, entry = next(((c, e) for c in self.channels if (e := c.queue.get(item["video"]))), (None, None))
+        if entry is not None:
+            # Interrupted earlier: continue on the same channel with the slot booked back then
+            if not self._charge_resume(channel, entry):
+                return {**item, "channel": channel.name, "error": "upload deferred: daily quota exhausted"}
+            slot, units, publish_at = None, None, entry.get("publish_at")
+            logger.info(f"Resuming upload of {item['video']} on channel {channel.name}")
+        else:
+            units = VIDEO_INSERT_UNITS + (THUMBNAIL_SET_UNITS if item.get("thumbnail") else 0)
+            channel, slot = self._assign(units)
+            if channel is None:
+                logger.warning(f"No channel has {units} quota units left today; deferring upload of {item['video']}")
+                return {**item, "error": "upload deferred: daily quota exhausted on all channels"}
+            publish_at = rfc3339(slot) if slot is not None else None
+            logger.info(f"Uploading {item['video']} to channel {channel.name}"
+                        + (f" (publishing at {publish_at})" if publish_at else ""))
+            channel.queue.put(item["video"], quota_day=quota_day(self.ledger.clock()), units=units)
+        try:
+            with channel.agent() as agent:
+                if getattr(agent, "youtube", True) is None:
+                    raise RuntimeError(f"no YouTube client for channel {channel.name}")
+                video_id = agent.upload_video(item["video"], item.get("thumbnail"), title=item["topic"],
+                                              description=item.get("description", ""), tags=item.get("tags"),
+                                              publish_at=publish_at, job_id=item.get("job_id"))
+        except Exception as e:
+            # Nothing was sent (API errors are handled inside upload_video): undo the reservation
+            if units is not None:
+                channel.queue.remove(item["video"])
+                self.ledger.refund(channel.name, units)
+                if slot is not None:
+                    self.ledger.release_slot(channel.name, slot)
+            logger.error(f"Upload of {item['video']} on channel {channel.name} failed before reaching the API: {e}")
+            return {**item, "channel": channel.name, "error": str(e)}
+        if video_id is None:
+            if slot is not None and channel.queue.get(item["video"]) is None:
+                self.ledger.release_slot(channel.name, slot)  # not left queued for resumption: free the slot
+            return {**item, "channel": channel.name, "error": "upload did not complete"}
+        return {**item, "video_id": video_id, "channel": channel.name, "publish_at": publish_at}
+
+    def upload_many(self, items: list) -> list:
+        """Upload items concurrently (up to each channel's max_concurrent); results in input order."""
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            return list(pool.map(self.upload_item, items))
+
+    def report(self) -> dict:
+        """{channel: {"remaining", "used", "booked_slots"}} for today's quota day."""
+        out = {}
+        for channel in self.channels:
+            booked = self.ledger.booked_slots(channel.name)
+            remaining = self.ledger.remaining(channel.name, channel.daily_quota)
+            out[channel.name] = {"remaining": remaining, "used": channel.daily_quota - remaining,
+                                 "booked_slots": [rfc3339(s) for s in booked]}
+        return out